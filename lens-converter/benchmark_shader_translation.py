@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Shader translation throughput benchmark
+
+Translates a corpus of GLSL shaders with the lens converter's GLSL to HLSL
+translator at increasing corpus sizes, so throughput (and whether it scales
+linearly with the amount of source) can be checked before bulk conversions.
+
+The corpus is either every shaders/*.glsl member of the .lns/.zip lenses and
+every .glsl file found under --corpus, or a synthetic set of beauty, blur and
+LUT style shaders when no corpus is given.
+"""
+
+import sys
+import json
+import time
+import zipfile
+import argparse
+from pathlib import Path
+from typing import List
+
+from snap_lens_converter import GlslTranslator, GLSL_TO_HLSL_IDENTIFIERS, tokenize_glsl
+
+SYNTHETIC_SHADER = """
+precision mediump float;
+varying vec2 vUv;
+uniform sampler2D inputTexture{n};
+uniform sampler2D lutTexture{n};
+uniform float smoothness{n};
+const float WEIGHT_{n} = 0.2;
+
+vec4 sampleLut{n}(vec4 color) {{
+    float slice = floor(color.b * 63.0);
+    vec2 lutUv = vec2(fract(slice / 8.0) + color.r / 8.0, floor(slice / 8.0) / 8.0 + color.g / 8.0);
+    return texture2D(lutTexture{n}, lutUv);
+}}
+
+vec4 blur{n}(vec2 uv, float offset) {{
+    vec4 sum = texture2D(inputTexture{n}, uv) * WEIGHT_{n};
+    sum += texture2D(inputTexture{n}, uv + vec2(-offset, -offset)) * WEIGHT_{n};
+    sum += texture2D(inputTexture{n}, uv + vec2(offset, -offset)) * WEIGHT_{n};
+    sum += texture2D(inputTexture{n}, uv + vec2(-offset, offset)) * WEIGHT_{n};
+    sum += texture2D(inputTexture{n}, uv + vec2(offset, offset)) * WEIGHT_{n};
+    return sum;
+}}
+
+void main() {{
+    vec4 color = texture2D(inputTexture{n}, vUv);
+    vec4 smoothed = blur{n}(vUv, 0.002 * smoothness{n});
+    mat3 myvec2mat = mat3(1.0);
+    gl_FragColor = mix(color, sampleLut{n}(smoothed), smoothness{n});
+}}
+"""
+
+def load_corpus(corpus_dir: Path) -> List[str]:
+    """Collect GLSL sources from loose .glsl files and lens archives"""
+    sources = [p.read_text() for p in sorted(corpus_dir.rglob("*.glsl"))]
+
+    for lens_path in sorted(corpus_dir.rglob("*.lns")) + sorted(corpus_dir.rglob("*.zip")):
+        try:
+            with zipfile.ZipFile(lens_path) as zip_ref:
+                for name in zip_ref.namelist():
+                    if name.startswith("shaders/") and name.endswith(".glsl"):
+                        sources.append(zip_ref.read(name).decode('utf-8'))
+        except zipfile.BadZipFile:
+            print(f"  ⚠ Skipping unreadable lens: {lens_path}")
+
+    return sources
+
+def untranslated_identifiers(hlsl: str) -> int:
+    """Count GLSL-only identifiers left in translated output"""
+    return sum(1 for kind, text in tokenize_glsl(hlsl)
+               if kind == 'ident' and text in GLSL_TO_HLSL_IDENTIFIERS)
+
+def benchmark(sources: List[str], scales: List[int], repeats: int) -> List[dict]:
+    translator = GlslTranslator()
+    results = []
+
+    for scale in scales:
+        corpus = sources * scale
+        total_bytes = sum(len(s) for s in corpus)
+        best = float('inf')
+
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs = [translator.translate(s) for s in corpus]
+            best = min(best, time.perf_counter() - start)
+
+        results.append({
+            'scale': scale,
+            'shaders': len(corpus),
+            'bytes': total_bytes,
+            'seconds': best,
+            'shaders_per_second': len(corpus) / best,
+            'mb_per_second': total_bytes / best / 1e6,
+            'untranslated_identifiers': sum(untranslated_identifiers(o) for o in outputs),
+        })
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GLSL to HLSL shader translation')
+    parser.add_argument('--corpus', help='Directory of .glsl files and/or .lns/.zip lenses')
+    parser.add_argument('--synthetic', type=int, default=200,
+                        help='Number of synthetic shaders when no corpus is given')
+    parser.add_argument('--scales', default='1,2,4,8', help='Comma-separated corpus multipliers')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per scale (best is kept)')
+    parser.add_argument('--json', help='Write results as JSON to this path')
+
+    args = parser.parse_args()
+
+    if args.corpus:
+        sources = load_corpus(Path(args.corpus))
+    else:
+        sources = [SYNTHETIC_SHADER.format(n=i) for i in range(args.synthetic)]
+
+    if not sources:
+        print("No shaders found in corpus")
+        return 1
+
+    scales = [int(s) for s in args.scales.split(',')]
+    results = benchmark(sources, scales, args.repeats)
+
+    print(f"{'scale':>6} {'shaders':>8} {'MB':>8} {'seconds':>9} {'shaders/s':>10} {'MB/s':>7} {'ns/byte':>8}")
+    for r in results:
+        print(f"{r['scale']:>6} {r['shaders']:>8} {r['bytes'] / 1e6:>8.2f} {r['seconds']:>9.3f} "
+              f"{r['shaders_per_second']:>10.0f} {r['mb_per_second']:>7.2f} "
+              f"{r['seconds'] / r['bytes'] * 1e9:>8.1f}")
+
+    # Linear scaling keeps the cost per byte flat across scales
+    per_byte = [r['seconds'] / r['bytes'] for r in results]
+    print(f"\nCost per byte, largest vs smallest corpus: {per_byte[-1] / per_byte[0]:.2f}x")
+
+    untranslated = sum(r['untranslated_identifiers'] for r in results)
+    if untranslated:
+        print(f"⚠ {untranslated} GLSL identifiers left untranslated")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,17 +15,61 @@ import os
 import sys
 import json
 import struct
+import hashlib
+import io
+import re
 import zipfile
 import argparse
 import shutil
+import sqlite3
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import asdict, dataclass
 import logging
+import multiprocessing.util
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-lens record of converted content, kept in each lens output directory.
+# Bump the version whenever the converter output changes so caches rebuild.
+MANIFEST_NAME = ".lens_manifest.json"
+MANIFEST_VERSION = 3
+
+# Files regenerated for every conversion of a lens
+GENERATED_FILES = ("snap_filter.shader", "lens_info.json")
+
+HASH_CHUNK_SIZE = 1 << 20
+
+# SQLite index of every converted lens, kept in the output directory
+LENS_INDEX_NAME = "lens_index.sqlite"
+
+# Packed lens bundle: header, 64-byte aligned blobs (raw RGBA textures and
+# shader text), then a JSON table of contents. Read by SnapFilter via mmap.
+BUNDLE_NAME = "lens.snapbundle"
+BUNDLE_MAGIC = b"SNAPLENS"
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<8sIIQQ')  # magic, version, reserved, toc offset, toc length
+BUNDLE_ALIGNMENT = 64
+
+# Shared GLSL translation cache, kept in the output directory by default.
+# Bump the version whenever GlslTranslator output changes.
+SHADER_CACHE_DIR_NAME = ".shader_cache"
+SHADER_CACHE_VERSION = 1
+DEFAULT_SHADER_CACHE_BYTES = 64 << 20
+
+def _hash_file(path: Path) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 @dataclass
 class LensMetadata:
     name: str
@@ -38,15 +82,538 @@ class LensMetadata:
     uses_audio: bool = False
     uses_3d: bool = False
 
+@dataclass
+class TextureOptions:
+    """How textures are transcoded for OBS
+
+    ``max_size`` downscales textures whose larger side exceeds it,
+    ``mipmaps`` writes precomputed mip levels next to each texture, and
+    ``compress_level`` (0-9) re-encodes PNGs at that zlib level. With the
+    defaults, PNG and JPEG textures are copied byte for byte.
+    """
+    max_size: Optional[int] = None
+    mipmaps: bool = False
+    compress_level: Optional[int] = None
+
+# GLSL identifiers with a direct HLSL equivalent
+GLSL_TO_HLSL_IDENTIFIERS = {
+    'vec2': 'float2',
+    'vec3': 'float3',
+    'vec4': 'float4',
+    'ivec2': 'int2',
+    'ivec3': 'int3',
+    'ivec4': 'int4',
+    'bvec2': 'bool2',
+    'bvec3': 'bool3',
+    'bvec4': 'bool4',
+    'mat2': 'float2x2',
+    'mat3': 'float3x3',
+    'mat4': 'float4x4',
+    'sampler2D': 'texture2d',
+    'mix': 'lerp',
+    'fract': 'frac',
+    'mod': 'fmod',
+    'inversesqrt': 'rsqrt',
+    'dFdx': 'ddx',
+    'dFdy': 'ddy',
+    'gl_FragColor': 'output_color',
+    'gl_FragCoord': 'float4(v_in.uv * uv_size, 0.0, 1.0)',
+}
+
+# GLSL texture lookups, rewritten as <sampler>.Sample(textureSampler, <uv>)
+GLSL_SAMPLE_FUNCTIONS = {'texture2D', 'texture'}
+
+# Precision qualifiers have no HLSL meaning and are dropped
+GLSL_PRECISION_QUALIFIERS = {'highp', 'mediump', 'lowp'}
+
+# Uniforms declared by the OBS shader template; lens shaders must not redeclare them
+OBS_TEMPLATE_UNIFORMS = {
+    'image', 'uv_size', 'elapsed_time', 'ViewProj',
+    'face_position', 'face_size', 'face_rotation',
+}
+
+OBS_SHADER_HEADER = '''// Converted from Snap Lens shader
+uniform texture2d image;
+uniform float2 uv_size;
+uniform float elapsed_time;
+uniform float4x4 ViewProj;
+
+// Face tracking uniforms (if available)
+uniform float2 face_position;
+uniform float2 face_size;
+uniform float face_rotation;
+
+'''
+
+_GLSL_TOKEN_RE = re.compile(r"""
+      (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<preproc>\#(?:\\\n|[^\n])*)
+    | (?P<space>\s+)
+    | (?P<ident>[A-Za-z_]\w*)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?[uUfF]?)
+    | (?P<punct>.)
+""", re.VERBOSE | re.DOTALL)
+
+_INSIGNIFICANT_TOKENS = ('space', 'comment')
+
+def tokenize_glsl(source: str) -> List[Tuple[str, str]]:
+    """Split GLSL source into (kind, text) tokens in one regex pass"""
+    return [(m.lastgroup, m.group()) for m in _GLSL_TOKEN_RE.finditer(source)]
+
+class GlslTranslator:
+    """Single-pass GLSL fragment shader to OBS HLSL translator
+
+    The source is tokenized once and rewritten token by token, so only whole
+    identifiers are renamed (``myvec2`` and ``sampler2D`` names survive).
+    Uniforms, constants and helper functions stay at global scope; only the
+    body of ``main()`` becomes the body of ``mainImage``.
+    """
+    
+    def translate(self, glsl_code: str) -> str:
+        tokens = tokenize_glsl(glsl_code)
+        globals_out: List[str] = []
+        main_out: Optional[List[str]] = None
+        out = globals_out
+        varyings: List[Tuple[str, str]] = []
+        aliases: Dict[str, str] = {}
+        sample_splits: Dict[int, str] = {}
+        brace_depth = 0
+        paren_depth = 0
+        prev = None
+        i = 0
+        
+        while i < len(tokens):
+            kind, text = tokens[i]
+            
+            if kind in _INSIGNIFICANT_TOKENS:
+                out.append(text)
+                i += 1
+                continue
+            
+            if kind == 'preproc':
+                directive = text[1:].lstrip()
+                if not directive.startswith(('version', 'extension')):
+                    out.append(text)
+                i += 1
+                continue
+            
+            at_statement_start = (brace_depth == 0 and paren_depth == 0
+                                  and prev in (None, ';', '}'))
+            
+            if kind == 'punct':
+                if i in sample_splits:
+                    text = sample_splits.pop(i)
+                elif text == '(':
+                    paren_depth += 1
+                elif text == ')':
+                    paren_depth -= 1
+                elif text == '{':
+                    brace_depth += 1
+                elif text == '}':
+                    brace_depth -= 1
+                    if out is main_out and brace_depth == 0:
+                        # End of main(): back to global scope, drop the brace
+                        out = globals_out
+                        prev = text
+                        i += 1
+                        continue
+                out.append(text)
+                prev = text
+                i += 1
+                continue
+            
+            if kind == 'ident' and prev != '.':
+                if at_statement_start and text == 'precision':
+                    i = self._statement_end(tokens, i)
+                    continue
+                
+                if at_statement_start and text in ('varying', 'in', 'out'):
+                    end, type_name, names = self._parse_declaration(tokens, i)
+                    for name in names:
+                        if text == 'out':
+                            aliases[name] = 'output_color'
+                        else:
+                            varyings.append((GLSL_TO_HLSL_IDENTIFIERS.get(type_name, type_name), name))
+                    i = end
+                    continue
+                
+                if at_statement_start and text == 'uniform':
+                    end, _, names = self._parse_declaration(tokens, i)
+                    if OBS_TEMPLATE_UNIFORMS.intersection(names):
+                        i = end
+                        continue
+                
+                if at_statement_start and text == 'void' and main_out is None:
+                    body_start = self._match_main(tokens, i)
+                    if body_start is not None:
+                        main_out = []
+                        out = main_out
+                        brace_depth = 1
+                        prev = '{'
+                        i = body_start
+                        continue
+                
+                if text in GLSL_SAMPLE_FUNCTIONS:
+                    split = self._sample_call_split(tokens, i)
+                    if split is not None:
+                        open_paren, comma, wrap = split
+                        if wrap:
+                            out.append('(')
+                            sample_splits[comma] = ').Sample(textureSampler,'
+                        else:
+                            sample_splits[comma] = '.Sample(textureSampler,'
+                        # The call's own parentheses become the Sample() ones
+                        paren_depth += 1
+                        prev = '('
+                        i = open_paren + 1
+                        continue
+                
+                if text in GLSL_PRECISION_QUALIFIERS:
+                    i += 1
+                    continue
+                
+                if out is main_out and text == 'return':
+                    nxt = self._next_significant(tokens, i + 1)
+                    if nxt < len(tokens) and tokens[nxt][1] == ';':
+                        text = 'return output_color'
+                elif at_statement_start and text == 'const':
+                    text = 'static const'
+                else:
+                    text = aliases.get(text, GLSL_TO_HLSL_IDENTIFIERS.get(text, text))
+            
+            out.append(text)
+            prev = tokens[i][1]
+            i += 1
+        
+        if main_out is None:
+            # No main(): treat the whole source as the body, as before
+            global_code, main_body = '', ''.join(globals_out)
+        else:
+            global_code, main_body = ''.join(globals_out).strip(), ''.join(main_out)
+        
+        prelude = ''.join(
+            f"    {hlsl_type} {name} = uv;\n" if hlsl_type == 'float2'
+            else f"    {hlsl_type} {name} = ({hlsl_type})0;\n"
+            for hlsl_type, name in varyings if name != 'uv'
+        )
+        
+        return (OBS_SHADER_HEADER
+                + (global_code + '\n\n' if global_code else '')
+                + 'float4 mainImage(VertData v_in) : TARGET\n{\n'
+                + '    float2 uv = v_in.uv;\n'
+                + '    float4 output_color = image.Sample(textureSampler, uv);\n'
+                + prelude
+                + main_body
+                + '\n    return output_color;\n}\n')
+    
+    @staticmethod
+    def _next_significant(tokens: List[Tuple[str, str]], i: int) -> int:
+        while i < len(tokens) and tokens[i][0] in _INSIGNIFICANT_TOKENS:
+            i += 1
+        return i
+    
+    def _statement_end(self, tokens: List[Tuple[str, str]], i: int) -> int:
+        """Index just past the ';' ending the statement that starts at i"""
+        while i < len(tokens) and tokens[i][1] != ';':
+            i += 1
+        return i + 1
+    
+    def _parse_declaration(self, tokens: List[Tuple[str, str]],
+                           i: int) -> Tuple[int, str, List[str]]:
+        """Parse ``<qualifiers> type name[, name...];`` starting at i"""
+        end = self._statement_end(tokens, i)
+        idents = []
+        bracket_depth = 0
+        initializer = False
+        for kind, text in tokens[i:end]:
+            if text in '[(':
+                bracket_depth += 1
+            elif text in '])':
+                bracket_depth -= 1
+            elif text == '=':
+                initializer = True
+            elif text == ',' and bracket_depth == 0:
+                initializer = False
+            elif kind == 'ident' and bracket_depth == 0 and not initializer:
+                idents.append(text)
+        qualifiers = {'uniform', 'varying', 'in', 'out', 'const', 'flat', 'smooth'}
+        idents = [t for t in idents if t not in qualifiers and t not in GLSL_PRECISION_QUALIFIERS]
+        if not idents:
+            return end, '', []
+        return end, idents[0], idents[1:]
+    
+    def _match_main(self, tokens: List[Tuple[str, str]], i: int) -> Optional[int]:
+        """If ``void main() {`` starts at i, return the index after the brace"""
+        expected = ['main', '(', ')', '{']
+        j = i + 1
+        while expected:
+            j = self._next_significant(tokens, j)
+            if j >= len(tokens):
+                return None
+            if tokens[j][1] == 'void' and expected[0] == ')':
+                j += 1
+                continue
+            if tokens[j][1] != expected.pop(0):
+                return None
+            j += 1
+        return j
+    
+    def _sample_call_split(self, tokens: List[Tuple[str, str]],
+                           i: int) -> Optional[Tuple[int, int, bool]]:
+        """Locate the '(' and first top-level ',' of a texture lookup at i
+
+        Returns (open paren index, comma index, whether the sampler
+        expression needs wrapping in parentheses), or None if the identifier
+        is not a call with at least two arguments.
+        """
+        open_paren = self._next_significant(tokens, i + 1)
+        if open_paren >= len(tokens) or tokens[open_paren][1] != '(':
+            return None
+        depth = 0
+        significant = 0
+        for j in range(open_paren + 1, len(tokens)):
+            kind, text = tokens[j]
+            if text in '([':
+                depth += 1
+            elif text in ')]':
+                if depth == 0:
+                    return None
+                depth -= 1
+            elif text == ',' and depth == 0:
+                return open_paren, j, significant > 1
+            if kind not in _INSIGNIFICANT_TOKENS:
+                significant += 1
+        return None
+
+def normalize_glsl(source: str) -> str:
+    """Strip comments and collapse whitespace so equivalent shaders compare equal"""
+    parts = []
+    for kind, text in tokenize_glsl(source):
+        if kind in _INSIGNIFICANT_TOKENS:
+            continue
+        parts.append(text + '\n' if kind == 'preproc' else text)
+    return ' '.join(parts)
+
+class ShaderTranslationCache:
+    """Persistent GLSL to HLSL translation cache shared across lenses
+
+    Entries are keyed by a hash of the normalized GLSL source, so copies of
+    the same shader that differ only in comments or formatting translate
+    once per library. Each entry is its own file, written atomically, so
+    concurrent worker processes can share one cache directory. File mtimes
+    track last use; ``evict()`` drops the least recently used entries until
+    the cache fits in ``max_bytes``.
+    """
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_SHADER_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: Dict[str, str] = {}
+        self._translator = GlslTranslator()
+    
+    def key(self, glsl_code: str) -> str:
+        normalized = f"{SHADER_CACHE_VERSION}\0{normalize_glsl(glsl_code)}"
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    
+    def translate(self, glsl_code: str) -> str:
+        """Translate GLSL to HLSL, reusing a cached translation when possible"""
+        key = self.key(glsl_code)
+        if key in self._memory:
+            self.hits += 1
+            return self._memory[key]
+        
+        entry_path = self.cache_dir / f"{key}.shader"
+        try:
+            hlsl = entry_path.read_text()
+            os.utime(entry_path)
+            self.hits += 1
+        except OSError:
+            hlsl = self._translator.translate(glsl_code)
+            self.misses += 1
+            tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(hlsl)
+            os.replace(tmp_path, entry_path)
+        
+        self._memory[key] = hlsl
+        return hlsl
+    
+    def evict(self) -> int:
+        """Remove least recently used entries beyond max_bytes, returning the count"""
+        entries = []
+        for entry_path in self.cache_dir.glob("*.shader"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+        
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        
+        if evicted:
+            logger.info(f"Evicted {evicted} shader cache entries")
+        return evicted
+
+class LensIndex:
+    """SQLite index of converted lenses for fast library queries
+
+    One row per lens output directory with its LensMetadata and asset
+    statistics. Rows are upserted as each lens is converted, so the index
+    stays current without walking the output tree. Several worker
+    processes can update the same index (WAL journal, busy timeout).
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS lenses (
+            lens_id TEXT PRIMARY KEY,
+            source TEXT,
+            name TEXT,
+            description TEXT,
+            version TEXT,
+            author TEXT,
+            category TEXT,
+            preview_image TEXT,
+            face_tracking INTEGER,
+            uses_audio INTEGER,
+            uses_3d INTEGER,
+            texture_count INTEGER,
+            texture_bytes INTEGER,
+            max_texture_dim INTEGER,
+            shader_count INTEGER,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS lenses_category ON lenses (category);
+        CREATE INDEX IF NOT EXISTS lenses_author ON lenses (author);
+        CREATE INDEX IF NOT EXISTS lenses_face_tracking ON lenses (face_tracking);
+        CREATE INDEX IF NOT EXISTS lenses_uses_3d ON lenses (uses_3d);
+        CREATE INDEX IF NOT EXISTS lenses_max_texture_dim ON lenses (max_texture_dim);
+    """
+    
+    BOOLEAN_COLUMNS = ('face_tracking', 'uses_audio', 'uses_3d')
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def update(self, lens_id: str, source: str, metadata: LensMetadata,
+               texture_stats: List[dict], shader_count: int):
+        """Insert or replace the row for one converted lens"""
+        dims = [max(t['size']) for t in texture_stats if 'size' in t]
+        row = asdict(metadata)
+        row.update(
+            lens_id=lens_id,
+            source=source,
+            texture_count=len(texture_stats),
+            texture_bytes=sum(t['output_bytes'] for t in texture_stats),
+            max_texture_dim=max(dims) if dims else None,
+            shader_count=shader_count,
+            updated_at=time.time(),
+        )
+        columns = ', '.join(row)
+        placeholders = ', '.join(f':{c}' for c in row)
+        with self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO lenses ({columns}) VALUES ({placeholders})", row
+            )
+    
+    def remove(self, lens_id: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM lenses WHERE lens_id = ?", (lens_id,))
+    
+    def query(self, category: Optional[str] = None, author: Optional[str] = None,
+              face_tracking: Optional[bool] = None, uses_3d: Optional[bool] = None,
+              uses_audio: Optional[bool] = None, max_texture_dim: Optional[int] = None,
+              search: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Return lenses matching every given filter, ordered by name
+
+        ``max_texture_dim`` keeps lenses whose largest texture side is at
+        most that many pixels; ``search`` matches name or description.
+        """
+        clauses = []
+        params: List[object] = []
+        for column, value in (('category', category), ('author', author),
+                              ('face_tracking', face_tracking), ('uses_3d', uses_3d),
+                              ('uses_audio', uses_audio)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if max_texture_dim is not None:
+            clauses.append("(max_texture_dim IS NULL OR max_texture_dim <= ?)")
+            params.append(max_texture_dim)
+        if search:
+            clauses.append("(name LIKE ? OR description LIKE ?)")
+            params += [f"%{search}%"] * 2
+        
+        sql = "SELECT * FROM lenses"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY name, lens_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        rows = []
+        for row in self._conn.execute(sql, params):
+            lens = dict(row)
+            for column in self.BOOLEAN_COLUMNS:
+                lens[column] = bool(lens[column])
+            rows.append(lens)
+        return rows
+    
+    def close(self):
+        self._conn.close()
+
 class SnapLensExtractor:
     """Extracts and converts Snap Camera lens files"""
     
-    def __init__(self, output_dir: str = "extracted"):
+    def __init__(self, output_dir: str = "extracted", extract_raw: bool = False, bundle: bool = False,
+                 shader_cache_dir: Optional[str] = None,
+                 shader_cache_bytes: int = DEFAULT_SHADER_CACHE_BYTES,
+                 texture_options: Optional[TextureOptions] = None,
+                 texture_workers: Optional[int] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.extract_raw = extract_raw
+        self.bundle = bundle
+        self.texture_options = texture_options or TextureOptions()
+        self.texture_workers = texture_workers or min(8, os.cpu_count() or 1)
+        self._index: Optional[LensIndex] = None
+        self.shader_cache = ShaderTranslationCache(
+            Path(shader_cache_dir) if shader_cache_dir else self.output_dir / SHADER_CACHE_DIR_NAME,
+            shader_cache_bytes
+        )
         
-    def extract_lens(self, lens_path: str) -> Optional[LensMetadata]:
-        """Extract a .lns or .zip lens file"""
+    def extract_lens(self, lens_path: str, force: bool = False) -> Optional[LensMetadata]:
+        """Convert a .lns or .zip lens file
+
+        Assets are streamed straight from the archive members into
+        ``obs_assets``; the raw archive content is only written to disk when
+        the extractor was created with ``extract_raw``.
+
+        Conversion is incremental: a manifest in the lens output directory
+        records a content hash for the lens and for every archive member, so
+        an unchanged lens is skipped and only changed members are
+        reconverted. Outputs of members that disappeared are removed.
+        ``force`` ignores the manifest and reconverts everything.
+
+        Textures are transcoded in a thread pool (Pillow releases the GIL
+        while decoding and encoding) while the remaining members are read.
+
+        With ``bundle`` the converted assets are also packed into a single
+        ``obs_assets/lens.snapbundle`` file (see ``write_lens_bundle``).
+        """
         lens_path_obj = Path(lens_path)
         
         if not lens_path_obj.exists():
@@ -57,22 +624,104 @@ class SnapLensExtractor:
         extract_dir = self.output_dir / lens_name
         
         try:
-            # Extract the zip/lns file
-            with zipfile.ZipFile(lens_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-                
-            logger.info(f"Extracted {lens_path} to {extract_dir}")
+            previous = {} if force else self._load_manifest(extract_dir)
+            stat = lens_path_obj.stat()
+            if (previous.get('size') == stat.st_size
+                    and previous.get('mtime_ns') == stat.st_mtime_ns):
+                lens_hash = previous['lens_hash']
+            else:
+                lens_hash = _hash_file(lens_path_obj)
+            
+            if self._is_up_to_date(previous, lens_hash, extract_dir):
+                logger.info(f"Unchanged, skipping: {lens_path}")
+                metadata = LensMetadata(**previous['metadata'])
+                self._index_lens(lens_name, previous['source'], metadata, previous['members'])
+                return metadata
             
-            # Parse metadata
-            metadata = self._parse_metadata(extract_dir)
+            old_members = previous.get('members', {})
+            texture_options = asdict(self.texture_options)
+            textures_outdated = previous.get('texture_options') != texture_options
+            members = {}
+            pending_textures = {}
+            changed = 0
             
-            # Convert assets
-            self._convert_textures(extract_dir)
-            self._convert_shaders(extract_dir)
-            self._convert_models(extract_dir)
+            assets_dir = extract_dir / "obs_assets"
+            (assets_dir / "textures").mkdir(parents=True, exist_ok=True)
+            (assets_dir / "shaders").mkdir(parents=True, exist_ok=True)
+            
+            with zipfile.ZipFile(lens_path, 'r') as zip_ref, \
+                    ThreadPoolExecutor(max_workers=self.texture_workers) as texture_pool:
+                # Parse metadata
+                metadata = self._parse_metadata(zip_ref, lens_name)
+                
+                # Convert assets one member at a time, reading each only once
+                for info in zip_ref.infolist():
+                    converter = self._member_converter(info.filename)
+                    if info.is_dir() or (converter is None and not self.extract_raw):
+                        continue
+                    
+                    data = zip_ref.read(info)
+                    digest = hashlib.sha256(data).hexdigest()
+                    old = old_members.get(info.filename)
+                    is_texture = converter == self._convert_texture
+                    if (old and old['hash'] == digest and self._outputs_exist(extract_dir, old)
+                            and not (is_texture and textures_outdated)):
+                        members[info.filename] = old
+                        continue
+                    
+                    outputs = []
+                    if self.extract_raw:
+                        zip_ref.extract(info, extract_dir)
+                        outputs.append(info.filename)
+                    if is_texture:
+                        future = texture_pool.submit(converter, info.filename, data, assets_dir)
+                        pending_textures[future] = info.filename
+                    elif converter is not None:
+                        output_path = converter(info.filename, data, assets_dir)
+                        outputs.append(str(output_path.relative_to(extract_dir)))
+                    members[info.filename] = {'hash': digest, 'outputs': outputs}
+                    changed += 1
+                
+                self._convert_models(zip_ref.namelist())
+                
+                for future, name in pending_textures.items():
+                    texture_outputs, texture_stats = future.result()
+                    members[name]['outputs'].extend(
+                        str(path.relative_to(extract_dir)) for path in texture_outputs
+                    )
+                    members[name]['stats'] = texture_stats
+                
+            logger.info(f"Converted {changed}/{len(members)} changed members "
+                        f"of {lens_path} into {extract_dir}")
+            
+            # Drop outputs that no current member produces any more
+            self._remove_stale_outputs(extract_dir, old_members, members)
             
             # Generate OBS shader files
-            self._generate_obs_shaders(extract_dir, metadata)
+            texture_stats = [members[name]['stats'] for name in sorted(members)
+                             if 'stats' in members[name]]
+            self._generate_obs_shaders(extract_dir, metadata, texture_stats)
+            
+            bundle_path = assets_dir / BUNDLE_NAME
+            if self.bundle:
+                self._write_bundle(assets_dir, texture_stats)
+            elif bundle_path.exists():
+                bundle_path.unlink()
+            
+            self._save_manifest(extract_dir, {
+                'version': MANIFEST_VERSION,
+                'source': str(lens_path_obj.resolve()),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'lens_hash': lens_hash,
+                'extract_raw': self.extract_raw,
+                'bundle': self.bundle,
+                'texture_options': texture_options,
+                'metadata': asdict(metadata),
+                'members': members,
+            })
+            
+            self._index_lens(lens_name, str(lens_path_obj.resolve()), metadata, members)
             
             logger.info(f"Successfully processed lens: {metadata.name}")
             return metadata
@@ -81,13 +730,82 @@ class SnapLensExtractor:
             logger.error(f"Failed to extract {lens_path}: {e}")
             return None
     
-    def _parse_metadata(self, extract_dir: Path) -> LensMetadata:
+    @property
+    def index(self) -> LensIndex:
+        """The lens library index of this output directory, opened on first use"""
+        if self._index is None:
+            self._index = LensIndex(self.output_dir / LENS_INDEX_NAME)
+        return self._index
+    
+    def close(self):
+        """Close the lens index connection if it was opened"""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+    
+    def _index_lens(self, lens_name: str, source: str, metadata: LensMetadata,
+                    members: Dict[str, dict]):
+        texture_stats = [m['stats'] for m in members.values() if 'stats' in m]
+        shader_count = sum(1 for name in members
+                           if self._member_converter(name) == self._convert_shader)
+        self.index.update(lens_name, source, metadata, texture_stats, shader_count)
+    
+    def _load_manifest(self, extract_dir: Path) -> dict:
+        """Load the conversion manifest of a lens, or {} if missing or outdated"""
+        manifest_path = extract_dir / MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest
+    
+    def _save_manifest(self, extract_dir: Path, manifest: dict):
+        """Atomically write the conversion manifest of a lens"""
+        manifest_path = extract_dir / MANIFEST_NAME
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    
+    def _is_up_to_date(self, manifest: dict, lens_hash: str, extract_dir: Path) -> bool:
+        """Check whether a previous conversion of the same content is complete"""
+        if not manifest or manifest.get('lens_hash') != lens_hash:
+            return False
+        if manifest.get('extract_raw', False) != self.extract_raw:
+            return False
+        if manifest.get('texture_options') != asdict(self.texture_options):
+            return False
+        if manifest.get('bundle', False) != self.bundle:
+            return False
+        if self.bundle and not (extract_dir / "obs_assets" / BUNDLE_NAME).exists():
+            return False
+        generated = [extract_dir / "obs_assets" / name for name in GENERATED_FILES]
+        if not all(path.exists() for path in generated):
+            return False
+        return all(self._outputs_exist(extract_dir, m) for m in manifest['members'].values())
+    
+    def _outputs_exist(self, extract_dir: Path, member: dict) -> bool:
+        return all((extract_dir / output).exists() for output in member['outputs'])
+    
+    def _remove_stale_outputs(self, extract_dir: Path, old_members: Dict[str, dict],
+                              members: Dict[str, dict]):
+        """Delete files produced by members that were removed or changed"""
+        current = {output for m in members.values() for output in m['outputs']}
+        for old in old_members.values():
+            for output in old['outputs']:
+                if output not in current:
+                    stale = extract_dir / output
+                    if stale.is_file():
+                        stale.unlink()
+                        logger.info(f"Removed stale output: {output}")
+    
+    def _parse_metadata(self, zip_ref: zipfile.ZipFile, fallback_name: str) -> LensMetadata:
         """Parse lens.json or Info.plist for metadata"""
-        lens_json = extract_dir / "lens.json"
-        
-        if lens_json.exists():
-            with open(lens_json, 'r') as f:
-                data = json.load(f)
+        if "lens.json" in zip_ref.namelist():
+            data = json.loads(zip_ref.read("lens.json"))
                 
             return LensMetadata(
                 name=data.get('name', 'Unknown'),
@@ -102,123 +820,118 @@ class SnapLensExtractor:
         
         # Fallback metadata
         return LensMetadata(
-            name=extract_dir.name,
+            name=fallback_name,
             description="",
             version="1.0",
             author="Unknown",
             category="general"
         )
     
-    def _convert_textures(self, extract_dir: Path):
-        """Convert textures to OBS-compatible formats"""
-        textures_dir = extract_dir / "textures"
-        output_dir = extract_dir / "obs_assets" / "textures"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        if not textures_dir.exists():
-            return
-            
-        for texture_file in textures_dir.glob("*"):
-            if texture_file.suffix.lower() in ['.png', '.jpg', '.jpeg', '.webp']:
-                # Copy to output, converting webp to png if needed
-                if texture_file.suffix.lower() == '.webp':
-                    try:
-                        from PIL import Image
-                        img = Image.open(texture_file)
-                        output_path = output_dir / f"{texture_file.stem}.png"
-                        img.save(output_path, 'PNG')
-                        logger.info(f"Converted {texture_file.name} to PNG")
-                    except ImportError:
-                        logger.warning("PIL not installed, skipping webp conversion")
-                        shutil.copy2(texture_file, output_dir / texture_file.name)
-                else:
-                    shutil.copy2(texture_file, output_dir / texture_file.name)
+    def _member_converter(self, name: str):
+        """Pick the converter for an archive member, or None if it is not converted"""
+        member_path = Path(name)
+        if member_path.parent == Path("textures"):
+            if member_path.suffix.lower() in ['.png', '.jpg', '.jpeg', '.webp']:
+                return self._convert_texture
+        elif member_path.parent == Path("shaders") and member_path.suffix == ".glsl":
+            return self._convert_shader
+        return None
     
-    def _convert_shaders(self, extract_dir: Path):
-        """Convert GLSL shaders to OBS HLSL format"""
-        shaders_dir = extract_dir / "shaders"
-        output_dir = extract_dir / "obs_assets" / "shaders"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        if not shaders_dir.exists():
-            return
-            
-        for shader_file in shaders_dir.glob("*.glsl"):
-            obs_shader = self._glsl_to_hlsl(shader_file)
-            output_path = output_dir / f"{shader_file.stem}.shader"
-            with open(output_path, 'w') as f:
-                f.write(obs_shader)
-            logger.info(f"Converted shader: {shader_file.name}")
-    
-    def _glsl_to_hlsl(self, shader_path: Path) -> str:
-        """Convert GLSL shader to OBS HLSL format"""
-        with open(shader_path, 'r') as f:
-            glsl_code = f.read()
-        
-        # Basic conversions
-        hlsl_code = glsl_code
-        
-        # Replace GLSL types with HLSL
-        type_mappings = {
-            'vec2': 'float2',
-            'vec3': 'float3',
-            'vec4': 'float4',
-            'mat2': 'float2x2',
-            'mat3': 'float3x3',
-            'mat4': 'float4x4',
-            'sampler2D': 'texture2d',
-            'texture2D': 'image.Sample',
-            'gl_FragCoord': 'uv',
-            'gl_FragColor': 'output_color',
-        }
-        
-        for glsl, hlsl in type_mappings.items():
-            hlsl_code = hlsl_code.replace(glsl, hlsl)
-        
-        # Add OBS shader template
-        obs_template = '''// Converted from Snap Lens shader
-uniform texture2d image;
-uniform float2 uv_size;
-uniform float elapsed_time;
-uniform float4x4 ViewProj;
-
-// Face tracking uniforms (if available)
-uniform float2 face_position;
-uniform float2 face_size;
-uniform float face_rotation;
+    def _convert_texture(self, name: str, data: bytes,
+                         assets_dir: Path) -> Tuple[List[Path], dict]:
+        """Convert a texture to an OBS-compatible format
 
-float4 mainImage(VertData v_in) : TARGET
-{
-    float2 uv = v_in.uv;
-    float4 output_color = image.Sample(textureSampler, uv);
-    
-'''
+        Returns the written files (the texture first, then any mip levels)
+        and per-texture statistics for lens_info.json. Runs on the texture
+        thread pool.
+        """
+        start = time.perf_counter()
+        texture_name = Path(name).name
+        stem, suffix = Path(texture_name).stem, Path(texture_name).suffix.lower()
+        output_dir = assets_dir / "textures"
+        options = self.texture_options
+        stats = {'source': name, 'source_bytes': len(data)}
         
-        obs_footer = '''
-    return output_color;
-}
-'''
+        transcode = (suffix == '.webp' or options.max_size or options.mipmaps
+                     or (suffix == '.png' and options.compress_level is not None))
+        if transcode:
+            try:
+                from PIL import Image
+            except ImportError:
+                logger.warning("PIL not installed, copying texture unchanged")
+                transcode = False
         
-        # Extract main function body
-        if 'void main()' in hlsl_code:
-            start = hlsl_code.find('void main()')
-            body_start = hlsl_code.find('{', start) + 1
-            body_end = hlsl_code.rfind('}')
-            main_body = hlsl_code[body_start:body_end]
+        if not transcode:
+            output_path = output_dir / texture_name
+            output_path.write_bytes(data)
+            outputs = [output_path]
+            try:
+                from PIL import Image
+                with Image.open(io.BytesIO(data)) as img:
+                    stats['size'] = list(img.size)
+            except (ImportError, OSError):
+                pass
+        else:
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            stats['source_size'] = list(img.size)
+            
+            if options.max_size and max(img.size) > options.max_size:
+                img.thumbnail((options.max_size, options.max_size), Image.LANCZOS)
             
-            return obs_template + main_body + obs_footer
+            # Convert webp to png; keep JPEGs as JPEG
+            ext = suffix if suffix in ('.jpg', '.jpeg') else '.png'
+            output_path = output_dir / f"{stem}{ext}"
+            self._save_texture(img, output_path)
+            outputs = [output_path]
+            
+            if options.mipmaps:
+                mip = img
+                while max(mip.size) > 1:
+                    mip = mip.resize((max(1, mip.width // 2), max(1, mip.height // 2)), Image.BOX)
+                    mip_path = output_dir / f"{stem}.mip{len(outputs)}{ext}"
+                    self._save_texture(mip, mip_path)
+                    outputs.append(mip_path)
+            
+            stats['size'] = list(img.size)
+            stats['mip_levels'] = len(outputs) - 1
+            logger.info(f"Transcoded texture: {texture_name}")
         
-        return obs_template + hlsl_code + obs_footer
+        stats['output'] = output_path.name
+        stats['output_bytes'] = sum(path.stat().st_size for path in outputs)
+        stats['saved_bytes'] = stats['source_bytes'] - stats['output_bytes']
+        stats['seconds'] = round(time.perf_counter() - start, 4)
+        return outputs, stats
     
-    def _convert_models(self, extract_dir: Path):
+    def _save_texture(self, img, path: Path):
+        if path.suffix.lower() in ('.jpg', '.jpeg'):
+            img.convert('RGB').save(path, 'JPEG', quality=95)
+        else:
+            compress_level = self.texture_options.compress_level
+            img.save(path, 'PNG', compress_level=6 if compress_level is None else compress_level)
+    
+    def _convert_shader(self, name: str, data: bytes, assets_dir: Path) -> Path:
+        """Convert a GLSL shader to OBS HLSL format, returning the output path"""
+        obs_shader = self._glsl_to_hlsl(data.decode('utf-8'))
+        output_path = assets_dir / "shaders" / f"{Path(name).stem}.shader"
+        with open(output_path, 'w') as f:
+            f.write(obs_shader)
+        logger.info(f"Converted shader: {Path(name).name}")
+        return output_path
+    
+    def _glsl_to_hlsl(self, glsl_code: str) -> str:
+        """Convert GLSL shader source to OBS HLSL format"""
+        return self.shader_cache.translate(glsl_code)
+    
+    def _convert_models(self, names: List[str]):
         """Convert 3D models if possible"""
-        models_dir = extract_dir / "models"
-        if not models_dir.exists():
+        if not any(name.startswith("models/") for name in names):
             return
             
         logger.info("3D model conversion not yet implemented (proprietary format)")
     
-    def _generate_obs_shaders(self, extract_dir: Path, metadata: LensMetadata):
+    def _generate_obs_shaders(self, extract_dir: Path, metadata: LensMetadata,
+                              texture_stats: List[dict]):
         """Generate OBS-compatible shader files with face tracking support"""
         output_dir = extract_dir / "obs_assets"
         
@@ -235,13 +948,37 @@ float4 mainImage(VertData v_in) : TARGET
             'face_tracking': metadata.face_tracking,
             'files': {
                 'main_shader': 'snap_filter.shader',
-                'textures': [t.name for t in (output_dir / 'textures').glob('*')] if (output_dir / 'textures').exists() else []
-            }
+                'textures': [t['output'] for t in texture_stats]
+            },
+            'texture_stats': texture_stats,
+            'texture_bytes_saved': sum(t['saved_bytes'] for t in texture_stats),
         }
         
         with open(output_dir / 'lens_info.json', 'w') as f:
             json.dump(info, f, indent=2)
     
+    def _write_bundle(self, assets_dir: Path, texture_stats: List[dict]):
+        """Pack lens_info.json, decoded textures and shaders into one bundle file"""
+        with open(assets_dir / 'lens_info.json', 'r') as f:
+            info = json.load(f)
+        
+        textures = []
+        try:
+            from PIL import Image
+            for stats in texture_stats:
+                with Image.open(assets_dir / "textures" / stats['output']) as img:
+                    rgba = img.convert('RGBA')
+                    textures.append((stats['output'], rgba.width, rgba.height, rgba.tobytes()))
+        except ImportError:
+            logger.warning("PIL not installed, bundling shaders only")
+        
+        shaders = [("snap_filter.shader", (assets_dir / "snap_filter.shader").read_text())]
+        shaders += [(f"shaders/{p.name}", p.read_text())
+                    for p in sorted((assets_dir / "shaders").glob("*.shader"))]
+        
+        write_lens_bundle(assets_dir / BUNDLE_NAME, info, textures, shaders)
+        logger.info(f"Wrote lens bundle: {assets_dir / BUNDLE_NAME}")
+    
     def _generate_face_tracking_shader(self, metadata: LensMetadata) -> str:
         """Generate a shader template with face tracking support"""
         return '''// Snap Camera Filter for OBS
@@ -333,33 +1070,227 @@ float4 mainImage(VertData v_in) : TARGET {{
             face_tracking="enabled" if metadata.face_tracking else "disabled"
         )
 
-def batch_convert(input_dir: str, output_dir: str):
-    """Convert all lens files in a directory"""
+def write_lens_bundle(path: Path, info: dict,
+                      textures: List[Tuple[str, int, int, bytes]],
+                      shaders: List[Tuple[str, str]]):
+    """Write a packed lens bundle
+
+    Layout: a fixed header (``BUNDLE_HEADER``), then every texture as raw
+    row-major RGBA8 pixels and every shader as UTF-8 text, each blob aligned
+    to ``BUNDLE_ALIGNMENT`` bytes, then a JSON table of contents holding the
+    lens info and one entry (name, kind, offset, length and, for textures,
+    width/height/channels) per blob. The file is written next to its final
+    name and swapped in atomically, so a reader that has the old bundle
+    mapped keeps a consistent view.
+    """
+    entries = []
+    tmp_path = path.with_suffix('.tmp')
+    
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * BUNDLE_HEADER.size)
+        
+        def write_blob(entry: dict, data: bytes):
+            f.write(b'\0' * (-f.tell() % BUNDLE_ALIGNMENT))
+            entry.update(offset=f.tell(), length=len(data))
+            f.write(data)
+            entries.append(entry)
+        
+        for name, width, height, pixels in textures:
+            write_blob({'name': name, 'kind': 'texture', 'width': width,
+                        'height': height, 'channels': 4}, pixels)
+        for name, source in shaders:
+            write_blob({'name': name, 'kind': 'shader'}, source.encode('utf-8'))
+        
+        toc = json.dumps({'info': info, 'entries': entries}).encode('utf-8')
+        toc_offset = f.tell()
+        f.write(toc)
+        f.seek(0)
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, 0, toc_offset, len(toc)))
+    
+    os.replace(tmp_path, path)
+
+# Per-lens conversion result: (metadata or None, (shader cache hits, misses))
+ConversionResult = Tuple[Optional[LensMetadata], Tuple[int, int]]
+
+def _extract_counting_cache(extractor: 'SnapLensExtractor', lens_path: str,
+                            force: bool) -> ConversionResult:
+    """Convert one lens and report the shader cache hits/misses it caused"""
+    cache = extractor.shader_cache
+    hits, misses = cache.hits, cache.misses
+    metadata = extractor.extract_lens(lens_path, force=force)
+    return metadata, (cache.hits - hits, cache.misses - misses)
+
+# The extractor of a conversion worker process, set up by _init_conversion_worker
+_worker_extractor: Optional['SnapLensExtractor'] = None
+
+def _init_conversion_worker(output_dir: str, options: dict):
+    """Process-pool initializer: one extractor, and index connection, per worker process"""
+    global _worker_extractor
+    _worker_extractor = SnapLensExtractor(output_dir, **options)
+    # Pool workers exit through multiprocessing, which runs finalizers but not atexit
+    multiprocessing.util.Finalize(_worker_extractor, _worker_extractor.close, exitpriority=10)
+
+def _conversion_pool(output_dir: str, options: dict, jobs: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_conversion_worker,
+                               initargs=(output_dir, options))
+
+def _convert_lens_worker(lens_path: str, force: bool) -> ConversionResult:
+    """Process-pool entry point: convert one lens with the worker's extractor"""
+    return _extract_counting_cache(_worker_extractor, lens_path, force)
+
+def _convert_lens_isolated(output_dir: str, options: dict, lens_path: str,
+                           force: bool) -> ConversionResult:
+    """Convert one lens in its own single-worker pool so a crash is attributable"""
+    with _conversion_pool(output_dir, options, 1) as pool:
+        try:
+            return pool.submit(_convert_lens_worker, lens_path, force).result()
+        except BrokenProcessPool:
+            logger.error(f"Worker crashed while converting {lens_path}")
+        except Exception as e:
+            logger.error(f"Failed to convert {lens_path}: {e}")
+    return None, (0, 0)
+
+def _iter_parallel_conversions(lens_files: List[Path], output_dir: str, options: dict,
+                               jobs: int, force: bool) -> Iterator[Tuple[int, ConversionResult]]:
+    """Yield (index, result) pairs as lenses finish converting in a process pool.
+
+    At most ``jobs`` lenses are in flight at a time. If a worker process dies,
+    the pool is replaced and the lenses that were in flight are retried one by
+    one in isolation, so only the lens that actually crashed is reported as
+    failed and the rest of the batch carries on.
+    """
+    remaining = deque(range(len(lens_files)))
+    
+    while remaining:
+        suspects = []
+        with _conversion_pool(output_dir, options, jobs) as pool:
+            in_flight = {}
+            while remaining or in_flight:
+                while remaining and len(in_flight) < jobs:
+                    index = remaining.popleft()
+                    future = pool.submit(_convert_lens_worker, str(lens_files[index]), force)
+                    in_flight[future] = index
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        finished.append((index, future.result()))
+                    except BrokenProcessPool:
+                        suspects.append(index)
+                    except Exception as e:
+                        logger.error(f"Failed to convert {lens_files[index]}: {e}")
+                        finished.append((index, (None, (0, 0))))
+                
+                yield from finished
+                
+                if suspects:
+                    # Every other in-flight future is lost with the pool
+                    suspects.extend(in_flight.values())
+                    break
+        
+        if suspects:
+            logger.warning(f"Worker pool crashed, retrying {len(suspects)} lens(es) in isolation")
+        for index in sorted(suspects):
+            yield index, _convert_lens_isolated(output_dir, options, str(lens_files[index]), force)
+
+def _prune_removed_lenses(input_path: Path, output_path: Path, lens_files: List[Path],
+                          index: LensIndex):
+    """Remove converted lenses whose source file was deleted from the input directory"""
+    input_root = input_path.resolve()
+    current = {str(f.resolve()) for f in lens_files}
+    
+    for manifest_path in output_path.glob(f"*/{MANIFEST_NAME}"):
+        try:
+            with open(manifest_path, 'r') as f:
+                source = json.load(f).get('source')
+        except (OSError, ValueError):
+            continue
+        if not source or Path(source).parent != input_root or source in current:
+            continue
+        shutil.rmtree(manifest_path.parent)
+        index.remove(manifest_path.parent.name)
+        logger.info(f"Removed output of deleted lens: {manifest_path.parent.name}")
+
+def batch_convert(input_dir: str, output_dir: str, jobs: int = 1, force: bool = False,
+                  extract_raw: bool = False, bundle: bool = False, shader_cache_dir: Optional[str] = None,
+                  shader_cache_bytes: int = DEFAULT_SHADER_CACHE_BYTES,
+                  texture_options: Optional[TextureOptions] = None,
+                  texture_workers: Optional[int] = None):
+    """Convert all lens files in a directory
+
+    With ``jobs`` > 1 lenses are converted in a pool of worker processes
+    (``jobs`` <= 0 uses every CPU). The report keeps the input order
+    regardless of the order in which workers finish. Unchanged lenses are
+    skipped unless ``force`` is set, and outputs of lenses deleted from
+    ``input_dir`` are removed. ``extract_raw`` also writes the raw archive
+    content next to the converted assets and ``bundle`` packs each lens into
+    a single bundle file. Shader translations are shared
+    through a persistent cache (see ``ShaderTranslationCache``) whose hit and
+    miss counts are included in the report. ``texture_options`` controls
+    texture downscaling, mip levels and PNG compression; by default the
+    CPUs are split between lens processes and their texture threads.
+    """
     input_path = Path(input_dir)
-    extractor = SnapLensExtractor(output_dir)
+    lens_files = sorted(input_path.glob("*.lns")) + sorted(input_path.glob("*.zip"))
+    
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(lens_files)))
+    
+    if texture_workers is None and jobs > 1:
+        texture_workers = max(1, (os.cpu_count() or 1) // jobs)
     
-    lens_files = list(input_path.glob("*.lns")) + list(input_path.glob("*.zip"))
+    options = {
+        'extract_raw': extract_raw,
+        'bundle': bundle,
+        'shader_cache_dir': shader_cache_dir,
+        'shader_cache_bytes': shader_cache_bytes,
+        'texture_options': texture_options,
+        'texture_workers': texture_workers,
+    }
+    extractor = SnapLensExtractor(output_dir, **options)
+    
+    logger.info(f"Found {len(lens_files)} lens files to convert ({jobs} job(s))")
     
-    logger.info(f"Found {len(lens_files)} lens files to convert")
+    if jobs == 1:
+        conversions = ((i, _extract_counting_cache(extractor, str(f), force))
+                       for i, f in enumerate(lens_files))
+    else:
+        conversions = _iter_parallel_conversions(lens_files, output_dir, options, jobs, force)
     
-    results = []
-    for lens_file in lens_files:
-        metadata = extractor.extract_lens(str(lens_file))
-        results.append((lens_file.name, metadata))
+    results: List[Optional[LensMetadata]] = [None] * len(lens_files)
+    cache_hits = cache_misses = 0
+    for completed, (index, (metadata, (hits, misses))) in enumerate(conversions, 1):
+        results[index] = metadata
+        cache_hits += hits
+        cache_misses += misses
+        status = "ok" if metadata else "FAILED"
+        logger.info(f"[{completed}/{len(lens_files)}] {lens_files[index].name}: {status}")
+    
+    _prune_removed_lenses(input_path, Path(output_dir), lens_files, extractor.index)
+    evicted = extractor.shader_cache.evict()
+    extractor.close()
     
     # Generate report
     report_path = Path(output_dir) / "conversion_report.json"
     report = {
         'total': len(lens_files),
-        'successful': sum(1 for _, m in results if m is not None),
-        'failed': sum(1 for _, m in results if m is None),
+        'successful': sum(1 for m in results if m is not None),
+        'failed': sum(1 for m in results if m is None),
+        'shader_cache': {
+            'hits': cache_hits,
+            'misses': cache_misses,
+            'evicted': evicted,
+        },
         'lenses': [
             {
-                'file': name,
+                'file': lens_file.name,
                 'success': meta is not None,
                 'name': meta.name if meta else None
             }
-            for name, meta in results
+            for lens_file, meta in zip(lens_files, results)
         ]
     }
     
@@ -371,17 +1302,84 @@ def batch_convert(input_dir: str, output_dir: str):
 
 def main():
     parser = argparse.ArgumentParser(description='Convert Snap Camera lenses to OBS format')
-    parser.add_argument('input', help='Input lens file (.lns/.zip) or directory')
+    parser.add_argument('input', help='Input lens file (.lns/.zip) or directory '
+                                      '(with --query: a converted output directory)')
     parser.add_argument('-o', '--output', default='extracted', help='Output directory')
     parser.add_argument('--batch', action='store_true', help='Process all lenses in directory')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Parallel worker processes for --batch (0 = one per CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='Reconvert lenses even if they are unchanged since the last run')
+    parser.add_argument('--extract-raw', action='store_true',
+                        help='Also write the raw lens archive content next to the OBS assets')
+    parser.add_argument('--bundle', action='store_true',
+                        help='Also pack each lens into a single obs_assets/lens.snapbundle file')
+    parser.add_argument('--shader-cache-dir',
+                        help='Shader translation cache directory (default: <output>/.shader_cache)')
+    parser.add_argument('--shader-cache-mb', type=float,
+                        default=DEFAULT_SHADER_CACHE_BYTES / (1 << 20),
+                        help='Maximum shader translation cache size in MB')
+    parser.add_argument('--texture-max-size', type=int,
+                        help='Downscale textures whose larger side exceeds this many pixels')
+    parser.add_argument('--texture-mipmaps', action='store_true',
+                        help='Write precomputed mip levels next to each texture')
+    parser.add_argument('--png-compress-level', type=int, choices=range(10),
+                        help='Re-encode PNG textures at this zlib level (0-9)')
+    parser.add_argument('--texture-workers', type=int,
+                        help='Texture transcoding threads per lens (default: up to 8)')
+    
+    query = parser.add_argument_group('library queries')
+    query.add_argument('--query', action='store_true',
+                       help='Query the lens index of a converted output directory')
+    query.add_argument('--category', help='Only lenses in this category')
+    query.add_argument('--author', help='Only lenses by this author')
+    query.add_argument('--face-tracking', action=argparse.BooleanOptionalAction, default=None,
+                       help='Only lenses with (or without) face tracking')
+    query.add_argument('--uses-3d', action=argparse.BooleanOptionalAction, default=None,
+                       help='Only lenses that use (or do not use) 3D')
+    query.add_argument('--max-texture-dim', type=int,
+                       help='Only lenses whose largest texture side is at most this many pixels')
+    query.add_argument('--search', help='Match text in lens name or description')
+    query.add_argument('--limit', type=int, help='Maximum number of results')
     
     args = parser.parse_args()
     
+    if args.query:
+        index_path = Path(args.input) / LENS_INDEX_NAME
+        if not index_path.exists():
+            print(f"No lens index found at {index_path}")
+            sys.exit(1)
+        index = LensIndex(index_path)
+        lenses = index.query(category=args.category, author=args.author,
+                             face_tracking=args.face_tracking, uses_3d=args.uses_3d,
+                             max_texture_dim=args.max_texture_dim, search=args.search,
+                             limit=args.limit)
+        index.close()
+        print(json.dumps(lenses, indent=2))
+        return
+    
+    shader_cache_bytes = int(args.shader_cache_mb * (1 << 20))
+    texture_options = TextureOptions(
+        max_size=args.texture_max_size,
+        mipmaps=args.texture_mipmaps,
+        compress_level=args.png_compress_level
+    )
+    
     if args.batch:
-        batch_convert(args.input, args.output)
+        batch_convert(args.input, args.output, jobs=args.jobs, force=args.force,
+                      extract_raw=args.extract_raw, bundle=args.bundle,
+                      shader_cache_dir=args.shader_cache_dir,
+                      shader_cache_bytes=shader_cache_bytes, texture_options=texture_options,
+                      texture_workers=args.texture_workers)
     else:
-        extractor = SnapLensExtractor(args.output)
-        metadata = extractor.extract_lens(args.input)
+        extractor = SnapLensExtractor(args.output, extract_raw=args.extract_raw, bundle=args.bundle,
+                                      shader_cache_dir=args.shader_cache_dir,
+                                      shader_cache_bytes=shader_cache_bytes,
+                                      texture_options=texture_options,
+                                      texture_workers=args.texture_workers)
+        metadata = extractor.extract_lens(args.input, force=args.force)
+        extractor.shader_cache.evict()
+        extractor.close()
         
         if metadata:
             print(f"\\nConverted: {metadata.name}")
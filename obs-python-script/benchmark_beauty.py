@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Beauty effect benchmark
+
+Times the filter script's beauty (skin smoothing) effect against the
+original float64 implementation at 720p, 1080p and 4K, and reports how far
+the two outputs differ and how much memory each allocates per frame.
+
+Runs outside OBS: snap_filter.py only needs OpenCV and NumPy to be
+imported for its effect functions.
+"""
+
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from typing import List
+
+import cv2
+import numpy as np
+
+from snap_filter import ScratchBuffers, beauty_filter
+
+RESOLUTIONS = {
+    '720p': (720, 1280),
+    '1080p': (1080, 1920),
+    '4k': (2160, 3840),
+}
+
+def legacy_beauty(frame, intensity):
+    """The original apply_beauty, kept as the baseline"""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+
+    lower_skin = np.array([0, 20, 70], dtype=np.uint8)
+    upper_skin = np.array([20, 255, 255], dtype=np.uint8)
+
+    skin_mask = cv2.inRange(hsv, lower_skin, upper_skin)
+
+    smoothed = cv2.bilateralFilter(frame, 9, 75, 75)
+
+    skin_mask = skin_mask.astype(float) / 255.0 * intensity
+    skin_mask = np.stack([skin_mask] * 3, axis=2)
+
+    result = (frame * (1 - skin_mask) + smoothed * skin_mask).astype(np.uint8)
+
+    return cv2.convertScaleAbs(result, alpha=1.0 + intensity * 0.1, beta=intensity * 10)
+
+def synthetic_frame(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """Noisy frame with skin-toned patches, so the skin mask is partly set"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    cv2.ellipse(frame, (width // 3, height // 2), (width // 8, height // 4), 0, 0, 360,
+                (120, 150, 200), -1)
+    cv2.ellipse(frame, (2 * width // 3, height // 2), (width // 8, height // 4), 0, 0, 360,
+                (90, 130, 190), -1)
+    return frame
+
+def time_per_frame(fn, frames: int) -> float:
+    fn()  # warm up caches and scratch buffers
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames
+
+def allocated_per_frame(fn) -> int:
+    """Peak bytes NumPy allocates during one call"""
+    fn()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def benchmark(names: List[str], frames: int, intensity: float) -> List[dict]:
+    results = []
+
+    for name in names:
+        height, width = RESOLUTIONS[name]
+        frame = synthetic_frame(height, width)
+        scratch = ScratchBuffers()
+
+        legacy = lambda: legacy_beauty(frame, intensity)
+        current = lambda: beauty_filter(frame, intensity, scratch)
+
+        legacy_s = time_per_frame(legacy, frames)
+        current_s = time_per_frame(current, frames)
+        diff = np.abs(legacy().astype(np.int16) - current().astype(np.int16))
+
+        results.append({
+            'resolution': name,
+            'legacy_ms': legacy_s * 1000,
+            'current_ms': current_s * 1000,
+            'speedup': legacy_s / current_s,
+            'legacy_alloc_bytes': allocated_per_frame(legacy),
+            'current_alloc_bytes': allocated_per_frame(current),
+            'max_abs_diff': int(diff.max()),
+        })
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the beauty effect against the original version')
+    parser.add_argument('--resolutions', default='720p,1080p,4k',
+                        help=f"Comma-separated subset of {','.join(RESOLUTIONS)}")
+    parser.add_argument('--frames', type=int, default=20, help='Timed frames per resolution')
+    parser.add_argument('--intensity', type=float, default=0.5, help='Effect intensity')
+    parser.add_argument('--json', help='Write results as JSON to this path')
+
+    args = parser.parse_args()
+
+    names = [n.strip().lower() for n in args.resolutions.split(',')]
+    unknown = [n for n in names if n not in RESOLUTIONS]
+    if unknown:
+        print(f"Unknown resolutions: {', '.join(unknown)}")
+        return 1
+
+    results = benchmark(names, args.frames, args.intensity)
+
+    print(f"{'res':>6} {'legacy ms':>10} {'new ms':>8} {'speedup':>8} {'legacy MB':>10} {'new MB':>7} {'max diff':>9}")
+    for r in results:
+        print(f"{r['resolution']:>6} {r['legacy_ms']:>10.2f} {r['current_ms']:>8.2f} {r['speedup']:>7.2f}x "
+              f"{r['legacy_alloc_bytes'] / 1e6:>10.1f} {r['current_alloc_bytes'] / 1e6:>7.1f} "
+              f"{r['max_abs_diff']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
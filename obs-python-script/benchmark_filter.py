@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Filter and face tracking benchmark
+
+Runs the filter script outside OBS (through the obs_standin stand-in) and
+times every effect, a set of stacked effect chains and face tracking on
+synthetic face-movement clips, at resolutions from 480p to 4K.
+
+Results are written as JSON, one entry per case (e.g. ``effect:glow@1080p``)
+with p50/p95/p99 frame times. Given a baseline from an earlier --json run,
+every case whose p50 grew by more than --threshold is reported and the
+script exits with status 1, so a change that doubles per-frame cost shows
+up before it reaches a live show.
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+import obs_standin
+obs_standin.install()
+
+import snap_filter
+from snap_filter import FaceTracker, FrameAnalysis, PipelineStats, RollingStats, SnapFilter, TrackingTap
+
+RESOLUTIONS = {
+    '480p': (480, 854),
+    '720p': (720, 1280),
+    '1080p': (1080, 1920),
+    '1440p': (1440, 2560),
+    '4k': (2160, 3840),
+}
+
+EFFECTS = ['beauty', 'cartoon', 'glow', 'tint', 'edge', 'blur', 'face']
+
+CHAINS = [
+    ['beauty', 'tint'],
+    ['beauty', 'tint', 'glow'],
+    ['cartoon', 'tint'],
+    ['blur', 'edge'],
+]
+
+CLIPS = ['static', 'pan', 'shake', 'cut', 'pair']
+
+# Face used by the glow and face effects while timing effects
+BENCH_FACE = {'center_x': 0.5, 'center_y': 0.45, 'width': 0.25, 'height': 0.4, 'confidence': 1.0}
+
+def background(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """Smooth, noisy backdrop so effects and detection see some texture"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(40, 200, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    frame = cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+    noise = rng.integers(-12, 13, frame.shape, dtype=np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+def draw_face(frame: np.ndarray, cx: float, cy: float, size: float):
+    """Draw a simple frontal face: skin oval, brows, eyes, nose and mouth"""
+    h, w = frame.shape[:2]
+    fw = int(size * w / 2)
+    fh = int(fw * 1.3)
+    x, y = int(cx * w), int(cy * h)
+
+    cv2.ellipse(frame, (x, y), (fw, fh), 0, 0, 360, (120, 150, 200), -1)
+    for side in (-1, 1):
+        ex = x + side * fw * 2 // 5
+        ey = y - fh // 5
+        cv2.line(frame, (ex - fw // 5, ey - fh // 7), (ex + fw // 5, ey - fh // 7), (40, 50, 60), max(2, fw // 15))
+        cv2.ellipse(frame, (ex, ey), (fw // 6, fh // 14), 0, 0, 360, (250, 250, 250), -1)
+        cv2.circle(frame, (ex, ey), max(2, fw // 14), (30, 30, 30), -1)
+    cv2.line(frame, (x, y - fh // 10), (x, y + fh // 6), (90, 110, 160), max(2, fw // 20))
+    cv2.ellipse(frame, (x, y + fh * 2 // 5), (fw // 3, fh // 10), 0, 0, 180, (60, 60, 150), max(2, fw // 15))
+
+def face_positions(clip: str, index: int, frames: int) -> List[tuple]:
+    """(center_x, center_y, size) of each face in frame ``index`` of a clip"""
+    t = index / max(frames - 1, 1)
+    if clip == 'static':
+        return [(0.5, 0.5, 0.22)]
+    if clip == 'pan':
+        return [(0.2 + 0.6 * t, 0.5, 0.22)]
+    if clip == 'shake':
+        return [(0.5 + 0.08 * math.sin(index * 1.3), 0.5 + 0.05 * math.cos(index * 1.7), 0.22)]
+    if clip == 'cut':
+        # Jumps somewhere new every 15 frames
+        cut = np.random.default_rng(index // 15).uniform(0.25, 0.75, 2)
+        return [(float(cut[0]), float(cut[1]), 0.2)]
+    if clip == 'pair':
+        return [(0.3 + 0.1 * t, 0.5, 0.18), (0.7 - 0.1 * t, 0.5, 0.18)]
+    raise ValueError(f"Unknown clip: {clip}")
+
+def face_clip(clip: str, frames: int, height: int, width: int):
+    """Frames of a synthetic face-movement clip"""
+    backdrop = background(height, width)
+    for index in range(frames):
+        frame = backdrop.copy()
+        for cx, cy, size in face_positions(clip, index, frames):
+            draw_face(frame, cx, cy, size)
+        yield frame
+
+def make_filter(height: int, width: int, intensity: float) -> SnapFilter:
+    settings = obs_standin.settings({'intensity': intensity, 'enable_tracking': False})
+    filt = SnapFilter(obs_standin.Source('benchmark', width, height), settings)
+    filt.update(settings)
+    face = dict(snap_filter.DEFAULT_FACE_DATA, detected=True, faces=[BENCH_FACE], **BENCH_FACE)
+    filt.tracker._face_data = face
+    return filt
+
+def effect_step(filt: SnapFilter, name: str):
+    """Callable applying one effect to a frame, as the filter would"""
+    if name == 'face':
+        return filt.apply_face_effect
+    method = getattr(filt, f"apply_{name}")
+    return lambda frame: method(frame, FrameAnalysis(frame, filt.scratch))
+
+def time_frames(fn, frames: int) -> dict:
+    fn()  # warm up caches, tables and scratch buffers
+    stats = RollingStats(window=frames)
+    for _ in range(frames):
+        start = time.perf_counter()
+        fn()
+        stats.add((time.perf_counter() - start) * 1000)
+    return stats.summary()
+
+def benchmark_effects(names: List[str], frames: int, intensity: float) -> List[dict]:
+    results = []
+    for res in names:
+        height, width = RESOLUTIONS[res]
+        frame = background(height, width)
+        draw_face(frame, BENCH_FACE['center_x'], BENCH_FACE['center_y'], BENCH_FACE['width'])
+        filt = make_filter(height, width, intensity)
+
+        for effect in EFFECTS:
+            step = effect_step(filt, effect)
+            results.append(dict(case=f"effect:{effect}@{res}", **time_frames(lambda: step(frame), frames)))
+
+        for chain in CHAINS:
+            plan = filt.compile_chain(chain)
+            results.append(dict(case=f"chain:{'+'.join(chain)}@{res}",
+                                **time_frames(lambda: filt.run_chain(frame, plan), frames)))
+
+    return results
+
+def benchmark_tracking(names: List[str], frames: int, cascade) -> List[dict]:
+    results = []
+    for res in names:
+        height, width = RESOLUTIONS[res]
+        for clip in CLIPS:
+            tracker = FaceTracker(stats=PipelineStats(window=frames))
+            tracker.configure(obs_standin.settings())
+            tap = TrackingTap(tracker.working_width)
+            timings = RollingStats(window=frames)
+            found = 0
+
+            # Timed as in the filter: the tracking tap, then detection on it
+            for seq, frame in enumerate(face_clip(clip, frames, height, width)):
+                start = time.perf_counter()
+                small, source_width = tap.capture(frame)
+                tracker.detect_faces(small.array, seq, time.monotonic(), cascade, source_width)
+                small.release()
+                timings.add((time.perf_counter() - start) * 1000)
+                found += tracker.face_data['detected']
+
+            counters = tracker.stats.summary()['counters']
+            results.append(dict(
+                case=f"tracking:{clip}@{res}",
+                **timings.summary(),
+                detections=counters.get('detections', 0),
+                tracked_frames=counters.get('tracked_frames', 0),
+                face_rate=found / frames,
+            ))
+    return results
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> List[dict]:
+    """Cases whose p50 grew by more than ``threshold`` times the baseline"""
+    previous = {r['case']: r for r in baseline if 'p50_ms' in r}
+    regressions = []
+    for r in results:
+        old = previous.get(r['case'])
+        if old is None or 'p50_ms' not in r:
+            continue
+        ratio = r['p50_ms'] / max(old['p50_ms'], 1e-6)
+        if ratio > threshold:
+            regressions.append({'case': r['case'], 'baseline_p50_ms': old['p50_ms'],
+                                'p50_ms': r['p50_ms'], 'ratio': ratio})
+    return regressions
+
+def environment() -> Dict[str, object]:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'machine': platform.machine(),
+        'cpu_count': cv2.getNumberOfCPUs(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark filter effects and face tracking outside OBS')
+    parser.add_argument('--resolutions', default='480p,720p,1080p,4k',
+                        help=f"Comma-separated subset of {','.join(RESOLUTIONS)}")
+    parser.add_argument('--frames', type=int, default=20, help='Timed frames per case')
+    parser.add_argument('--intensity', type=float, default=0.5, help='Effect intensity')
+    parser.add_argument('--skip-effects', action='store_true', help='Only benchmark face tracking')
+    parser.add_argument('--skip-tracking', action='store_true', help='Only benchmark effects')
+    parser.add_argument('--json', help='Write results as JSON to this path')
+    parser.add_argument('--baseline', help='Earlier --json output to compare against')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='Slowdown ratio of p50 frame time reported as a regression')
+
+    args = parser.parse_args()
+
+    names = [n.strip().lower() for n in args.resolutions.split(',')]
+    unknown = [n for n in names if n not in RESOLUTIONS]
+    if unknown:
+        print(f"Unknown resolutions: {', '.join(unknown)}")
+        return 1
+
+    results = []
+    if not args.skip_effects:
+        results += benchmark_effects(names, args.frames, args.intensity)
+    if not args.skip_tracking:
+        try:
+            cascade, _ = snap_filter.load_face_cascade()
+        except (AttributeError, cv2.error):
+            cascade = None
+        if cascade is None:
+            print("⚠ No face cascade available, skipping tracking benchmarks")
+        else:
+            results += benchmark_tracking(names, args.frames, cascade)
+
+    print(f"{'case':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in results:
+        print(f"{r['case']:<32} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}"
+              + (f"  faces {r['face_rate']:.0%}" if 'face_rate' in r else ""))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        for r in regressions:
+            print(f"✗ {r['case']}: {r['baseline_p50_ms']:.2f} → {r['p50_ms']:.2f} ms ({r['ratio']:.2f}x)")
+        if not regressions:
+            print(f"✓ No case slower than {args.threshold:.2f}x the baseline")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'frames': args.frames,
+                       'results': results, 'regressions': regressions}, f, indent=2)
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+obspython stand-in
+
+A small in-memory replacement for the ``obspython`` module that OBS injects
+into its embedded interpreter, so snap_filter.py can be imported, configured
+and driven from plain Python (benchmarks, tests, offline tools).
+
+Settings objects behave like OBS data: values fall back to their defaults,
+and script_properties() builds inspectable Properties. Sources carry a name,
+a size and optionally a frame of pixels, and timers only run when
+``run_timers()`` is called.
+
+Graphics calls work on NumPy arrays: textures, texrenders and stage
+surfaces hold BGRA pixels, drawing a source copies its frame into the
+current render target, and ``pixels`` stands in for the ctypes libobs
+access snap_filter uses to map stage surfaces. ``render_frame()`` runs one
+video frame through a filter and returns what it drew. Mapping a surface
+staged in the same frame, which would stall a real GPU, is counted in
+``graphics.stalls``.
+
+Call ``install()`` before importing snap_filter:
+
+    import obs_standin
+    obs_standin.install()
+    import snap_filter
+"""
+
+import sys
+
+import numpy as np
+
+# Property and combo constants (values only need to be distinct)
+OBS_COMBO_TYPE_EDITABLE = 0
+OBS_COMBO_TYPE_LIST = 1
+OBS_COMBO_FORMAT_INT = 1
+OBS_COMBO_FORMAT_FLOAT = 2
+OBS_COMBO_FORMAT_STRING = 3
+OBS_TEXT_DEFAULT = 0
+OBS_TEXT_PASSWORD = 1
+OBS_TEXT_MULTILINE = 2
+OBS_TEXT_INFO = 3
+OBS_PATH_FILE = 0
+OBS_PATH_FILE_SAVE = 1
+OBS_PATH_DIRECTORY = 2
+LOG_ERROR = 100
+LOG_WARNING = 200
+LOG_INFO = 300
+LOG_DEBUG = 400
+GS_RGBA = 3
+GS_BGRA = 5
+GS_ZS_NONE = 0
+GS_CLEAR_COLOR = 1
+GS_DYNAMIC = 2
+OBS_EFFECT_DEFAULT = 0
+
+class Data:
+    """Settings object: explicit values with per-key defaults"""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.defaults = {}
+
+    def get(self, name, fallback):
+        if name in self.values:
+            return self.values[name]
+        return self.defaults.get(name, fallback)
+
+class Property:
+    def __init__(self, kind, name, description, **options):
+        self.kind = kind
+        self.name = name
+        self.description = description
+        self.options = options
+        self.items = []
+        self.default = None
+
+class Properties:
+    def __init__(self):
+        self.items = {}
+
+    def add(self, prop):
+        self.items[prop.name] = prop
+        return prop
+
+class Source:
+    """A video source with a name and base size
+
+    ``frame`` is the BGR image the source draws; a filter source's
+    ``target`` is the source it filters.
+    """
+
+    def __init__(self, name="source", width=1920, height=1080, frame=None, target=None):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.frame = frame
+        self.target = target
+
+# Settings
+def obs_data_create():
+    return Data()
+
+def obs_data_release(data):
+    pass
+
+def _set_default(data, name, value):
+    data.defaults[name] = value
+
+def _set(data, name, value):
+    data.values[name] = value
+
+obs_data_set_default_bool = obs_data_set_default_int = _set_default
+obs_data_set_default_double = obs_data_set_default_string = _set_default
+obs_data_set_bool = obs_data_set_int = obs_data_set_double = obs_data_set_string = _set
+
+def obs_data_get_bool(data, name):
+    return bool(data.get(name, False))
+
+def obs_data_get_int(data, name):
+    return int(data.get(name, 0))
+
+def obs_data_get_double(data, name):
+    return float(data.get(name, 0.0))
+
+def obs_data_get_string(data, name):
+    return str(data.get(name, ""))
+
+# Properties
+def obs_properties_create():
+    return Properties()
+
+def obs_properties_get(props, name):
+    return props.items.get(name)
+
+def obs_properties_add_bool(props, name, description):
+    return props.add(Property('bool', name, description))
+
+def obs_properties_add_int(props, name, description, minimum, maximum, step):
+    return props.add(Property('int', name, description, min=minimum, max=maximum, step=step))
+
+def obs_properties_add_int_slider(props, name, description, minimum, maximum, step):
+    return props.add(Property('int', name, description, min=minimum, max=maximum, step=step))
+
+def obs_properties_add_float(props, name, description, minimum, maximum, step):
+    return props.add(Property('float', name, description, min=minimum, max=maximum, step=step))
+
+def obs_properties_add_float_slider(props, name, description, minimum, maximum, step):
+    return props.add(Property('float', name, description, min=minimum, max=maximum, step=step))
+
+def obs_properties_add_text(props, name, description, text_type):
+    return props.add(Property('text', name, description, text_type=text_type))
+
+def obs_properties_add_path(props, name, description, path_type, filter_string, default_path):
+    return props.add(Property('path', name, description, path_type=path_type,
+                              filter=filter_string, default_path=default_path))
+
+def obs_properties_add_list(props, name, description, combo_type, combo_format):
+    return props.add(Property('list', name, description, combo_type=combo_type,
+                              combo_format=combo_format))
+
+def obs_properties_add_color(props, name, description):
+    return props.add(Property('color', name, description))
+
+def obs_properties_add_button(props, name, text, callback):
+    return props.add(Property('button', name, text, callback=callback))
+
+def obs_property_list_add_string(prop, name, value):
+    prop.items.append((name, value))
+
+def obs_property_set_default_value(prop, value):
+    prop.default = value
+
+def obs_property_set_description(prop, description):
+    prop.description = description
+
+# Sources and rendering
+def obs_source_get_name(source):
+    return getattr(source, 'name', None)
+
+def obs_source_get_base_width(source):
+    return getattr(source, 'width', 0)
+
+def obs_source_get_base_height(source):
+    return getattr(source, 'height', 0)
+
+def obs_filter_get_target(source):
+    return source.target if getattr(source, 'target', None) is not None else source
+
+def obs_source_video_render(source):
+    frame = getattr(source, 'frame', None)
+    if frame is not None and graphics.targets:
+        target = graphics.targets[-1].array
+        target[:, :, :3] = frame
+        target[:, :, 3] = 255
+
+def obs_source_skip_video_filter(source):
+    pass
+
+def obs_script_log(level, message):
+    print(message)
+
+# Graphics
+class Texture:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.array = np.zeros((height, width, 4), dtype=np.uint8)
+
+class TexRender:
+    def __init__(self):
+        self.texture = None
+
+class StageSurface:
+    """Staged copy of a texture, with rows padded like real drivers do"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.linesize = (width * 4 + 63) // 64 * 64
+        self.rows = np.zeros((height, self.linesize), dtype=np.uint8)
+        self.staged_frame = None
+        self.mapped = False
+
+class Effect:
+    def __init__(self):
+        self.params = {}
+        self.looping = False
+
+class GraphicsState:
+    def __init__(self):
+        self.frame = 0
+        self.targets = []
+        self.output = None
+        self.stalls = 0
+        self.maps = 0
+        self.base_effect = Effect()
+
+graphics = GraphicsState()
+
+class vec4:
+    def __init__(self):
+        self.x = self.y = self.z = self.w = 0.0
+
+def vec4_zero(v):
+    v.x = v.y = v.z = v.w = 0.0
+
+def obs_enter_graphics():
+    pass
+
+def obs_leave_graphics():
+    pass
+
+def gs_texture_create(width, height, color_format, levels, data, flags):
+    return Texture(width, height)
+
+def gs_texture_destroy(texture):
+    pass
+
+def gs_texrender_create(color_format, zstencil_format):
+    return TexRender()
+
+def gs_texrender_destroy(texrender):
+    pass
+
+def gs_texrender_reset(texrender):
+    pass
+
+def gs_texrender_begin(texrender, width, height):
+    if texrender.texture is None or (texrender.texture.width, texrender.texture.height) != (width, height):
+        texrender.texture = Texture(width, height)
+    graphics.targets.append(texrender.texture)
+    return True
+
+def gs_texrender_end(texrender):
+    graphics.targets.pop()
+
+def gs_texrender_get_texture(texrender):
+    return texrender.texture
+
+def gs_stagesurface_create(width, height, color_format):
+    return StageSurface(width, height)
+
+def gs_stagesurface_destroy(surface):
+    pass
+
+def gs_stage_texture(surface, texture):
+    surface.rows[:, :texture.width * 4] = texture.array.reshape(texture.height, -1)
+    surface.staged_frame = graphics.frame
+
+def gs_clear(flags, color, depth, stencil):
+    if graphics.targets:
+        graphics.targets[-1].array[:] = 0
+
+def gs_ortho(left, right, top, bottom, znear, zfar):
+    pass
+
+def obs_get_base_effect(effect_type):
+    return graphics.base_effect
+
+def gs_effect_get_param_by_name(effect, name):
+    return effect.params.setdefault(name, {'name': name, 'texture': None})
+
+def gs_effect_set_texture(param, texture):
+    param['texture'] = texture
+
+def gs_effect_loop(effect, technique):
+    # One pass per loop, as for the default effect's Draw technique
+    effect.looping = not effect.looping
+    return effect.looping
+
+def gs_draw_sprite(texture, flags, width, height):
+    texture = texture or graphics.base_effect.params['image']['texture']
+    if graphics.targets:
+        np.copyto(graphics.targets[-1].array, texture.array)
+    else:
+        graphics.output = texture.array.copy()
+
+class Pixels:
+    """Stage surface mapping and texture upload on NumPy arrays"""
+
+    def map(self, surface, height):
+        graphics.maps += 1
+        if surface.staged_frame == graphics.frame:
+            graphics.stalls += 1
+        surface.mapped = True
+        return surface.rows[:height]
+
+    def unmap(self, surface):
+        surface.mapped = False
+
+    def set_image(self, texture, pixels):
+        np.copyto(texture.array, pixels)
+
+pixels = Pixels()
+
+def render_frame(filter_obj):
+    """Render one video frame through ``filter_obj``; returns the BGRA image drawn"""
+    import snap_filter
+    graphics.frame += 1
+    graphics.output = None
+    snap_filter.filter_video_render(filter_obj, None)
+    return graphics.output
+
+# Timers
+timers = []
+
+def timer_add(callback, ms):
+    timers.append((callback, ms))
+
+def timer_remove(callback):
+    timers[:] = [t for t in timers if t[0] is not callback]
+
+def run_timers():
+    """Fire every registered timer once"""
+    for callback, _ in list(timers):
+        callback()
+
+def install():
+    """Register this module as ``obspython`` unless the real one is present
+
+    Returns the module that ``import obspython`` will now give.
+    """
+    module = sys.modules.get('obspython')
+    if module is None:
+        module = sys.modules[__name__]
+        sys.modules['obspython'] = module
+
+    # snap_filter imported earlier fell back to obs = None
+    snap_filter = sys.modules.get('snap_filter')
+    if snap_filter is not None and snap_filter.obs is None:
+        snap_filter.obs = module
+    return module
+
+def settings(values=None):
+    """Script settings with every snap_filter default applied, then ``values``"""
+    import snap_filter
+    data = Data(values)
+    snap_filter.script_defaults(data)
+    return data
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Offline filter replay
+
+Feeds the frames of a video file or image sequence through
+SnapFilter.process_frame and the face tracking stack outside OBS (through
+the obs_standin stand-in), so field performance problems can be replayed
+and filtered clips rendered in batch.
+
+Decoding runs ahead on its own thread, frames are either paced at the
+source frame rate or processed as fast as possible, and the filtered video
+plus per-frame timings can be written out. With ``--tracking sync`` (the
+default) each frame's detection runs inline right after the frame is
+filtered, so the next frame sees its result. Its detection interval is
+pinned (``--detection-interval``) rather than adapted to measured
+detection times, and OpenCV's random seed is reset, so every run over the
+same input produces the same output. ``--tracking pool`` uses the tracking
+worker threads and adaptive schedule as OBS does. Several inputs can be
+rendered in parallel with --jobs.
+"""
+
+import sys
+import json
+import glob
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import obs_standin
+obs_standin.install()
+
+import snap_filter
+from snap_filter import RollingStats, frame_pixels, release_frame
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+def image_sequence(path: str) -> List[str]:
+    """Image files of a directory or glob pattern, in name order"""
+    if Path(path).is_dir():
+        files = [str(p) for p in Path(path).iterdir()]
+    else:
+        files = glob.glob(path)
+    return sorted(f for f in files if Path(f).suffix.lower() in IMAGE_EXTENSIONS)
+
+def open_frames(path: str, fps: Optional[float] = None) -> Tuple[Iterator[np.ndarray], float]:
+    """Decoded BGR frames of a video file or image sequence, and its frame rate"""
+    files = image_sequence(path) if (Path(path).is_dir() or glob.has_magic(path)) else None
+
+    if files is not None:
+        if not files:
+            raise ValueError(f"No images found in {path}")
+
+        def read_images():
+            for name in files:
+                frame = cv2.imread(name, cv2.IMREAD_COLOR)
+                if frame is None:
+                    raise ValueError(f"Could not read image: {name}")
+                yield frame
+
+        return read_images(), fps or 30.0
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+
+    def read_video():
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield frame
+        finally:
+            capture.release()
+
+    return read_video(), fps or capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+class DecodeAhead:
+    """Decodes frames on a background thread, up to ``depth`` frames ahead
+
+    Iterating yields the frames in order; ``depth`` 0 decodes inline.
+    """
+
+    _END = object()
+
+    def __init__(self, frames: Iterator[np.ndarray], depth: int = 4):
+        self.frames = frames
+        self.depth = depth
+        self.error = None
+
+    def _decode(self, out: queue.Queue, stop: threading.Event):
+        try:
+            for frame in self.frames:
+                if stop.is_set():
+                    return
+                out.put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            out.put(self._END)
+
+    def __iter__(self):
+        if self.depth <= 0:
+            yield from self.frames
+            return
+
+        out = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._decode, args=(out, stop),
+                                  name="snap-decode", daemon=True)
+        thread.start()
+        try:
+            while True:
+                frame = out.get()
+                if frame is self._END:
+                    break
+                yield frame
+        finally:
+            stop.set()
+            # Unblock the decoder if it is waiting on a full queue
+            while thread.is_alive():
+                try:
+                    out.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        if self.error is not None:
+            raise self.error
+
+def input_name(path: str) -> str:
+    """Short name of an input: the video's stem, or the image directory's name"""
+    if glob.has_magic(path):
+        return Path(path).parent.name
+    return Path(path.rstrip('/')).stem
+
+def parse_setting(text: str) -> Tuple[str, object]:
+    """KEY=VALUE, with VALUE read as JSON when it parses (numbers, booleans)"""
+    key, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {text!r}")
+    try:
+        return key.strip(), json.loads(value)
+    except ValueError:
+        return key.strip(), value
+
+def track_inline(tracker, cascade) -> float:
+    """Run detection on the tracker's queued frame now; milliseconds spent"""
+    item = tracker.mailbox.get(timeout=0)
+    if item is None:
+        return 0.0
+    seq, timestamp, frame = item
+    start = time.perf_counter()
+    try:
+        tracker.detect_faces(frame_pixels(frame), seq, timestamp, cascade)
+    finally:
+        release_frame(frame)
+    return (time.perf_counter() - start) * 1000
+
+def replay(path: str, options: dict) -> dict:
+    """Filter every frame of one input; returns the run summary"""
+    frames, fps = open_frames(path, options.get('fps'))
+
+    tracking = options.get('tracking', 'sync')
+    cascade = None
+    if tracking != 'off':
+        try:
+            cascade, snap_filter.face_cascade_path = snap_filter.load_face_cascade()
+        except (AttributeError, cv2.error):
+            cascade = None
+        if cascade is None:
+            print(f"⚠ No face cascade available, replaying {path} without tracking")
+            tracking = 'off'
+
+    if tracking != 'pool':
+        # Palette fitting seeds k-means from OpenCV's RNG
+        cv2.setRNGSeed(0)
+    
+    values = dict(options.get('settings') or {})
+    values['enable_tracking'] = tracking != 'off'
+    settings = obs_standin.settings(values)
+
+    pool = None
+    if tracking == 'pool':
+        snap_filter.face_cascade = cascade
+        pool = snap_filter.TrackingPool()
+    filt = snap_filter.SnapFilter(obs_standin.Source(input_name(path)), settings)
+    filt.update(settings)
+    filt.tracker.pool = pool
+    if tracking == 'sync':
+        filt.tracker.scheduler.fixed_interval = options.get('detection_interval') or 1
+
+    writer = None
+    records = []
+    process_times = RollingStats(window=1 << 20)
+    late_frames = 0
+    realtime = options.get('pace') == 'realtime'
+    started = time.perf_counter()
+    decode_start = started
+
+    try:
+        for index, frame in enumerate(DecodeAhead(frames, options.get('decode_ahead', 4))):
+            decode_wait_ms = (time.perf_counter() - decode_start) * 1000
+
+            if realtime:
+                # Hold each frame until its presentation time
+                delay = started + index / fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            start = time.perf_counter()
+            out = filt.process_frame(frame)
+            process_ms = (time.perf_counter() - start) * 1000
+            process_times.add(process_ms)
+
+            track_ms = track_inline(filt.tracker, cascade) if tracking == 'sync' else 0.0
+
+            if realtime and time.perf_counter() > started + (index + 1) / fps:
+                late_frames += 1
+
+            if options.get('output'):
+                if writer is None:
+                    height, width = out.shape[:2]
+                    writer = cv2.VideoWriter(options['output'], cv2.VideoWriter_fourcc(*'mp4v'),
+                                             fps, (width, height))
+                    if not writer.isOpened():
+                        raise ValueError(f"Could not write video: {options['output']}")
+                writer.write(out)
+
+            face = filt.tracker.face_data
+            records.append({
+                'frame': index,
+                'decode_wait_ms': decode_wait_ms,
+                'process_ms': process_ms,
+                'track_ms': track_ms,
+                'detected': face['detected'],
+                'faces': len(face.get('faces') or []),
+            })
+            decode_start = time.perf_counter()
+    finally:
+        if writer is not None:
+            writer.release()
+        if pool is not None:
+            pool.shutdown()
+        snap_filter.filter_destroy(filt)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'input': path,
+        'output': options.get('output'),
+        'frames': len(records),
+        'fps': fps,
+        'seconds': elapsed,
+        'throughput_fps': len(records) / elapsed if elapsed > 0 else 0.0,
+        'late_frames': late_frames,
+        'tracking': tracking,
+        'process_frame': process_times.summary(),
+        'stats': filt.stats_summary(),
+    }
+
+    if options.get('timings'):
+        with open(options['timings'], 'w') as f:
+            json.dump({'summary': summary, 'frames': records}, f, indent=2)
+
+    return summary
+
+def output_for(arg: Optional[str], path: str, suffix: str, many: bool) -> Optional[str]:
+    """Output file for one input: ``arg`` itself, or a file in the ``arg`` directory"""
+    if not arg:
+        return None
+    if not many:
+        return arg
+    Path(arg).mkdir(parents=True, exist_ok=True)
+    return str(Path(arg) / f"{input_name(path)}{suffix}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the filter pipeline over recorded video offline')
+    parser.add_argument('inputs', nargs='+',
+                        help='Video files, image directories or quoted image globs (e.g. "shots/*.png")')
+    parser.add_argument('-o', '--output', help='Output video (a directory when there are several inputs)')
+    parser.add_argument('--timings', help='Per-frame timings JSON (a directory when there are several inputs)')
+    parser.add_argument('--effect', help='Effect type, as in the script settings')
+    parser.add_argument('--chain', help='Comma-separated effect chain, e.g. "beauty, tint"')
+    parser.add_argument('--intensity', type=float, help='Effect intensity')
+    parser.add_argument('--set', dest='settings', type=parse_setting, action='append', default=[],
+                        metavar='KEY=VALUE', help='Any other script setting (repeatable)')
+    parser.add_argument('--tracking', choices=['sync', 'pool', 'off'], default='sync',
+                        help='Inline tracking on a fixed schedule, OBS-style worker threads, or none')
+    parser.add_argument('--detection-interval', type=int, default=1,
+                        help='Frames per face detection with --tracking sync (tracked in between)')
+    parser.add_argument('--pace', choices=['fast', 'realtime'], default='fast',
+                        help='Process as fast as possible or at the source frame rate')
+    parser.add_argument('--fps', type=float, help='Frame rate for image sequences or to override the video')
+    parser.add_argument('--decode-ahead', type=int, default=4,
+                        help='Frames decoded ahead on a background thread (0 decodes inline)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Inputs replayed in parallel processes')
+
+    args = parser.parse_args()
+
+    settings = dict(args.settings)
+    if args.effect:
+        settings['effect_type'] = args.effect
+    if args.chain:
+        settings['effect_chain'] = args.chain
+    if args.intensity is not None:
+        settings['intensity'] = args.intensity
+
+    many = len(args.inputs) > 1
+    jobs = []
+    for path in args.inputs:
+        jobs.append((path, {
+            'settings': settings,
+            'output': output_for(args.output, path, '_filtered.mp4', many),
+            'timings': output_for(args.timings, path, '_timings.json', many),
+            'tracking': args.tracking,
+            'detection_interval': args.detection_interval,
+            'pace': args.pace,
+            'fps': args.fps,
+            'decode_ahead': args.decode_ahead,
+        }))
+
+    summaries = []
+    failed = 0
+    if args.jobs > 1 and many:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [(path, pool.submit(replay, path, options)) for path, options in jobs]
+            for path, future in futures:
+                try:
+                    summaries.append(future.result())
+                except Exception as e:
+                    print(f"✗ {path}: {e}")
+                    failed += 1
+    else:
+        for path, options in jobs:
+            try:
+                summaries.append(replay(path, options))
+            except Exception as e:
+                print(f"✗ {path}: {e}")
+                failed += 1
+
+    print(f"{'input':<32} {'frames':>7} {'fps':>7} {'p50 ms':>8} {'p95 ms':>8} {'late':>5} {'drops':>6}")
+    for s in summaries:
+        timing = s['process_frame']
+        print(f"{input_name(s['input']):<32} {s['frames']:>7} {s['throughput_fps']:>7.1f} "
+              f"{timing.get('p50_ms', 0.0):>8.2f} {timing.get('p95_ms', 0.0):>8.2f} "
+              f"{s['late_frames']:>5} {s['stats']['dropped_frames']:>6}")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,15 +12,30 @@ Installation:
 3. Load this script in OBS Script dialog
 """
 
-import obspython as obs
+try:
+    import obspython as obs
+except ImportError:
+    # Detection worker processes import this module outside OBS
+    obs = None
 import cv2
 import numpy as np
 from PIL import Image
 import threading
-import queue
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import json
+import math
 import os
+import mmap
+import struct
+import sys
+import ctypes
+import ctypes.util
+import functools
+import shutil
+import multiprocessing
+from multiprocessing import shared_memory
 from pathlib import Path
 
 # Script metadata
@@ -30,20 +45,380 @@ SCRIPT_DESCRIPTION = "Face tracking and filter effects for OBS"
 
 # Global variables
 face_cascade = None
+face_cascade_path = None
 eye_cascade = None
-face_data = {
+tracking_pool = None
+filter_sources = {}
+stats_file = ""
+
+# Upper bound on tracked faces per source (also sizes the shared result block)
+MAX_TRACKED_FACES = 8
+
+# Initial face data for every tracker
+DEFAULT_FACE_DATA = {
     'detected': False,
     'center_x': 0.5,
     'center_y': 0.5,
     'width': 0.0,
     'height': 0.0,
     'rotation': 0.0,
-    'confidence': 0.0
+    'confidence': 0.0,
+    'faces': [],           # Every tracked face, primary (oldest) track first
+    'frame_seq': -1,       # Sequence number of the frame this data came from
+    'timestamp': None      # time.monotonic() when that frame was submitted
 }
-tracking_thread = None
-tracking_queue = queue.Queue()
-should_exit = False
-filter_sources = {}
+
+class RollingStats:
+    """Timing samples (ms) of one pipeline stage over a sliding window"""
+    
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+    
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+    
+    def summary(self):
+        if not self.samples:
+            return {'count': self.count}
+        p50, p95, p99 = np.percentile(self.samples, (50, 95, 99))
+        return {
+            'count': self.count,
+            'mean_ms': float(np.mean(self.samples)),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(max(self.samples)),
+        }
+
+class PipelineStats:
+    """Per-stage frame times, event counters and errors for one filter
+
+    Stages are timed with ``record`` (e.g. ``process_frame``, ``effect:glow``,
+    ``detect``, ``queue_wait``) into RollingStats windows; ``count`` tallies
+    events such as processed frames and detections, and ``error`` keeps the
+    last error alongside printing it. Written from the render thread and the
+    tracking workers; a lock keeps new stage names and summaries consistent.
+    The separate-process detection backend passes its worker's detect and
+    track timings back through SharedFaceResults and records them here.
+    """
+    
+    def __init__(self, window=300):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.stages = {}
+            self.counters = {}
+            self.errors = 0
+            self.last_error = None
+    
+    def record(self, stage, ms):
+        stats = self.stages.get(stage)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(stage, RollingStats(self.window))
+        stats.add(ms)
+    
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+    
+    def error(self, where, exc):
+        self.errors += 1
+        self.last_error = f"{where}: {exc}"
+        print(f"[{SCRIPT_NAME}] {where} error: {exc}")
+    
+    def summary(self):
+        with self._lock:
+            uptime = max(time.monotonic() - self.started, 1e-6)
+            counters = dict(self.counters)
+            return {
+                'uptime_s': uptime,
+                'stages': {name: stats.summary() for name, stats in sorted(self.stages.items())},
+                'counters': counters,
+                'rates_per_s': {name: n / uptime for name, n in counters.items()},
+                'errors': self.errors,
+                'last_error': self.last_error,
+            }
+
+class FrameMailbox:
+    """Bounded, latest-frame-wins handoff from the render path to tracking
+
+    put() never blocks: when the mailbox is full the oldest waiting frame is
+    dropped, so the tracker always works on the newest frame and memory
+    stays bounded however far detection falls behind. Every frame gets a
+    sequence number and submission timestamp that travel with its result.
+    """
+    
+    def __init__(self, capacity=1):
+        self._frames = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._next_seq = 0
+        self.dropped = 0
+    
+    def put(self, frame):
+        """Submit a frame, returning its sequence number"""
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+                release_frame(self._frames.popleft()[2])
+            seq = self._next_seq
+            self._next_seq += 1
+            self._frames.append((seq, time.monotonic(), frame))
+            self._cond.notify()
+        return seq
+    
+    def get(self, timeout=None):
+        """Take the oldest waiting (seq, timestamp, frame), or None on timeout"""
+        with self._cond:
+            if not self._frames and not self._cond.wait_for(lambda: self._frames, timeout):
+                return None
+            return self._frames.popleft()
+    
+    @property
+    def pending(self):
+        return len(self._frames)
+    
+    def clear(self):
+        with self._cond:
+            while self._frames:
+                release_frame(self._frames.popleft()[2])
+
+class FrameBuffer:
+    """One preallocated frame handed out by a FrameRing, reference counted
+
+    ``array`` is a NumPy view into the ring's storage. Acquiring a buffer
+    gives the caller one reference; pass it to another stage with
+    ``retain()`` and have every holder call ``release()`` when done. The
+    slot goes back to the ring when the last reference is released.
+    """
+    
+    __slots__ = ('ring', 'index', 'generation', 'array', 'refs')
+    
+    def __init__(self, ring, index, generation, array):
+        self.ring = ring
+        self.index = index
+        self.generation = generation
+        self.array = array
+        self.refs = 0
+    
+    def retain(self):
+        if self.ring is not None:
+            self.ring._retain(self)
+        return self
+    
+    def release(self):
+        if self.ring is not None:
+            self.ring._release(self)
+
+class FrameRing:
+    """Preallocated frame buffers shared by the capture, tracking and effect stages
+
+    Every slot lives in one (slots, height, width, channels) array that is
+    allocated when a frame shape is first seen or changes, so steady-state
+    streaming allocates no pixel memory. When every slot is still held,
+    ``acquire`` returns a one-off buffer and counts it in ``overflows``
+    instead of blocking the render thread.
+    """
+    
+    def __init__(self, slots=4):
+        self.slots = slots
+        self.shape = None
+        self.dtype = None
+        self.overflows = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._free = deque()
+    
+    def _allocate(self, shape, dtype):
+        # Buffers from the previous generation are simply not returned to the pool
+        self._generation += 1
+        storage = np.empty((self.slots,) + shape, dtype=dtype)
+        self._free = deque(FrameBuffer(self, i, self._generation, storage[i])
+                           for i in range(self.slots))
+        self.shape = shape
+        self.dtype = dtype
+    
+    def acquire(self, shape, dtype=np.uint8):
+        """A free buffer of ``shape``, holding one reference for the caller"""
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        with self._lock:
+            if shape != self.shape or dtype != self.dtype:
+                self._allocate(shape, dtype)
+            if self._free:
+                buffer = self._free.popleft()
+                buffer.refs = 1
+                return buffer
+            self.overflows += 1
+        
+        buffer = FrameBuffer(None, -1, 0, np.empty(shape, dtype=dtype))
+        buffer.refs = 1
+        return buffer
+    
+    def acquire_copy(self, frame):
+        """A buffer holding a copy of ``frame``"""
+        buffer = self.acquire(frame.shape, frame.dtype)
+        np.copyto(buffer.array, frame)
+        return buffer
+    
+    @property
+    def available(self):
+        return len(self._free)
+    
+    def _retain(self, buffer):
+        with self._lock:
+            buffer.refs += 1
+    
+    def _release(self, buffer):
+        with self._lock:
+            buffer.refs -= 1
+            if buffer.refs == 0 and buffer.generation == self._generation:
+                self._free.append(buffer)
+
+def release_frame(frame):
+    """Drop a stage's reference to ``frame`` if it came from a FrameRing"""
+    if isinstance(frame, FrameBuffer):
+        frame.release()
+
+def frame_pixels(frame):
+    """The NumPy array behind a frame or FrameBuffer"""
+    return frame.array if isinstance(frame, FrameBuffer) else frame
+
+class ScratchBuffers:
+    """Named work arrays reused from frame to frame
+
+    Effects write their temporaries and results into these through OpenCV
+    ``dst=`` arguments instead of allocating new full-frame arrays; an
+    array is only reallocated when the requested shape or dtype changes.
+    """
+    
+    def __init__(self):
+        self._arrays = {}
+    
+    def get(self, name, shape, dtype=np.uint8):
+        array = self._arrays.get(name)
+        if array is None or array.shape != tuple(shape) or array.dtype != dtype:
+            array = np.empty(shape, dtype=dtype)
+            self._arrays[name] = array
+        return array
+
+def default_tracking_workers():
+    """Tracking threads for this machine, leaving cores for OBS rendering and encoding"""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+class TrackingPool:
+    """Bounded worker threads shared by the face trackers of every source
+
+    A tracker is scheduled when a frame arrives and it is not already
+    queued or running, so each tracker is handled by one worker at a time
+    and the number of detection threads stays at ``workers`` however many
+    sources carry the filter. A worker processes one frame per turn and
+    requeues the tracker behind the others if more are waiting, so a busy
+    source cannot starve the rest.
+    """
+    
+    def __init__(self, workers=None):
+        self.workers = workers or default_tracking_workers()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="snap-tracking")
+        self._lock = threading.Lock()
+        self._scheduled = set()
+        self._closed = False
+        self._local = threading.local()
+    
+    def schedule(self, tracker):
+        with self._lock:
+            if self._closed or tracker in self._scheduled:
+                return
+            self._scheduled.add(tracker)
+            self._executor.submit(self._run, tracker)
+    
+    def _cascade(self):
+        # CascadeClassifier is not safe to share between threads, so each
+        # worker loads its own copy
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None and face_cascade_path:
+            cascade = cv2.CascadeClassifier(face_cascade_path)
+            self._local.cascade = cascade
+        return cascade
+    
+    def _run(self, tracker):
+        try:
+            item = tracker.mailbox.get(timeout=0)
+            if item is not None:
+                seq, timestamp, frame = item
+                try:
+                    cascade = self._cascade()
+                    if frame is not None and cascade is not None:
+                        tracker.detect_faces(frame_pixels(frame), seq, timestamp, cascade)
+                finally:
+                    release_frame(frame)
+        except Exception as e:
+            tracker.stats.error("Tracking", e)
+        finally:
+            with self._lock:
+                if tracker.mailbox.pending and not self._closed:
+                    self._executor.submit(self._run, tracker)
+                else:
+                    self._scheduled.discard(tracker)
+    
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+# Packed lens bundle written by snap_lens_converter.py --bundle
+BUNDLE_MAGIC = b"SNAPLENS"
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<8sIIQQ')  # magic, version, reserved, toc offset, toc length
+
+class LensBundle:
+    """Memory-mapped lens bundle
+
+    The file is mapped read-only, so opening a bundle only parses its table
+    of contents; texture pixels are paged in on first access. Textures are
+    returned as zero-copy (height, width, 4) RGBA NumPy views into the map.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, _, toc_offset, toc_length = BUNDLE_HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            self._map.close()
+            raise ValueError(f"Not a version {BUNDLE_VERSION} lens bundle: {path}")
+        
+        toc = json.loads(self._map[toc_offset:toc_offset + toc_length])
+        self.info = toc['info']
+        self.entries = {entry['name']: entry for entry in toc['entries']}
+    
+    def texture_names(self):
+        return [name for name, e in self.entries.items() if e['kind'] == 'texture']
+    
+    def texture(self, name):
+        """Zero-copy read-only RGBA view of a texture"""
+        entry = self.entries[name]
+        pixels = np.frombuffer(self._map, dtype=np.uint8,
+                               count=entry['length'], offset=entry['offset'])
+        return pixels.reshape(entry['height'], entry['width'], entry['channels'])
+    
+    def shader(self, name):
+        entry = self.entries[name]
+        return self._map[entry['offset']:entry['offset'] + entry['length']].decode('utf-8')
+    
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # Texture views are still alive; the map closes once they are freed
+            pass
 
 # Source callbacks
 def script_description():
@@ -76,6 +451,25 @@ def script_properties():
     obs.obs_property_list_add_string(effect_list, "Edge Detection", "edge")
     obs.obs_property_list_add_string(effect_list, "Blur", "blur")
     
+    # Color saturation, applied at the end of the effect chain
+    obs.obs_properties_add_float_slider(
+        props, "saturation", "Saturation", 0.0, 2.0, 0.01
+    )
+    
+    # Stacked effects
+    obs.obs_properties_add_text(
+        props, "effect_chain", "Effect Chain (e.g. beauty, tint, glow)", obs.OBS_TEXT_DEFAULT
+    )
+    
+    # Cartoon color quantizer
+    quantizer_list = obs.obs_properties_add_list(
+        props, "cartoon_quantizer", "Cartoon Colors",
+        obs.OBS_COMBO_TYPE_LIST, obs.OBS_COMBO_FORMAT_STRING
+    )
+    obs.obs_property_list_add_string(quantizer_list, "Fitted Palette", "palette")
+    obs.obs_property_list_add_string(quantizer_list, "Posterize", "posterize")
+    obs.obs_property_list_add_string(quantizer_list, "Bilateral Stack", "bilateral")
+    
     # Color tint
     color = obs.obs_properties_add_color(props, "tint_color", "Tint Color")
     obs.obs_property_set_default_value(color, 0xFFFFFFFF)
@@ -92,48 +486,158 @@ def script_properties():
     )
     obs.obs_property_set_default_value(confidence, 0.5)
     
+    # Detection scheduling
+    obs.obs_properties_add_int_slider(
+        props, "max_detection_interval", "Max Frames Between Detections", 1, 60, 1
+    )
+    obs.obs_properties_add_float_slider(
+        props, "tracking_budget_ms", "Tracking CPU Budget (ms/frame)", 0.5, 50.0, 0.5
+    )
+    
+    # Multi-face tracking
+    obs.obs_properties_add_int_slider(
+        props, "max_faces", "Max Tracked Faces", 1, MAX_TRACKED_FACES, 1
+    )
+    
+    # Where detection runs
+    backend_list = obs.obs_properties_add_list(
+        props, "detection_backend", "Detection Backend",
+        obs.OBS_COMBO_TYPE_LIST, obs.OBS_COMBO_FORMAT_STRING
+    )
+    obs.obs_property_list_add_string(backend_list, "Worker Threads", "thread")
+    obs.obs_property_list_add_string(backend_list, "Separate Process", "process")
+    
+    # Detection resolution
+    obs.obs_properties_add_int_slider(
+        props, "detection_width", "Detection Width (px, 0 = full frame)", 0, 1920, 32
+    )
+    obs.obs_properties_add_int_slider(
+        props, "full_scan_interval", "Detections Between Full-Frame Scans", 1, 120, 1
+    )
+    
+    # GPU readback depth: more buffers never stall rendering but add latency
+    obs.obs_properties_add_int_slider(
+        props, "readback_buffers", "Readback Buffers (frames of latency + 1)", 2, 4, 1
+    )
+    
     # Lens file selector
     lens_path = obs.obs_properties_add_path(
         props, "lens_file", "Lens File (Optional)", 
-        obs.OBS_PATH_FILE, "Lens files (*.lns *.zip *.json);;All files (*.*)", 
+        obs.OBS_PATH_FILE, "Lens files (*.lns *.zip *.json *.snapbundle);;All files (*.*)", 
         ""
     )
     
+    # Live pipeline stats (read-only)
+    obs.obs_properties_add_text(props, "stats_info", format_stats(stats_report()), obs.OBS_TEXT_INFO)
+    obs.obs_properties_add_button(props, "refresh_stats", "Refresh Stats", on_refresh_stats)
+    obs.obs_properties_add_path(
+        props, "stats_file", "Stats JSON File (Optional)",
+        obs.OBS_PATH_FILE_SAVE, "JSON files (*.json)", ""
+    )
+    obs.obs_properties_add_int_slider(
+        props, "stats_interval", "Stats File Interval (s)", 1, 300, 1
+    )
+    
     return props
 
+def on_refresh_stats(props, prop):
+    info = obs.obs_properties_get(props, "stats_info")
+    obs.obs_property_set_description(info, format_stats(stats_report()))
+    return True
+
+def stats_report():
+    """Stats of every active filter, keyed by source name"""
+    report = {}
+    for filter_obj in list(filter_sources.values()):
+        summary = filter_obj.stats_summary()
+        report[summary.pop('name')] = summary
+    return report
+
+def format_stats(report):
+    """Compact text form of ``stats_report()`` for the properties panel"""
+    if not report:
+        return "No active filters"
+    
+    lines = []
+    for name, summary in report.items():
+        counters = summary['counters']
+        rates = summary['rates_per_s']
+        age = summary['tracking_age_s']
+        lines.append(f"{name}: {rates.get('frames', 0.0):.1f} fps, "
+                     f"{rates.get('detections', 0.0):.1f} detections/s, "
+                     f"{summary['dropped_frames']} dropped, "
+                     f"tracking age {'-' if age is None else f'{age * 1000:.0f} ms'}, "
+                     f"{summary['errors']} errors")
+        for stage, stats in summary['stages'].items():
+            if 'p50_ms' in stats:
+                lines.append(f"  {stage}: p50 {stats['p50_ms']:.1f} / p95 {stats['p95_ms']:.1f} / "
+                             f"p99 {stats['p99_ms']:.1f} ms")
+        if summary['last_error']:
+            lines.append(f"  last error: {summary['last_error']}")
+    return "\n".join(lines)
+
+def dump_stats():
+    """Timer callback: write ``stats_report()`` to the stats file"""
+    if not stats_file:
+        return
+    try:
+        tmp_path = stats_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'time': time.time(), 'filters': stats_report()}, f, indent=2)
+        os.replace(tmp_path, stats_file)
+    except OSError as e:
+        print(f"[{SCRIPT_NAME}] Could not write stats file: {e}")
+
 def script_defaults(settings):
     obs.obs_data_set_default_bool(settings, "enable_tracking", True)
     obs.obs_data_set_default_double(settings, "intensity", 0.5)
     obs.obs_data_set_default_string(settings, "effect_type", "beauty")
+    obs.obs_data_set_default_string(settings, "cartoon_quantizer", "palette")
+    obs.obs_data_set_default_string(settings, "effect_chain", "")
+    obs.obs_data_set_default_double(settings, "saturation", 1.0)
     obs.obs_data_set_default_int(settings, "tint_color", 0xFFFFFFFF)
     obs.obs_data_set_default_double(settings, "smoothing", 0.3)
     obs.obs_data_set_default_double(settings, "confidence", 0.5)
+    obs.obs_data_set_default_int(settings, "max_detection_interval", 10)
+    obs.obs_data_set_default_double(settings, "tracking_budget_ms", 5.0)
+    obs.obs_data_set_default_int(settings, "max_faces", 4)
+    obs.obs_data_set_default_string(settings, "detection_backend", "thread")
+    obs.obs_data_set_default_int(settings, "detection_width", 640)
+    obs.obs_data_set_default_int(settings, "full_scan_interval", 30)
+    obs.obs_data_set_default_int(settings, "readback_buffers", 3)
+    obs.obs_data_set_default_string(settings, "stats_file", "")
+    obs.obs_data_set_default_int(settings, "stats_interval", 10)
+
+def load_face_cascade():
+    """The first frontal-face Haar cascade that loads, as (classifier, path)
+
+    Returns (None, None) when none of the usual locations has one.
+    """
+    cascade_paths = [
+        cv2.data.haarcascades + "haarcascade_frontalface_default.xml",  # cv2 package data
+        "/usr/share/opencv4/haarcascades/haarcascade_frontalface_default.xml",
+        "/usr/share/opencv/haarcascades/haarcascade_frontalface_default.xml",
+        "/usr/local/share/opencv4/haarcascades/haarcascade_frontalface_default.xml",
+    ]
+    
+    for path in cascade_paths:
+        if os.path.exists(path):
+            cascade = cv2.CascadeClassifier(path)
+            if not cascade.empty():
+                return cascade, path
+    return None, None
 
 def script_load(settings):
-    global face_cascade, eye_cascade, should_exit
+    global face_cascade, face_cascade_path, eye_cascade, tracking_pool
     
     print(f"[{SCRIPT_NAME}] Loading script...")
     
     # Initialize face detection
     try:
-        # Try to load Haar cascades from various locations
-        cascade_paths = [
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml",  # cv2 package data
-            "/usr/share/opencv4/haarcascades/haarcascade_frontalface_default.xml",
-            "/usr/share/opencv/haarcascades/haarcascade_frontalface_default.xml",
-            "/usr/local/share/opencv4/haarcascades/haarcascade_frontalface_default.xml",
-        ]
-        
-        cascade_loaded = False
-        for path in cascade_paths:
-            if os.path.exists(path):
-                face_cascade = cv2.CascadeClassifier(path)
-                if not face_cascade.empty():
-                    print(f"[{SCRIPT_NAME}] Loaded face cascade from: {path}")
-                    cascade_loaded = True
-                    break
-        
-        if not cascade_loaded:
+        face_cascade, face_cascade_path = load_face_cascade()
+        if face_cascade is not None:
+            print(f"[{SCRIPT_NAME}] Loaded face cascade from: {face_cascade_path}")
+        else:
             print(f"[{SCRIPT_NAME}] Warning: Could not load face detection cascade")
             print(f"[{SCRIPT_NAME}] Please install: sudo apt-get install opencv-data")
             return
@@ -142,98 +646,1437 @@ def script_load(settings):
         print(f"[{SCRIPT_NAME}] Error initializing face detection: {e}")
         return
     
-    # Start tracking thread
-    should_exit = False
-    tracking_thread = threading.Thread(target=tracking_loop)
-    tracking_thread.daemon = True
-    tracking_thread.start()
+    # Start the tracking workers shared by all sources
+    tracking_pool = TrackingPool()
+    print(f"[{SCRIPT_NAME}] Face tracking pool started with {tracking_pool.workers} workers")
     
     print(f"[{SCRIPT_NAME}] Script loaded successfully")
 
 def script_unload():
-    global should_exit
+    global tracking_pool
     
     print(f"[{SCRIPT_NAME}] Unloading script...")
-    should_exit = True
     
-    if tracking_thread and tracking_thread.is_alive():
-        tracking_thread.join(timeout=1.0)
+    obs.timer_remove(dump_stats)
+    
+    if tracking_pool is not None:
+        tracking_pool.shutdown()
+        tracking_pool = None
+    
+    # Stop any detection worker processes
+    for filter_obj in filter_sources.values():
+        filter_obj.tracker.close()
     
     print(f"[{SCRIPT_NAME}] Script unloaded")
 
-def tracking_loop():
-    """Background thread for face detection"""
-    global face_data, should_exit
+class TemplateTracker:
+    """Follows a face between detections by template matching near its last box
+
+    The face patch from the last detection is scaled down to about
+    ``template_size`` pixels and searched for only inside the previous box
+    expanded by ``search_margin``, which costs a small fraction of a
+    full-frame detectMultiScale.
+    """
     
-    print(f"[{SCRIPT_NAME}] Face tracking thread started")
+    def __init__(self, search_margin=0.5, template_size=48):
+        self.search_margin = search_margin
+        self.template_size = template_size
+        self.box = None
+        self.template = None
+        self.scale = 1.0
     
-    while not should_exit:
-        try:
-            # Get frame from queue (non-blocking)
-            try:
-                frame_data = tracking_queue.get(timeout=0.1)
-            except queue.Empty:
+    @property
+    def active(self):
+        return self.box is not None
+    
+    def reset(self, gray, box):
+        x, y, w, h = (int(v) for v in box)
+        self.box = (x, y, w, h)
+        self.scale = min(1.0, self.template_size / max(w, h))
+        patch = gray[y:y + h, x:x + w]
+        if self.scale < 1.0:
+            patch = cv2.resize(patch, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA)
+        self.template = patch
+    
+    def clear(self):
+        self.box = None
+        self.template = None
+    
+    def track(self, gray):
+        """Return (box, score) of the best match near the last box, or (None, 0.0)"""
+        if self.box is None:
+            return None, 0.0
+        
+        x, y, w, h = self.box
+        frame_h, frame_w = gray.shape[:2]
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        
+        search = gray[y0:y1, x0:x1]
+        if self.scale < 1.0:
+            search = cv2.resize(search, None, fx=self.scale, fy=self.scale,
+                                interpolation=cv2.INTER_AREA)
+        th, tw = self.template.shape[:2]
+        if search.shape[0] < th or search.shape[1] < tw:
+            return None, 0.0
+        
+        scores = cv2.matchTemplate(search, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(scores)
+        self.box = (x0 + int(loc[0] / self.scale), y0 + int(loc[1] / self.scale), w, h)
+        return self.box, float(score)
+
+class DetectionScheduler:
+    """Chooses per frame between full detection, cheap tracking and skipping
+
+    The Haar detector runs every ``interval`` frames, or immediately once
+    tracking confidence falls below ``min_confidence``; frames in between
+    are handled by the template tracker. ``interval`` adapts so the average
+    tracking cost per frame stays within ``budget_ms``, capped at
+    ``max_interval``. Setting ``fixed_interval`` pins it instead, so the
+    schedule does not depend on how fast this machine is.
+    """
+    
+    EMA_ALPHA = 0.2
+    
+    def __init__(self, max_interval=10, budget_ms=5.0, min_confidence=0.5):
+        self.max_interval = max_interval
+        self.budget_ms = budget_ms
+        self.min_confidence = min_confidence
+        self.interval = 1
+        self.fixed_interval = None
+        self.frames_since_detection = 0
+        self.force_detection = True
+        self.detect_ms = None
+        self.track_ms = None
+    
+    def next_action(self, tracker_active):
+        """'detect', 'track' or 'skip' for the next frame"""
+        if self.force_detection or self.frames_since_detection >= self.interval:
+            return 'detect'
+        return 'track' if tracker_active else 'skip'
+    
+    def record_detection(self, elapsed_ms):
+        self.detect_ms = self._ema(self.detect_ms, elapsed_ms)
+        # The detecting frame is the first of the interval
+        self.frames_since_detection = 1
+        self.force_detection = False
+        self._adapt()
+    
+    def record_tracking(self, elapsed_ms, confidence):
+        self.track_ms = self._ema(self.track_ms, elapsed_ms)
+        self.frames_since_detection += 1
+        if confidence < self.min_confidence:
+            self.force_detection = True
+    
+    def record_skip(self):
+        self.frames_since_detection += 1
+    
+    def _ema(self, current, sample):
+        if current is None:
+            return sample
+        return current * (1 - self.EMA_ALPHA) + sample * self.EMA_ALPHA
+    
+    def _adapt(self):
+        if self.fixed_interval:
+            self.interval = self.fixed_interval
+            return
+        
+        # Average cost with interval N is (detect + (N - 1) * track) / N
+        track_ms = self.track_ms or 0.0
+        if self.detect_ms <= self.budget_ms:
+            interval = 1
+        elif self.budget_ms <= track_ms:
+            interval = self.max_interval
+        else:
+            interval = math.ceil((self.detect_ms - track_ms) / (self.budget_ms - track_ms))
+        self.interval = max(1, min(self.max_interval, interval))
+
+class RegionDetector:
+    """Runs the Haar cascade on an ROI around the last faces instead of the whole frame
+
+    After a hit only the box enclosing every previous face, expanded by
+    ``roi_margin``, is scanned.
+    A full-frame scan still happens every ``full_scan_interval`` detections,
+    and straight away when the ROI comes up empty, so new or fast-moving
+    faces are picked up again. Boxes are always returned in the coordinates
+    of the image passed to ``detect``.
+    """
+    
+    # minSize used by detectMultiScale at full (1080p-ish) resolution
+    MIN_FACE_SIZE = 80
+    
+    def __init__(self, roi_margin=0.5, full_scan_interval=30):
+        self.roi_margin = roi_margin
+        self.full_scan_interval = full_scan_interval
+        self.last_box = None
+        self.detections_since_full_scan = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+    
+    def reset(self):
+        self.last_box = None
+    
+    def detect(self, cascade, gray, scale=1.0):
+        """Return face boxes in ``gray``; ``scale`` is gray's size relative to the source frame"""
+        min_size = max(24, int(round(self.MIN_FACE_SIZE * scale)))
+        
+        if self.last_box is not None and self.detections_since_full_scan < self.full_scan_interval:
+            self.detections_since_full_scan += 1
+            self.roi_scans += 1
+            x, y, w, h = self.last_box
+            frame_h, frame_w = gray.shape[:2]
+            mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+            faces = self._scan(cascade, gray[y0:y1, x0:x1], min_size)
+            if len(faces) > 0:
+                faces = [(fx + x0, fy + y0, fw, fh) for fx, fy, fw, fh in faces]
+                self.last_box = union_box(faces)
+                return faces
+        
+        self.detections_since_full_scan = 0
+        self.full_scans += 1
+        faces = [tuple(f) for f in self._scan(cascade, gray, min_size)]
+        self.last_box = union_box(faces)
+        return faces
+    
+    @staticmethod
+    def _scan(cascade, gray, min_size):
+        if gray.shape[0] < min_size or gray.shape[1] < min_size:
+            return []
+        return cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(min_size, min_size)
+        )
+
+def union_box(boxes):
+    """Smallest (x, y, w, h) box enclosing all ``boxes``, or None"""
+    if len(boxes) == 0:
+        return None
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+class FaceTrack:
+    """One tracked face: a stable id, its box, a template tracker and smoothed state"""
+    
+    def __init__(self, track_id, gray, box):
+        self.id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.confidence = 0.8
+        self.misses = 0
+        self.state = None
+        self.tracker = TemplateTracker()
+        self.tracker.reset(gray, self.box)
+    
+    def measure(self, width, height, alpha):
+        """Blend the current box into the smoothed normalized state and return it"""
+        x, y, w, h = self.box
+        measured = {
+            'center_x': (x + w / 2) / width,
+            'center_y': (y + h / 2) / height,
+            'width': w / width,
+            'height': h / height,
+        }
+        if self.state is None:
+            self.state = measured
+        else:
+            self.state = {key: self.state[key] * (1 - alpha) + value * alpha
+                          for key, value in measured.items()}
+        return dict(self.state, id=self.id, confidence=self.confidence, rotation=0.0)
+
+class FaceTrackManager:
+    """Keeps up to ``max_tracks`` faces with ids that persist across frames
+
+    Detections are matched to existing tracks greedily by descending IoU,
+    which gives the same assignment as a Hungarian solve for the handful of
+    well-separated faces a scene holds. Unmatched detections start new
+    tracks while there is room (largest first); tracks unmatched for more
+    than ``max_misses`` detections are dropped. Between detections every
+    track follows its face with its own template tracker.
+    """
+    
+    def __init__(self, max_tracks=4, iou_threshold=0.2, max_misses=3):
+        self.max_tracks = max_tracks
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = []
+        self._next_id = 1
+    
+    @property
+    def active(self):
+        return bool(self.tracks)
+    
+    def clear(self):
+        self.tracks = []
+    
+    def boxes(self):
+        return [track.box for track in self.tracks]
+    
+    def associate(self, gray, detections):
+        """Update tracks from a fresh set of detected boxes"""
+        pairs = sorted(
+            ((box_iou(track.box, det), t, d)
+             for t, track in enumerate(self.tracks)
+             for d, det in enumerate(detections)),
+            reverse=True
+        )
+        matched_tracks, matched_dets = set(), set()
+        for iou, t, d in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_dets:
                 continue
+            matched_tracks.add(t)
+            matched_dets.add(d)
+            track = self.tracks[t]
+            track.box = tuple(int(v) for v in detections[d])
+            track.confidence = 0.8
+            track.misses = 0
+            track.tracker.reset(gray, track.box)
+        
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+        
+        unmatched = [detections[d] for d in range(len(detections)) if d not in matched_dets]
+        for det in sorted(unmatched, key=lambda f: f[2] * f[3], reverse=True):
+            if len(self.tracks) >= self.max_tracks:
+                break
+            self.tracks.append(FaceTrack(self._next_id, gray, det))
+            self._next_id += 1
+    
+    def track(self, gray):
+        """Follow every track with its template tracker; returns the lowest match score"""
+        lowest = 1.0
+        for track in self.tracks:
+            box, score = track.tracker.track(gray)
+            if box is not None:
+                track.box = box
+            track.confidence = score
+            lowest = min(lowest, score)
+        return lowest
+    
+    def publish(self, width, height, alpha):
+        """Smoothed normalized per-face dicts, oldest track first"""
+        return [track.measure(width, height, alpha)
+                for track in self.tracks if track.misses == 0]
+
+def working_scale(frame, working_width):
+    """Factor that brings ``frame`` down to ``working_width`` pixels wide (never upscales)"""
+    width = frame.shape[1]
+    if working_width <= 0 or width <= working_width:
+        return 1.0
+    return working_width / width
+
+class TrackingTap:
+    """Small grayscale copy of each frame, which is all the tracker needs
+
+    ``capture`` downscales to ``width`` pixels wide and then converts to
+    grayscale (or, for NV12/I420 frames, just takes the luma plane) into a
+    buffer from its own FrameRing, so the full-resolution frame stays with
+    the effects and the color conversion only touches the small frame. At
+    1080p and the default 640 px this hands the tracker about 1/27th of the
+    bytes of a BGR copy.
+
+    Inside OBS the render path only has BGRA frames; the planar formats
+    are for callers that already hold NV12/I420 pixels.
+    """
+    
+    # Layouts capture() understands; planar YUV frames are (height * 3 / 2, width) arrays
+    FORMATS = ('bgr', 'bgra', 'gray', 'nv12', 'i420')
+    
+    def __init__(self, width=640, slots=4):
+        self.width = width
+        self.frames = FrameRing(slots)
+        self.scratch = ScratchBuffers()
+    
+    def capture(self, frame, pixel_format='bgr'):
+        """(FrameBuffer holding the tap, source frame width)
+
+        The buffer carries one reference for the caller.
+        """
+        if pixel_format in ('nv12', 'i420'):
+            # The Y plane comes first and is already the luma
+            frame = frame[:frame.shape[0] * 2 // 3]
+        
+        height, width = frame.shape[:2]
+        scale = working_scale(frame, self.width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if scale < 1.0:
+            small = self.scratch.get('small', (size[1], size[0]) + frame.shape[2:])
+            cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+        
+        tap = self.frames.acquire((size[1], size[0]))
+        if small.ndim == 2:
+            np.copyto(tap.array, small)
+        else:
+            code = cv2.COLOR_BGRA2GRAY if pixel_format == 'bgra' else cv2.COLOR_BGR2GRAY
+            cv2.cvtColor(small, code, dst=tap.array)
+        return tap, width
+
+class FaceTracker:
+    """Face tracking state owned by one filtered source
+
+    Each SnapFilter has its own tracker, so two cameras never share face
+    data, detection schedules or tracks. Frames go into the tracker's
+    mailbox and are processed on the shared ``TrackingPool``. Detection
+    timings go into ``stats``, which is shared with the owning filter.
+    """
+    
+    def __init__(self, pool=None, stats=None):
+        self.pool = pool
+        self.stats = stats if stats is not None else PipelineStats()
+        self.backend = None
+        self.mailbox = FrameMailbox()
+        self._face_data = dict(DEFAULT_FACE_DATA)
+        self.scheduler = DetectionScheduler()
+        self.tracks = FaceTrackManager()
+        self.region_detector = RegionDetector()
+        self.working_width = 640
+        self.source_width = 0
+        self.smoothing = 0.3
+    
+    @property
+    def face_data(self):
+        if self.backend is not None:
+            result = self.backend.poll()
+            if result is not None:
+                self._face_data = result
+        return self._face_data
+    
+    def configure(self, settings):
+        self.apply_config(tracking_config(settings))
+    
+    def apply_config(self, config):
+        self.smoothing = config['smoothing']
+        self.scheduler.min_confidence = config['confidence']
+        self.scheduler.max_interval = config['max_detection_interval']
+        self.scheduler.budget_ms = config['tracking_budget_ms']
+        self.working_width = config['detection_width']
+        self.tracks.max_tracks = min(config['max_faces'], MAX_TRACKED_FACES)
+        self.region_detector.full_scan_interval = config['full_scan_interval']
+        
+        if config.get('detection_backend') == 'process':
+            if self.backend is None:
+                self.backend = ProcessDetectionBackend(stats=self.stats)
+            self.backend.configure(config)
+        elif self.backend is not None:
+            self.backend.close()
+            self.backend = None
+    
+    def submit_frame(self, frame, source_width=None):
+        """Hand a frame to the tracking pool without blocking the render path
+
+        ``frame`` may be a FrameBuffer, in which case the tracker takes over
+        the caller's reference and releases it once the frame is processed
+        or dropped. ``source_width`` is the width of the frame it was taken
+        from when it is a downscaled tap (see TrackingTap).
+        """
+        if source_width:
+            self.source_width = source_width
+        
+        if self.backend is not None:
+            try:
+                seq = self.backend.submit(frame_pixels(frame), source_width)
+            finally:
+                release_frame(frame)
+            if self.backend.failed:
+                self._fall_back_to_threads()
+            return seq
+        
+        seq = self.mailbox.put(frame)
+        pool = self.pool if self.pool is not None else tracking_pool
+        if pool is not None:
+            pool.schedule(self)
+        return seq
+    
+    def _fall_back_to_threads(self):
+        # Frames from now on go through the mailbox and the tracking pool
+        print(f"[{SCRIPT_NAME}] Detection process failed, tracking on worker threads instead")
+        self.stats.count('backend_fallbacks')
+        self.backend.close()
+        self.backend = None
+    
+    def face_data_age(self):
+        """Seconds since the frame behind the current face_data was submitted"""
+        timestamp = self.face_data.get('timestamp')
+        if timestamp is None:
+            return None
+        return time.monotonic() - timestamp
+    
+    def close(self):
+        self.mailbox.clear()
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+    
+    def detect_faces(self, frame, seq=-1, timestamp=None, cascade=None, source_width=None):
+        """Detect or track faces in a frame and publish a new face_data
+
+        Every face is kept as a track with a stable id in ``face_data['faces']``;
+        the top-level fields describe the primary (oldest) track.
+
+        ``scheduler`` decides whether this frame gets the Haar detector or
+        only the per-face template trackers. Both run on a copy of the frame
+        downscaled to ``working_width``, and the detector only scans around
+        the last faces most of the time (see ``RegionDetector``). Boxes are
+        normalized, so the working resolution never leaks into face_data.
+        The result is built in a copy and swapped in with one assignment, so
+        readers on other threads never see a half-updated dict. ``seq`` and
+        ``timestamp`` identify the frame the result belongs to. ``cascade``
+        defaults to the script's face cascade; pool workers pass their own
+        copy. ``frame`` may be BGR or a grayscale tap; ``source_width`` (by
+        default the last one submitted, else the frame's own width) is the
+        width of the full frame, which face sizes are measured against.
+        """
+        cascade = cascade if cascade is not None else face_cascade
+        previous = self._face_data
+        result = dict(previous)
+        result['frame_seq'] = seq
+        result['timestamp'] = timestamp if timestamp is not None else time.monotonic()
+        if timestamp is not None:
+            self.stats.record('queue_wait', (time.monotonic() - timestamp) * 1000)
+        
+        try:
+            # Downscale before the color conversion so both run on the small
+            # frame (a tracking tap usually arrives small and gray already)
+            source_width = source_width or self.source_width or frame.shape[1]
+            resize = working_scale(frame, self.working_width)
+            if resize < 1.0:
+                frame = cv2.resize(frame, None, fx=resize, fy=resize, interpolation=cv2.INTER_AREA)
+            scale = frame.shape[1] / source_width
             
-            if frame_data is None:
-                continue
+            # Convert to grayscale
+            if len(frame.shape) == 3:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = frame
+            
+            action = self.scheduler.next_action(self.tracks.active)
+            
+            if action == 'skip':
+                # No face to follow and no detection due yet
+                self.scheduler.record_skip()
+                self.stats.count('skipped_frames')
+                return
             
-            # Process frame for face detection
-            if face_cascade is not None:
-                detect_faces(frame_data)
+            if action == 'track':
+                start = time.perf_counter()
+                confidence = self.tracks.track(gray)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.scheduler.record_tracking(elapsed_ms, confidence)
+                self.stats.record('track', elapsed_ms)
+                self.stats.count('tracked_frames')
+                if confidence < self.scheduler.min_confidence:
+                    # Lost a face: fall back to a full detection on this frame
+                    action = 'detect'
+                    self.region_detector.reset()
+                else:
+                    # Keep the detector's ROI around where the faces moved to
+                    self.region_detector.last_box = union_box(self.tracks.boxes())
+            
+            if action == 'detect':
+                start = time.perf_counter()
+                faces = self.region_detector.detect(cascade, gray, scale)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.scheduler.record_detection(elapsed_ms)
+                self.stats.record('detect', elapsed_ms)
+                self.stats.count('detections')
+                self.tracks.associate(gray, faces)
+            
+            # Calculate smoothed, normalized coordinates for every face
+            height, width = gray.shape[:2]
+            faces = self.tracks.publish(width, height, self.smoothing)
+            result['faces'] = faces
+            
+            if faces:
+                # The oldest track stays primary, so it does not jump between people
+                primary = faces[0]
+                for key in ('center_x', 'center_y', 'width', 'height', 'confidence'):
+                    result[key] = primary[key]
+                result['detected'] = True
+            else:
+                result['detected'] = False
+                result['confidence'] = 0.0
+            
+            self._face_data = result
                 
         except Exception as e:
-            print(f"[{SCRIPT_NAME}] Tracking error: {e}")
-            time.sleep(0.1)
+            self.stats.error("Face detection", e)
+
+def tracking_config(settings):
+    """Tracker settings as a plain dict, so they can be sent to a worker process"""
+    return {
+        'smoothing': obs.obs_data_get_double(settings, "smoothing"),
+        'confidence': obs.obs_data_get_double(settings, "confidence"),
+        'max_detection_interval': obs.obs_data_get_int(settings, "max_detection_interval"),
+        'tracking_budget_ms': obs.obs_data_get_double(settings, "tracking_budget_ms"),
+        'detection_width': obs.obs_data_get_int(settings, "detection_width"),
+        'max_faces': obs.obs_data_get_int(settings, "max_faces"),
+        'full_scan_interval': obs.obs_data_get_int(settings, "full_scan_interval"),
+        'detection_backend': obs.obs_data_get_string(settings, "detection_backend"),
+    }
+
+def _attach_shared_memory(name):
+    # Only the creating process should unlink the block
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+class SharedFrameRing:
+    """Fixed slots of frame pixels in shared memory, written without pickling
+
+    Each slot has a small float64 header (seq, timestamp, height, width,
+    channels, source width). The writer marks a slot's seq as -1 while copying pixels
+    in, then publishes the real seq; the reader copies the newest slot out
+    and keeps the copy only if the seq is unchanged afterwards. Neither
+    side takes a lock, and with three or more slots the writer practically
+    never laps a reader mid-copy.
+    """
     
-    print(f"[{SCRIPT_NAME}] Face tracking thread stopped")
+    HEADER_FIELDS = 8
+    HEADER_BYTES = 64 * 8  # room for up to 64 slot headers, keeps pixels aligned
+    
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True,
+                                                  size=self.HEADER_BYTES + slots * slot_bytes)
+        else:
+            self.shm = _attach_shared_memory(name)
+        self.name = self.shm.name
+        
+        self.header = np.ndarray((slots, self.HEADER_FIELDS), dtype=np.float64,
+                                 buffer=self.shm.buf)
+        self.data = np.ndarray((slots, slot_bytes), dtype=np.uint8,
+                               buffer=self.shm.buf, offset=self.HEADER_BYTES)
+        if self.owner:
+            self.header[:] = -1
+    
+    def write(self, frame, seq, timestamp, source_width=None):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        slot = seq % self.slots
+        header = self.header[slot]
+        
+        header[0] = -1
+        self.data[slot, :frame.nbytes] = frame.reshape(-1)
+        header[1] = timestamp
+        header[2] = frame.shape[0]
+        header[3] = frame.shape[1]
+        header[4] = frame.shape[2] if frame.ndim == 3 else 0
+        header[5] = source_width or frame.shape[1]
+        header[0] = seq
+    
+    def read_latest(self, after_seq=-1):
+        """Copy of the newest frame as (seq, timestamp, frame, source width), or None if nothing newer"""
+        seqs = self.header[:, 0].copy()
+        slot = int(np.argmax(seqs))
+        seq = seqs[slot]
+        if seq <= after_seq:
+            return None
+        
+        _, timestamp, height, width, channels, source_width = self.header[slot, :6]
+        shape = (int(height), int(width), int(channels)) if channels else (int(height), int(width))
+        nbytes = int(np.prod(shape))
+        frame = self.data[slot, :nbytes].reshape(shape).copy()
+        
+        if self.header[slot, 0] != seq:
+            # Overwritten while copying; a newer frame is already on its way
+            return None
+        return int(seq), float(timestamp), frame, int(source_width)
+    
+    def close(self):
+        del self.header, self.data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class SharedFaceResults:
+    """Latest face_data of a worker process in shared memory, behind a seqlock
 
-def detect_faces(frame):
-    """Detect faces in a frame and update global face_data"""
-    global face_data
+    Layout (float64): version, frame seq, timestamp, detected, primary
+    center_x, center_y, width, height, confidence, face count, the
+    worker's ``STATS_FIELDS``, then six values per face (id, center_x,
+    center_y, width, height, confidence). The stats fields hold the last
+    detect and track times and the worker's running counts, so the parent
+    can record them into its own PipelineStats. The writer makes the
+    version odd while it updates; readers retry rather than block.
+    """
     
-    try:
-        # Convert to grayscale
-        if len(frame.shape) == 3:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    STATS_FIELDS = ('detect_ms', 'detections', 'track_ms', 'tracked_frames', 'skipped_frames')
+    HEADER_FIELDS = 10 + len(STATS_FIELDS)
+    FACE_FIELDS = ('id', 'center_x', 'center_y', 'width', 'height', 'confidence')
+    
+    def __init__(self, max_faces=MAX_TRACKED_FACES, name=None):
+        self.max_faces = max_faces
+        size = (self.HEADER_FIELDS + max_faces * len(self.FACE_FIELDS)) * 8
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
         else:
-            gray = frame
+            self.shm = _attach_shared_memory(name)
+        self.name = self.shm.name
+        self.values = np.ndarray(size // 8, dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            self.values[:] = 0
+    
+    @staticmethod
+    def worker_stats(stats):
+        """STATS_FIELDS values of a worker's PipelineStats"""
+        values = []
+        for stage, counter in (('detect', 'detections'), ('track', 'tracked_frames')):
+            timings = stats.stages.get(stage)
+            values.append(timings.samples[-1] if timings is not None and timings.samples else 0.0)
+            values.append(stats.counters.get(counter, 0))
+        values.append(stats.counters.get('skipped_frames', 0))
+        return values
+    
+    def write(self, face_data, stats=None):
+        faces = face_data.get('faces', [])[:self.max_faces]
+        values = self.values
         
-        # Detect faces
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(80, 80)
+        values[0] += 1
+        values[1:self.HEADER_FIELDS] = (
+            face_data['frame_seq'], face_data['timestamp'] or 0.0,
+            1.0 if face_data['detected'] else 0.0,
+            face_data['center_x'], face_data['center_y'],
+            face_data['width'], face_data['height'], face_data['confidence'],
+            len(faces),
+            *(self.worker_stats(stats) if stats is not None else [0.0] * len(self.STATS_FIELDS)),
         )
+        for i, face in enumerate(faces):
+            start = self.HEADER_FIELDS + i * len(self.FACE_FIELDS)
+            values[start:start + len(self.FACE_FIELDS)] = [face[key] for key in self.FACE_FIELDS]
+        values[0] += 1
+    
+    def read(self, after_version=0):
+        """(version, face_data, worker stats) if a newer consistent result exists, else None"""
+        version = self.values[0]
+        if version <= after_version or int(version) % 2:
+            return None
+        values = self.values.copy()
+        if self.values[0] != version:
+            return None
         
-        if len(faces) > 0:
-            # Use largest face
-            main_face = max(faces, key=lambda f: f[2] * f[3])
-            x, y, w, h = main_face
+        faces = []
+        for i in range(int(values[9])):
+            start = self.HEADER_FIELDS + i * len(self.FACE_FIELDS)
+            face = dict(zip(self.FACE_FIELDS, values[start:start + len(self.FACE_FIELDS)].tolist()))
+            face['id'] = int(face['id'])
+            face['rotation'] = 0.0
+            faces.append(face)
+        
+        face_data = dict(DEFAULT_FACE_DATA)
+        face_data.update(
+            frame_seq=int(values[1]), timestamp=float(values[2]), detected=bool(values[3]),
+            center_x=float(values[4]), center_y=float(values[5]),
+            width=float(values[6]), height=float(values[7]), confidence=float(values[8]),
+            faces=faces,
+        )
+        worker = dict(zip(self.STATS_FIELDS, values[10:self.HEADER_FIELDS].tolist()))
+        return version, face_data, worker
+    
+    def close(self):
+        del self.values
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _python_executable():
+    """A Python interpreter to spawn workers with (inside OBS sys.executable is OBS itself)"""
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for candidate in (os.path.join(sys.base_prefix, 'python.exe'),
+                      os.path.join(sys.base_prefix, 'bin', 'python3')):
+        if os.path.exists(candidate):
+            return candidate
+    return shutil.which('python3') or shutil.which('python') or sys.executable
+
+# Exit code of a detection worker that could not load the face cascade
+DETECTION_EXIT_NO_CASCADE = 3
+
+def _detection_process_main(ring_name, slots, slot_bytes, results_name,
+                            cascade_path, config_conn, wake, stop):
+    """Entry point of a detection worker process"""
+    try:
+        cascade = cv2.CascadeClassifier(cascade_path) if cascade_path else None
+    except (AttributeError, cv2.error):
+        cascade = None
+    if cascade is None or cascade.empty():
+        sys.exit(DETECTION_EXIT_NO_CASCADE)
+    
+    ring = SharedFrameRing(slots, slot_bytes, name=ring_name)
+    results = SharedFaceResults(name=results_name)
+    tracker = FaceTracker()
+    last_seq = -1
+    
+    try:
+        while not stop.is_set():
+            if not wake.wait(0.1):
+                continue
+            wake.clear()
             
-            # Calculate normalized coordinates
-            height, width = frame.shape[:2]
+            while config_conn.poll():
+                tracker.apply_config(config_conn.recv())
             
-            # Smooth the data
-            alpha = face_data.get('smoothing', 0.3)
-            new_center_x = (x + w / 2) / width
-            new_center_y = (y + h / 2) / height
-            new_width = w / width
-            new_height = h / height
+            item = ring.read_latest(last_seq)
+            if item is None:
+                continue
+            seq, timestamp, frame, source_width = item
+            last_seq = seq
             
-            face_data['center_x'] = face_data.get('center_x', 0.5) * (1 - alpha) + new_center_x * alpha
-            face_data['center_y'] = face_data.get('center_y', 0.5) * (1 - alpha) + new_center_y * alpha
-            face_data['width'] = face_data.get('width', 0) * (1 - alpha) + new_width * alpha
-            face_data['height'] = face_data.get('height', 0) * (1 - alpha) + new_height * alpha
-            face_data['detected'] = True
-            face_data['confidence'] = 0.8
+            tracker.detect_faces(frame, seq, timestamp, cascade, source_width)
+            results.write(tracker.face_data, tracker.stats)
+    finally:
+        ring.close()
+        results.close()
+
+class ProcessDetectionBackend:
+    """Runs a source's face detection in its own process, outside the OBS GIL
+
+    Frames are copied into a ``SharedFrameRing`` and results read back from
+    a ``SharedFaceResults`` block, so nothing on the per-frame path is
+    pickled and neither side waits on the other. Only configuration
+    changes travel over a pipe. The ring is sized from the first frame and
+    rebuilt (with a fresh worker) if a larger frame arrives.
+    
+    A worker that dies is reported to ``stats`` and restarted after a
+    growing delay, dropping frames meanwhile. After ``RESTART_LIMIT``
+    restarts, or straight away if it could not load the face cascade, the
+    backend is marked ``failed`` and the tracker goes back to threads.
+    """
+    
+    RESTART_LIMIT = 3
+    RESTART_DELAY_S = 0.5
+    
+    def __init__(self, slots=3, stats=None):
+        self.slots = slots
+        self.stats = stats if stats is not None else PipelineStats()
+        self.restarts = 0
+        self.failed = False
+        self._retry_at = None
+        self._worker_counts = {}
+        self.ring = None
+        self.results = None
+        self.process = None
+        self.config = None
+        self._context = multiprocessing.get_context('spawn')
+        self._context.set_executable(_python_executable())
+        self._config_conn = None
+        self._wake = None
+        self._stop = None
+        self._next_seq = 0
+        self._version = 0
+    
+    def configure(self, config):
+        # The worker always runs detection inline
+        self.config = dict(config, detection_backend='thread')
+        if self._config_conn is not None:
+            self._config_conn.send(self.config)
+    
+    def _start(self, slot_bytes):
+        self.close()
+        self.ring = SharedFrameRing(self.slots, slot_bytes)
+        self.results = SharedFaceResults()
+        self._version = 0
+        self._worker_counts = {}
+        
+        receiver, self._config_conn = self._context.Pipe(duplex=False)
+        self._wake = self._context.Event()
+        self._stop = self._context.Event()
+        self.process = self._context.Process(
+            target=_detection_process_main,
+            args=(self.ring.name, self.slots, slot_bytes, self.results.name,
+                  face_cascade_path, receiver, self._wake, self._stop),
+            daemon=True,
+        )
+        self.process.start()
+        receiver.close()
+        if self.config is not None:
+            self._config_conn.send(self.config)
+    
+    def _check_worker(self):
+        # Notice a worker that exited on its own and decide whether to restart it
+        if self.process is None or self.process.is_alive():
+            return
+        exitcode = self.process.exitcode
+        self._stop_worker()
+        
+        if exitcode == DETECTION_EXIT_NO_CASCADE:
+            self.stats.error("Detection process", "no face cascade could be loaded")
+            self.failed = True
+            return
+        self.stats.error("Detection process", f"exited with code {exitcode}")
+        self.restarts += 1
+        if self.restarts > self.RESTART_LIMIT:
+            self.failed = True
         else:
-            face_data['detected'] = False
-            face_data['confidence'] = 0.0
-            
-    except Exception as e:
-        print(f"[{SCRIPT_NAME}] Face detection error: {e}")
+            self._retry_at = time.monotonic() + self.RESTART_DELAY_S * 2 ** (self.restarts - 1)
+    
+    def submit(self, frame, source_width=None):
+        """Copy a frame into the ring and wake the worker, returning its sequence number
+
+        Returns None when the frame is dropped because the worker is down.
+        """
+        self._check_worker()
+        if self.failed:
+            return None
+        if self.ring is None or frame.nbytes > self.ring.slot_bytes:
+            self._start(frame.nbytes)
+        elif self.process is None:
+            if time.monotonic() < self._retry_at:
+                return None
+            self.stats.count('process_restarts')
+            self._start(self.ring.slot_bytes)
+        
+        seq = self._next_seq
+        self._next_seq += 1
+        self.ring.write(frame, seq, time.monotonic(), source_width)
+        self._wake.set()
+        return seq
+    
+    def poll(self):
+        """Newest face_data published by the worker, or None if unchanged"""
+        if self.results is None:
+            return None
+        result = self.results.read(self._version)
+        if result is None:
+            return None
+        self._version, face_data, worker = result
+        self._record_worker_stats(worker)
+        return face_data
+    
+    def _record_worker_stats(self, worker):
+        # One timing sample per new result; counters advance by the worker's deltas
+        for stage, counter in (('detect', 'detections'), ('track', 'tracked_frames'),
+                               (None, 'skipped_frames')):
+            new = int(worker[counter]) - self._worker_counts.get(counter, 0)
+            if new <= 0:
+                continue
+            self._worker_counts[counter] = int(worker[counter])
+            self.stats.count(counter, new)
+            if stage is not None:
+                self.stats.record(stage, worker[f"{stage}_ms"])
+    
+    def _stop_worker(self):
+        if self.process is not None:
+            self._stop.set()
+            self._wake.set()
+            self.process.join(timeout=1.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self._config_conn.close()
+            self._config_conn = None
+    
+    def close(self):
+        self._stop_worker()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.results is not None:
+            self.results.close()
+            self.results = None
+
+class FaceMask:
+    """A feathered face mask stored only over its bounding box
+
+    ``rows`` and ``cols`` are the slices of the frame the mask covers;
+    outside them the mask is zero. Blend weights for the last requested
+    strength are kept alongside, since the strength rarely changes.
+    """
+    
+    __slots__ = ('rows', 'cols', 'mask', 'strength', 'weights', 'inverse')
+    
+    def __init__(self, rows, cols, mask):
+        self.rows = rows
+        self.cols = cols
+        self.mask = mask
+        self.strength = None
+        self.weights = None
+        self.inverse = None
+    
+    def weights_for(self, strength):
+        """(weights, 1 - weights) as float32 for cv2.blendLinear"""
+        if strength != self.strength:
+            if self.weights is None:
+                self.weights = np.empty(self.mask.shape, dtype=np.float32)
+                self.inverse = np.empty(self.mask.shape, dtype=np.float32)
+            mask_weights(self.mask, strength, self.weights, self.inverse)
+            self.strength = strength
+        return self.weights, self.inverse
+
+class FaceMaskCache:
+    """LRU cache of feathered face masks
+
+    Keys are the frame size plus every face's center, axes and rotation
+    quantized to ``quantum`` pixels (and degrees), so a face that barely
+    moves keeps hitting the same mask. All ellipses are drawn into one
+    mask before a single blur, so overlapping faces never double up, and on
+    a miss the blur only runs over the ellipses' bounding box.
+    """
+    
+    def __init__(self, capacity=16, quantum=2):
+        self.capacity = capacity
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self._masks = OrderedDict()
+    
+    def _quantize(self, value):
+        return int(round(value / self.quantum)) * self.quantum
+    
+    def get(self, shape, faces, axis_scale=0.5, blur=51):
+        """The FaceMask for ``faces`` in a frame of ``shape``, or None if there is nothing to draw"""
+        h, w = shape[:2]
+        ellipses = []
+        for face in faces:
+            center = (self._quantize(face['center_x'] * w), self._quantize(face['center_y'] * h))
+            axes = (self._quantize(face['width'] * w * axis_scale),
+                    self._quantize(face['height'] * h * axis_scale))
+            angle = self._quantize(np.degrees(face.get('rotation', 0)))
+            if axes[0] > 0 and axes[1] > 0:
+                ellipses.append((center, axes, angle))
+        if not ellipses:
+            return None
+        
+        key = (h, w, blur, tuple(ellipses))
+        mask = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            self.hits += 1
+            return mask
+        
+        self.misses += 1
+        mask = self._render(h, w, ellipses, blur)
+        if mask is not None:
+            self._masks[key] = mask
+            if len(self._masks) > self.capacity:
+                self._masks.popitem(last=False)
+        return mask
+    
+    @staticmethod
+    def _render(h, w, ellipses, blur):
+        # Bounding box of every ellipse (any rotation), padded by the blur radius
+        pad = blur // 2
+        x0 = max(0, min(c[0] - max(a) for c, a, _ in ellipses) - pad)
+        y0 = max(0, min(c[1] - max(a) for c, a, _ in ellipses) - pad)
+        x1 = min(w, max(c[0] + max(a) for c, a, _ in ellipses) + pad + 1)
+        y1 = min(h, max(c[1] + max(a) for c, a, _ in ellipses) + pad + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        
+        patch = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for (cx, cy), axes, angle in ellipses:
+            cv2.ellipse(patch, (cx - x0, cy - y0), axes, angle, 0, 360, 255, -1)
+        cv2.GaussianBlur(patch, (blur, blur), 0, dst=patch)
+        return FaceMask(slice(y0, y1), slice(x0, x1), patch)
+
+def blurred_region(frame, rows, cols, ksize, out):
+    """Gaussian blur of ``frame[rows, cols]`` matching a full-frame blur there
+
+    The region is widened by the kernel radius before blurring so its edges
+    see real neighbours; the returned view of ``out`` covers just the region.
+    """
+    h, w = frame.shape[:2]
+    pad = ksize // 2
+    y0, y1 = max(0, rows.start - pad), min(h, rows.stop + pad)
+    x0, x1 = max(0, cols.start - pad), min(w, cols.stop + pad)
+    padded = out[:y1 - y0, :x1 - x0]
+    cv2.GaussianBlur(frame[y0:y1, x0:x1], (ksize, ksize), 0, dst=padded)
+    return padded[rows.start - y0:rows.stop - y0, cols.start - x0:cols.stop - x0]
+
+def mask_weights(mask, strength, weights, inverse):
+    """Float32 blend weights ``mask / 255 * strength`` and ``1 - that`` for cv2.blendLinear"""
+    cv2.multiply(mask, strength / 255.0, dst=weights, dtype=cv2.CV_32F)
+    cv2.subtract(1.0, weights, dst=inverse)
+    return weights, inverse
+
+# Color lookup tables
+#
+# Per-pixel color maps are described as ops and compiled into a table:
+#   ('scale', alpha, beta)             |x * alpha + beta| per channel (as cv2.convertScaleAbs)
+#   ('tint', (c0, c1, c2), intensity)  x * (1 - intensity) + c * 255 * intensity per channel
+#   ('saturation', factor)             scale each pixel's distance from its luma
+#   ('matrix', ((...), (...), (...)))  3x3 BGR color matrix
+# 'scale' and 'tint' keep channels independent and compile to a 256-entry
+# cv2.LUT table; 'saturation' and 'matrix' mix channels linearly and run as
+# an exact 3x3 cv2.transform, so no pass quantizes colors to a coarse grid.
+CHANNEL_OPS = ('scale', 'tint')
+LUMA_BGR = np.array([0.114, 0.587, 0.299])
+
+def apply_color_ops(values, ops):
+    """Evaluate color ops on an (N, 3) float BGR array
+
+    Every op is rounded and saturated in turn, so a compiled table gives the
+    same result as running the ops as separate 8-bit passes.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    for op in ops:
+        kind = op[0]
+        if kind == 'scale':
+            _, alpha, beta = op
+            # convertScaleAbs works in float32, which rounds some x.5 cases differently
+            values = cv2.convertScaleAbs(np.uint8(values), alpha=alpha, beta=beta).astype(np.float64)
+        elif kind == 'tint':
+            _, color, intensity = op
+            values = values * (1 - intensity) + np.asarray(color) * 255 * intensity
+        elif kind == 'saturation':
+            _, factor = op
+            luma = values @ LUMA_BGR
+            values = luma[:, None] + (values - luma[:, None]) * factor
+        elif kind == 'matrix':
+            _, matrix = op
+            values = values @ np.asarray(matrix, dtype=np.float64).T
+        else:
+            raise ValueError(f"Unknown color op: {kind}")
+        values = np.clip(np.round(values), 0, 255)
+    return values
+
+def build_levels_table(ops):
+    """Per-channel ops as one (256, 1, 3) cv2.LUT table"""
+    ramp = np.repeat(np.arange(256, dtype=np.float64)[:, None], 3, axis=1)
+    return apply_color_ops(ramp, ops).astype(np.uint8).reshape(256, 1, 3)
+
+def mixing_matrix(op):
+    """A channel-mixing op as the 3x3 BGR matrix cv2.transform applies"""
+    kind = op[0]
+    if kind == 'saturation':
+        _, factor = op
+        # luma + (x - luma) * factor == factor * x + (1 - factor) * luma
+        return factor * np.eye(3) + (1 - factor) * np.outer(np.ones(3), LUMA_BGR)
+    if kind == 'matrix':
+        _, matrix = op
+        return np.asarray(matrix, dtype=np.float64)
+    raise ValueError(f"Unknown color op: {kind}")
+
+class ColorLut3D:
+    """BGR to BGR lookup table over a (2 ** bits)^3 grid
+
+    A frame is mapped by dropping each channel to its top ``bits`` bits and
+    indexing the table with the combined cell number, all in scratch
+    buffers. The grid is indexed blue-major to match the frame's BGR order.
+    """
+    
+    def __init__(self, table, bits):
+        self.table = table
+        self.bits = bits
+    
+    @staticmethod
+    def grid(bits):
+        """Center of every cell, as an (N, 3) float BGR array in table order"""
+        levels = (np.arange(1 << bits, dtype=np.float64) + 0.5) * (256 >> bits)
+        grid = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1)
+        return grid.reshape(-1, 3)
+    
+    @classmethod
+    def from_ops(cls, ops, bits=6):
+        return cls(apply_color_ops(cls.grid(bits), ops).astype(np.uint8), bits)
+    
+    def apply(self, frame, scratch, name='lut3d'):
+        h, w = frame.shape[:2]
+        bits = scratch.get('lut3d_bits', frame.shape)
+        np.right_shift(frame, 8 - self.bits, out=bits)
+        
+        # Flat index: b << 2 * bits | g << bits | r, kept as intp so np.take
+        # can use it without converting
+        index = scratch.get('lut3d_index', (h, w), np.intp)
+        green = scratch.get('lut3d_green', (h, w), np.intp)
+        np.left_shift(bits[..., 0], 2 * self.bits, out=index, dtype=np.intp)
+        np.left_shift(bits[..., 1], self.bits, out=green, dtype=np.intp)
+        np.bitwise_or(index, green, out=index)
+        np.bitwise_or(index, bits[..., 2], out=index)
+        
+        out = scratch.get(name, frame.shape)
+        np.take(self.table, index.reshape(-1), axis=0, out=out.reshape(-1, 3), mode='clip')
+        return out
+
+class ColorMap:
+    """A chain of color ops compiled into as few exact passes as possible
+
+    Each run of per-channel ops becomes one 256-entry cv2.LUT table and each
+    channel-mixing op a 3x3 cv2.transform, so beauty's lift and a tint stay
+    one table lookup and a saturation adjustment adds a single linear pass.
+    """
+    
+    def __init__(self, ops):
+        self.ops = tuple(ops)
+        self.passes = []
+        run = []
+        for op in self.ops:
+            if op[0] in CHANNEL_OPS:
+                run.append(op)
+                continue
+            if run:
+                self.passes.append(('levels', build_levels_table(run)))
+                run = []
+            self.passes.append(('mix', mixing_matrix(op)))
+        if run or not self.passes:
+            self.passes.append(('levels', build_levels_table(run)))
+    
+    def apply(self, frame, scratch, name='color_map'):
+        last = len(self.passes) - 1
+        for i, (kind, table) in enumerate(self.passes):
+            # Intermediate passes get their own buffer; transform is not in-place safe
+            out = scratch.get(name if i == last else f"{name}:{i}", frame.shape)
+            if kind == 'levels':
+                cv2.LUT(frame, table, dst=out)
+            else:
+                cv2.transform(frame, table, dst=out)
+            frame = out
+        return frame
+
+@functools.lru_cache(maxsize=32)
+def compile_color_map(ops):
+    """Cached ColorMap for a tuple of color ops"""
+    return ColorMap(ops)
+
+# The face effect's brightening, as color ops
+FACE_BRIGHTEN = (('scale', 1.1, 10),)
+
+# HSV skin color range used by the beauty effect
+SKIN_LOWER = np.array([0, 20, 70], dtype=np.uint8)
+SKIN_UPPER = np.array([20, 255, 255], dtype=np.uint8)
+
+def beauty_smooth(frame, intensity, skin_mask, scratch):
+    """Bilateral-smoothed frame blended back in where ``skin_mask`` is set"""
+    h, w = frame.shape[:2]
+    
+    # Apply bilateral filter for smoothing
+    smoothed = cv2.bilateralFilter(frame, 9, 75, 75, dst=scratch.get('beauty_smooth', frame.shape))
+    
+    # Blend based on skin mask
+    weights, inverse = mask_weights(
+        skin_mask, intensity,
+        scratch.get('beauty_weights', (h, w), np.float32),
+        scratch.get('beauty_inverse', (h, w), np.float32)
+    )
+    return cv2.blendLinear(frame, smoothed, inverse, weights, dst=scratch.get('beauty', frame.shape))
+
+def beauty_lift(intensity):
+    """The beauty effect's subtle brightness increase as a levels op"""
+    return ('scale', 1.0 + intensity * 0.1, intensity * 10)
+
+def beauty_filter(frame, intensity, scratch, skin_mask=None):
+    """Skin smoothing with a slight brightness lift
+
+    Smooths the frame with a bilateral filter and blends it back in only
+    where the HSV skin mask is set. Every step writes into ``scratch``
+    buffers and the blend runs in float32 weights through cv2.blendLinear,
+    so a frame costs no full-size allocations.
+    """
+    if skin_mask is None:
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=scratch.get('beauty_hsv', frame.shape))
+        skin_mask = cv2.inRange(hsv, SKIN_LOWER, SKIN_UPPER,
+                                dst=scratch.get('beauty_skin', frame.shape[:2]))
+    
+    result = beauty_smooth(frame, intensity, skin_mask, scratch)
+    
+    # Subtle brightness increase
+    _, alpha, beta = beauty_lift(intensity)
+    return cv2.convertScaleAbs(result, alpha=alpha, beta=beta, dst=result)
+
+class CartoonPalette:
+    """K-means color palette for the cartoon effect, applied through a 3D LUT
+
+    The palette is fitted on a thumbnail of the frame (``sample_width``
+    pixels wide) every ``refit_interval`` frames, or straight away when a
+    16x9 thumbnail of the scene changes by more than
+    ``scene_change_threshold`` levels on average. Each fit precomputes the
+    nearest palette color for every cell of a 32x32x32 BGR grid, so
+    quantizing a frame is one table lookup per pixel instead of k-means
+    over every pixel.
+    """
+    
+    LUT_BITS = 5
+    
+    def __init__(self, colors=8, refit_interval=90, sample_width=160,
+                 scene_change_threshold=12.0):
+        self.colors = colors
+        self.refit_interval = refit_interval
+        self.sample_width = sample_width
+        self.scene_change_threshold = scene_change_threshold
+        self.lut = None
+        self.fits = 0
+        self._frames_since_fit = 0
+        self._scene = None
+        self._grid = np.float32(ColorLut3D.grid(self.LUT_BITS))
+    
+    def _needs_fit(self, frame):
+        thumbnail = cv2.resize(frame, (16, 9), interpolation=cv2.INTER_AREA).astype(np.float32)
+        changed = (self._scene is None or
+                   float(np.mean(np.abs(thumbnail - self._scene))) > self.scene_change_threshold)
+        if self.lut is None or changed or self._frames_since_fit >= self.refit_interval:
+            self._scene = thumbnail
+            return True
+        return False
+    
+    def fit(self, frame):
+        """Fit the palette to ``frame`` and rebuild the lookup table"""
+        scale = min(1.0, self.sample_width / frame.shape[1])
+        sample = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        samples = np.float32(sample.reshape(-1, 3))
+        
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+        k = min(self.colors, len(samples))
+        _, _, centers = cv2.kmeans(samples, k, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+        
+        distances = ((self._grid[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        self.lut = ColorLut3D(np.uint8(np.clip(centers[distances.argmin(axis=1)], 0, 255)),
+                              self.LUT_BITS)
+        self._frames_since_fit = 0
+        self.fits += 1
+    
+    def quantize(self, frame, scratch):
+        """Map every pixel of ``frame`` to its palette color"""
+        if self._needs_fit(frame):
+            self.fit(frame)
+        self._frames_since_fit += 1
+        return self.lut.apply(frame, scratch, 'cartoon_quantized')
+
+def posterize(frame, scratch, levels=6):
+    """Quantize each channel to ``levels`` evenly spaced values with one cv2.LUT pass"""
+    step = 255.0 / (levels - 1)
+    table = np.uint8(np.round(np.round(np.arange(256) / step) * step))
+    return cv2.LUT(frame, table, dst=scratch.get('cartoon_quantized', frame.shape))
+
+def bilateral_stack(frame, scratch, passes=3, levels=8):
+    """Flatten colors with repeated bilateral filtering at quarter resolution, then posterize"""
+    h, w = frame.shape[:2]
+    small = cv2.resize(frame, (w // 4, h // 4), interpolation=cv2.INTER_AREA,
+                       dst=scratch.get('cartoon_small', (h // 4, w // 4, 3)))
+    other = scratch.get('cartoon_small_other', small.shape)
+    for _ in range(passes):
+        cv2.bilateralFilter(small, 7, 20, 5, dst=other)
+        small, other = other, small
+    smooth = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR,
+                        dst=scratch.get('cartoon_smooth', frame.shape))
+    return posterize(smooth, scratch, levels)
+
+def cartoon_filter(frame, intensity, quantizer, palette, scratch, gray=None):
+    """Cartoon look: flattened colors with dark adaptive-threshold edges
+
+    ``quantizer`` picks how colors are flattened: ``'palette'`` (a cached
+    k-means palette through a 3D LUT, closest to the original per-frame
+    k-means), ``'posterize'`` (fixed levels per channel, cheapest) or
+    ``'bilateral'`` (bilateral stack then posterize, softest). ``gray`` is
+    the frame's grayscale if the caller already has it.
+    """
+    h, w = frame.shape[:2]
+    
+    # Edge detection
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=scratch.get('cartoon_gray', (h, w)))
+    # Two 5x5 median passes stand in for one 7x7 median: OpenCV only has a
+    # vectorized median up to 5x5, and the edges come out nearly the same
+    gray_blur = cv2.medianBlur(gray, 5, dst=scratch.get('cartoon_gray_blur', (h, w)))
+    gray_blur = cv2.medianBlur(gray_blur, 5, dst=scratch.get('cartoon_gray_blur2', (h, w)))
+    edges = cv2.adaptiveThreshold(
+        gray_blur, 255,
+        cv2.ADAPTIVE_THRESH_MEAN_C,
+        cv2.THRESH_BINARY,
+        9, 2,
+        dst=scratch.get('cartoon_gray_blur', (h, w))
+    )
+    
+    # Color quantization
+    if quantizer == 'posterize':
+        quantized = posterize(frame, scratch)
+    elif quantizer == 'bilateral':
+        quantized = bilateral_stack(frame, scratch)
+    else:
+        quantized = palette.quantize(frame, scratch)
+    
+    # Combine edges with quantized colors
+    edges = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR, dst=scratch.get('cartoon_edges_bgr', frame.shape))
+    result = cv2.bitwise_and(quantized, edges, dst=quantized)
+    
+    # Blend with original based on intensity
+    return cv2.addWeighted(frame, 1 - intensity, result, intensity, 0,
+                           dst=scratch.get('cartoon', frame.shape))
+
+# Effects that can be stacked in an effect chain
+EFFECT_NAMES = ('beauty', 'cartoon', 'glow', 'tint', 'edge', 'blur')
+
+def parse_effect_chain(text):
+    """Effect names from a comma-separated chain such as "beauty, tint, glow"
+
+    Unknown names are skipped, and each effect is kept only the first time
+    it appears, since an effect's output lives in that effect's scratch
+    buffers.
+    """
+    chain = []
+    for name in (part.strip().lower() for part in (text or '').split(',')):
+        if not name:
+            continue
+        if name not in EFFECT_NAMES:
+            print(f"[{SCRIPT_NAME}] Unknown effect in chain: {name}")
+        elif name not in chain:
+            chain.append(name)
+    return chain
+
+class FrameAnalysis:
+    """Intermediates shared by every effect applied to one frame
+
+    Each is computed on first use from ``frame`` and kept while later
+    stages see that same frame, so stages that need grayscale or HSV of an
+    unchanged frame convert it only once. A stage that produces a new frame
+    gets a new FrameAnalysis, so every effect analyses the image it is
+    actually given.
+    """
+    
+    def __init__(self, frame, scratch):
+        self.frame = frame
+        self.scratch = scratch
+        self._gray = None
+        self._hsv = None
+        self._skin_mask = None
+    
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY,
+                                      dst=self.scratch.get('analysis_gray', self.frame.shape[:2]))
+        return self._gray
+    
+    @property
+    def hsv(self):
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV,
+                                     dst=self.scratch.get('analysis_hsv', self.frame.shape))
+        return self._hsv
+    
+    @property
+    def skin_mask(self):
+        if self._skin_mask is None:
+            self._skin_mask = cv2.inRange(self.hsv, SKIN_LOWER, SKIN_UPPER,
+                                          dst=self.scratch.get('analysis_skin', self.frame.shape[:2]))
+        return self._skin_mask
 
 # Filter class
 class SnapFilter:
@@ -246,17 +2089,44 @@ class SnapFilter:
         self.smoothing = 0.3
         self.enable_tracking = True
         self.lens_data = None
+        self.lens_bundle = None
+        self.lens_file = ""
+        self.stats = PipelineStats()
+        self.tracker = FaceTracker(stats=self.stats)
+        self.tracker.configure(settings)
+        self.frames = FrameRing()
+        self.scratch = ScratchBuffers()
+        self.tap = TrackingTap()
+        self.readback = GpuReadback()
+        self.upload = FrameUpload()
+        self.mask_cache = FaceMaskCache()
+        self.cartoon_quantizer = "palette"
+        self.cartoon_palette = CartoonPalette()
+        self.effect_chain = []
+        self.saturation = 1.0
+        self.chain_plan = None
         
         # Load lens if specified
         self.load_lens()
     
     def load_lens(self):
         lens_file = obs.obs_data_get_string(self.settings, "lens_file")
+        self.lens_file = lens_file
+        
+        if self.lens_bundle is not None:
+            self.lens_bundle.close()
+            self.lens_bundle = None
+        self.lens_data = None
+        
         if lens_file:
             try:
-                with open(lens_file, 'r') as f:
-                    self.lens_data = json.load(f)
-                    print(f"[{SCRIPT_NAME}] Loaded lens: {self.lens_data.get('name', 'Unknown')}")
+                if lens_file.endswith(".snapbundle"):
+                    self.lens_bundle = LensBundle(lens_file)
+                    self.lens_data = self.lens_bundle.info
+                else:
+                    with open(lens_file, 'r') as f:
+                        self.lens_data = json.load(f)
+                print(f"[{SCRIPT_NAME}] Loaded lens: {self.lens_data.get('name', 'Unknown')}")
             except Exception as e:
                 print(f"[{SCRIPT_NAME}] Error loading lens: {e}")
     
@@ -265,7 +2135,17 @@ class SnapFilter:
         self.enable_tracking = obs.obs_data_get_bool(settings, "enable_tracking")
         self.intensity = obs.obs_data_get_double(settings, "intensity")
         self.effect_type = obs.obs_data_get_string(settings, "effect_type")
+        self.effect_chain = parse_effect_chain(obs.obs_data_get_string(settings, "effect_chain"))
+        self.cartoon_quantizer = obs.obs_data_get_string(settings, "cartoon_quantizer")
         self.smoothing = obs.obs_data_get_double(settings, "smoothing")
+        self.tracker.configure(settings)
+        self.tap.width = obs.obs_data_get_int(settings, "detection_width")
+        # Surfaces are recreated for a new depth on the next render
+        self.readback.slots = max(2, obs.obs_data_get_int(settings, "readback_buffers"))
+        
+        # Switch lenses live when a different file is selected
+        if obs.obs_data_get_string(settings, "lens_file") != self.lens_file:
+            self.load_lens()
         
         # Get tint color
         color_int = obs.obs_data_get_int(settings, "tint_color")
@@ -273,167 +2153,224 @@ class SnapFilter:
         self.tint_color[1] = ((color_int >> 8) & 0xFF) / 255.0
         self.tint_color[2] = (color_int & 0xFF) / 255.0
         self.tint_color[3] = ((color_int >> 24) & 0xFF) / 255.0
+        
+        # Recompile the effect chain and its color tables for the new settings
+        self.saturation = obs.obs_data_get_double(settings, "saturation")
+        self.chain_plan = self.compile_chain(self.effect_chain or [self.effect_type])
     
-    def process_frame(self, frame):
-        """Apply filter effects to a frame"""
+    def process_frame(self, frame, tracking_frame=None, tracking_format='bgr'):
+        """Apply filter effects to a frame
+
+        ``frame`` is a NumPy array or a FrameBuffer from ``self.frames``;
+        the caller keeps its own reference either way. The returned array
+        may be one of this filter's scratch buffers, valid until the next
+        call. The tracker gets a small grayscale tap of the frame, or of
+        ``tracking_frame`` in ``tracking_format`` (one of
+        ``TrackingTap.FORMATS``) when the caller has the same picture in a
+        cheaper layout, such as NV12/I420 planes. OBS's render path
+        (filter_video_render) only reads back BGRA and never passes one.
+        """
         if frame is None:
             return None
         
+        start = time.perf_counter()
         try:
             # Convert OBS frame to OpenCV format
             # Frame comes as numpy array from OBS
+            frame = frame_pixels(frame)
+            
+            # Queue a small grayscale tap for this source's tracker; effects
+            # use the latest result, which may lag a frame or two behind
+            if self.enable_tracking:
+                tap_start = time.perf_counter()
+                if tracking_frame is None:
+                    tap, source_width = self.tap.capture(frame)
+                else:
+                    tap, source_width = self.tap.capture(frame_pixels(tracking_frame), tracking_format)
+                self.tracker.submit_frame(tap, source_width)
+                self.stats.record('tracking_tap', (time.perf_counter() - tap_start) * 1000)
             
-            # Apply effect based on type
-            if self.effect_type == "beauty":
-                frame = self.apply_beauty(frame)
-            elif self.effect_type == "cartoon":
-                frame = self.apply_cartoon(frame)
-            elif self.effect_type == "glow":
-                frame = self.apply_glow(frame)
-            elif self.effect_type == "tint":
-                frame = self.apply_tint(frame)
-            elif self.effect_type == "edge":
-                frame = self.apply_edge(frame)
-            elif self.effect_type == "blur":
-                frame = self.apply_blur(frame)
+            # Apply the effect chain, or the single selected effect
+            frame = self.run_chain(frame)
             
             # Apply face-tracked effects if enabled and face detected
-            if self.enable_tracking and face_data['detected']:
+            if self.enable_tracking and self.tracker.face_data['detected']:
+                face_start = time.perf_counter()
                 frame = self.apply_face_effect(frame)
+                self.stats.record('effect:face', (time.perf_counter() - face_start) * 1000)
             
             return frame
             
         except Exception as e:
-            print(f"[{SCRIPT_NAME}] Filter error: {e}")
+            self.stats.error("Filter", e)
             return frame
-    
-    def apply_beauty(self, frame):
-        """Apply skin smoothing effect"""
-        intensity = self.intensity
-        
-        # Create skin mask
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # Define skin color range
-        lower_skin = np.array([0, 20, 70], dtype=np.uint8)
-        upper_skin = np.array([20, 255, 255], dtype=np.uint8)
         
-        skin_mask = cv2.inRange(hsv, lower_skin, upper_skin)
-        
-        # Apply bilateral filter for smoothing
-        smoothed = cv2.bilateralFilter(frame, 9, 75, 75)
-        
-        # Blend based on skin mask
-        skin_mask = skin_mask.astype(float) / 255.0 * intensity
-        skin_mask = np.stack([skin_mask] * 3, axis=2)
+        finally:
+            self.stats.record('process_frame', (time.perf_counter() - start) * 1000)
+            self.stats.count('frames')
+    
+    def stats_summary(self):
+        """Stage timings, counters and tracking health for this filter"""
+        summary = self.stats.summary()
+        name = obs.obs_source_get_name(self.source) if obs is not None else None
+        age = self.tracker.face_data_age()
+        summary.update({
+            'name': name or f"filter-{id(self):x}",
+            'dropped_frames': self.tracker.mailbox.dropped,
+            'ring_overflows': self.frames.overflows,
+            'tracking_age_s': age,
+            'detection_interval': self.tracker.scheduler.interval,
+            'faces': len(self.tracker.face_data.get('faces') or []),
+        })
+        return summary
+    
+    def effect_stages(self, name):
+        """The stages of one effect, in order
+
+        Each stage is ``('pixels', method)`` for work that needs the whole
+        image, or ``('levels', op)`` for a per-channel point operation that
+        can be fused with its neighbours into one ColorMap.
+        """
+        if name == "beauty":
+            return [('pixels', self.apply_beauty_smoothing), ('levels', beauty_lift(self.intensity))]
+        if name == "tint":
+            return [('levels', self.tint_levels())]
+        if name == "cartoon":
+            return [('pixels', self.apply_cartoon)]
+        if name == "glow":
+            return [('pixels', self.apply_glow)]
+        if name == "edge":
+            return [('pixels', self.apply_edge)]
+        if name == "blur":
+            return [('pixels', self.apply_blur)]
+        return []
+    
+    def compile_chain(self, names):
+        """Plan for the named effects: ('pixels', stage, method) and ('color', stage, ColorMap) steps
+
+        Consecutive levels stages, such as beauty's brightness lift followed
+        by a tint, become one ColorMap, and the saturation adjustment is
+        folded into the last one. Tables come from ``compile_color_map``, so
+        they are only rebuilt when a setting they depend on changes. ``stage``
+        is the name each step is timed under in ``stats``.
+        """
+        plan = []
+        ops = []
         
-        result = (frame * (1 - skin_mask) + smoothed * skin_mask).astype(np.uint8)
+        for name in names:
+            for kind, stage in self.effect_stages(name):
+                if kind == 'levels':
+                    ops.append(stage)
+                    continue
+                if ops:
+                    plan.append(('color', 'effect:color', compile_color_map(tuple(ops))))
+                    ops = []
+                plan.append(('pixels', f"effect:{name}", stage))
         
-        # Subtle brightness increase
-        result = cv2.convertScaleAbs(result, alpha=1.0 + intensity * 0.1, beta=intensity * 10)
+        if self.saturation != 1.0:
+            ops.append(('saturation', self.saturation))
+        if ops:
+            plan.append(('color', 'effect:color', compile_color_map(tuple(ops))))
+        return plan
+    
+    def run_chain(self, frame, plan=None):
+        """Apply a compiled effect chain (by default the one from the current settings)
+
+        Grayscale/HSV conversions are shared through a FrameAnalysis for as
+        long as the stages leave the frame unchanged, so the result is the
+        same as applying each effect in turn.
+        """
+        if plan is None:
+            if self.chain_plan is None:
+                self.chain_plan = self.compile_chain(self.effect_chain or [self.effect_type])
+            plan = self.chain_plan
         
-        return result
+        analysis = FrameAnalysis(frame, self.scratch)
+        for kind, stage, step in plan:
+            start = time.perf_counter()
+            if kind == 'color':
+                frame = step.apply(frame, self.scratch)
+            else:
+                if frame is not analysis.frame:
+                    analysis = FrameAnalysis(frame, self.scratch)
+                frame = step(frame, analysis)
+            self.stats.record(stage, (time.perf_counter() - start) * 1000)
+        return frame
+    
+    def tint_levels(self):
+        return ('tint', tuple(self.tint_color[:3]), self.intensity)
+    
+    def apply_beauty(self, frame, analysis=None):
+        """Apply skin smoothing effect"""
+        return beauty_filter(frame, self.intensity, self.scratch,
+                             analysis.skin_mask if analysis else None)
     
-    def apply_cartoon(self, frame):
+    def apply_beauty_smoothing(self, frame, analysis):
+        """Skin smoothing without the brightness lift, for effect chains"""
+        return beauty_smooth(frame, self.intensity, analysis.skin_mask, self.scratch)
+    
+    def apply_cartoon(self, frame, analysis=None):
         """Apply cartoon effect"""
-        intensity = self.intensity
-        
-        # Edge detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray_blur = cv2.medianBlur(gray, 7)
-        edges = cv2.adaptiveThreshold(
-            gray_blur, 255, 
-            cv2.ADAPTIVE_THRESH_MEAN_C, 
-            cv2.THRESH_BINARY, 
-            9, 2
-        )
-        
-        # Color quantization
-        color = frame.copy()
-        Z = color.reshape((-1, 3))
-        Z = np.float32(Z)
-        
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-        K = 8
-        _, labels, centers = cv2.kmeans(Z, K, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-        
-        centers = np.uint8(centers)
-        quantized = centers[labels.flatten()]
-        quantized = quantized.reshape((color.shape))
-        
-        # Combine edges with quantized colors
-        edges = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-        result = cv2.bitwise_and(quantized, edges)
-        
-        # Blend with original based on intensity
-        result = cv2.addWeighted(frame, 1 - intensity, result, intensity, 0)
-        
-        return result
+        return cartoon_filter(frame, self.intensity, self.cartoon_quantizer,
+                              self.cartoon_palette, self.scratch,
+                              analysis.gray if analysis else None)
     
-    def apply_glow(self, frame):
+    def apply_glow(self, frame, analysis=None):
         """Apply glow effect centered on face"""
         intensity = self.intensity
         
-        # Blur the frame
-        blurred = cv2.GaussianBlur(frame, (21, 21), 0)
+        face = self.tracker.face_data
         
-        # Create mask if face detected
-        if face_data['detected']:
-            h, w = frame.shape[:2]
-            mask = np.zeros((h, w), dtype=np.uint8)
-            
-            # Draw ellipse at face position
-            center = (
-                int(face_data['center_x'] * w),
-                int(face_data['center_y'] * h)
-            )
-            axes = (
-                int(face_data['width'] * w * 0.6),
-                int(face_data['height'] * h * 0.6)
-            )
-            
-            cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
-            
-            # Blur mask edges
-            mask = cv2.GaussianBlur(mask, (51, 51), 0)
-            mask = mask.astype(float) / 255.0 * intensity
-            mask = np.stack([mask] * 3, axis=2)
-            
-            # Apply glow only to face region
-            result = (frame * (1 - mask) + blurred * mask).astype(np.uint8)
+        out = self.scratch.get('glow', frame.shape)
+        mask = None
+        if face['detected']:
+            mask = self.mask_cache.get(frame.shape, face.get('faces') or [face], axis_scale=0.6)
+        
+        if mask is not None:
+            # Blur and glow only the face regions; the rest passes through
+            np.copyto(out, frame)
+            rows, cols = mask.rows, mask.cols
+            blurred = blurred_region(frame, rows, cols, 21,
+                                     self.scratch.get('glow_blur', frame.shape))
+            weights, inverse = mask.weights_for(intensity)
+            cv2.blendLinear(frame[rows, cols], blurred, inverse, weights, dst=out[rows, cols])
+            result = out
         else:
             # Subtle overall glow
-            result = cv2.addWeighted(frame, 1.0, blurred, intensity * 0.3, 0)
+            blurred = cv2.GaussianBlur(frame, (21, 21), 0,
+                                       dst=self.scratch.get('glow_blur', frame.shape))
+            result = cv2.addWeighted(frame, 1.0, blurred, intensity * 0.3, 0, dst=out)
         
         return result
     
-    def apply_tint(self, frame):
+    def apply_tint(self, frame, analysis=None):
         """Apply color tint"""
-        tint = np.array(self.tint_color[:3]) * 255
-        intensity = self.intensity
-        
-        # Create tint overlay
-        tinted = frame * (1 - intensity) + tint * intensity
-        
-        return tinted.astype(np.uint8)
+        return compile_color_map((self.tint_levels(),)).apply(frame, self.scratch, 'tint')
     
-    def apply_edge(self, frame):
+    def apply_edge(self, frame, analysis=None):
         """Apply edge detection"""
         intensity = self.intensity
+        h, w = frame.shape[:2]
         
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-        edges = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+        if analysis is not None:
+            gray = analysis.gray
+        else:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY,
+                                dst=self.scratch.get('edge_gray', (h, w)))
+        edges = cv2.Canny(gray, 100, 200, edges=self.scratch.get('edge_mask', (h, w)))
+        edges = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR,
+                             dst=self.scratch.get('edge_bgr', frame.shape))
         
         # Invert edges for better look
-        edges = 255 - edges
+        edges = cv2.bitwise_not(edges, dst=edges)
         
         # Blend with original
-        result = cv2.addWeighted(frame, 1 - intensity, edges, intensity, 0)
+        result = cv2.addWeighted(frame, 1 - intensity, edges, intensity, 0,
+                                 dst=self.scratch.get('edge', frame.shape))
         
         return result
     
-    def apply_blur(self, frame):
+    def apply_blur(self, frame, analysis=None):
         """Apply Gaussian blur"""
         intensity = self.intensity
         
@@ -443,60 +2380,249 @@ class SnapFilter:
                 kernel_size += 1
             kernel_size = max(3, min(kernel_size, 31))
             
-            result = cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0)
+            result = cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0,
+                                      dst=self.scratch.get('blur', frame.shape))
             
             # Blend with original
-            result = cv2.addWeighted(frame, 1 - intensity, result, intensity, 0)
+            result = cv2.addWeighted(frame, 1 - intensity, result, intensity, 0, dst=result)
             return result
         
         return frame
     
     def apply_face_effect(self, frame):
-        """Apply effects specifically to face region"""
-        if not face_data['detected']:
+        """Apply effects specifically to the face regions"""
+        face = self.tracker.face_data
+        if not face['detected']:
             return frame
         
-        h, w = frame.shape[:2]
+        # One cached feathered mask covers all face regions
+        mask = self.mask_cache.get(frame.shape, face.get('faces') or [face])
+        if mask is None:
+            return frame
+        rows, cols = mask.rows, mask.cols
+        weights, inverse = mask.weights_for(0.5)
         
-        # Calculate face region
-        cx = int(face_data['center_x'] * w)
-        cy = int(face_data['center_y'] * h)
-        fw = int(face_data['width'] * w)
-        fh = int(face_data['height'] * h)
+        out = self.scratch.get('face', frame.shape)
+        np.copyto(out, frame)
         
-        # Create mask for face region
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.ellipse(mask, (cx, cy), (fw//2, fh//2), 
-                   np.degrees(face_data.get('rotation', 0)), 
-                   0, 360, 255, -1)
+        # Example: brighten face region
+        region = frame[rows, cols]
+        brightened = compile_color_map(FACE_BRIGHTEN).apply(region, self.scratch, 'face_bright')
         
-        # Blur mask edges
-        mask = cv2.GaussianBlur(mask, (51, 51), 0)
-        mask = mask.astype(float) / 255.0
+        # Blend based on mask, only inside the mask's bounding box
+        cv2.blendLinear(region, brightened, inverse, weights, dst=out[rows, cols])
         
-        # Example: brighten face region
-        brightened = cv2.convertScaleAbs(frame, alpha=1.1, beta=10)
+        return out
+
+# Shared libobs names to try, per platform, when obspython cannot map pixels itself
+LIBOBS_NAMES = ("obs", "obs.dll", "libobs.so.0", "libobs.so", "libobs.0.dylib",
+                "libobs.framework/libobs")
+
+class LibobsPixels:
+    """Raw pixel access to stage surfaces and textures through libobs
+
+    obspython's SWIG wrappers cannot return the pointer that
+    ``gs_stagesurface_map`` writes or pass one to ``gs_texture_set_image``,
+    so these two calls go through ctypes on the libobs already loaded into
+    the OBS process. Use ``graphics_pixels()`` rather than creating one.
+    """
+    
+    def __init__(self):
+        self.lib = self._load()
+        u8_p = ctypes.POINTER(ctypes.c_uint8)
+        self.lib.gs_stagesurface_map.argtypes = [ctypes.c_void_p, ctypes.POINTER(u8_p),
+                                                 ctypes.POINTER(ctypes.c_uint32)]
+        self.lib.gs_stagesurface_map.restype = ctypes.c_bool
+        self.lib.gs_stagesurface_unmap.argtypes = [ctypes.c_void_p]
+        self.lib.gs_stagesurface_unmap.restype = None
+        self.lib.gs_texture_set_image.argtypes = [ctypes.c_void_p, u8_p, ctypes.c_uint32,
+                                                  ctypes.c_bool]
+        self.lib.gs_texture_set_image.restype = None
+    
+    @staticmethod
+    def _load():
+        for name in filter(None, (ctypes.util.find_library("obs"),) + LIBOBS_NAMES):
+            try:
+                return ctypes.CDLL(name)
+            except OSError:
+                continue
+        raise OSError("libobs not found")
+    
+    @staticmethod
+    def _address(handle):
+        # SWIG pointers convert to their address; proxy classes wrap one in .this
+        return int(getattr(handle, 'this', handle))
+    
+    def map(self, surface, height):
+        """The mapped rows as a (height, linesize) uint8 view, or None"""
+        data = ctypes.POINTER(ctypes.c_uint8)()
+        linesize = ctypes.c_uint32()
+        if not self.lib.gs_stagesurface_map(self._address(surface), ctypes.byref(data),
+                                            ctypes.byref(linesize)):
+            return None
+        return np.ctypeslib.as_array(data, shape=(height, linesize.value))
+    
+    def unmap(self, surface):
+        self.lib.gs_stagesurface_unmap(self._address(surface))
+    
+    def set_image(self, texture, pixels):
+        """Upload a contiguous (height, width, 4) uint8 array"""
+        self.lib.gs_texture_set_image(self._address(texture),
+                                      pixels.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
+                                      pixels.strides[0], False)
+
+libobs_pixels = None
+
+def graphics_pixels():
+    """Pixel access for stage surfaces and textures
+
+    An obspython stand-in can provide its own as ``obs.pixels``; inside OBS
+    this is a shared LibobsPixels.
+    """
+    global libobs_pixels
+    pixels = getattr(obs, 'pixels', None)
+    if pixels is not None:
+        return pixels
+    if libobs_pixels is None:
+        libobs_pixels = LibobsPixels()
+    return libobs_pixels
+
+class GpuReadback:
+    """Pipelined copies of a filter's target from the GPU to CPU frames
+
+    Each render draws the target into a texrender and stages the result
+    into the next of ``slots`` stage surfaces. The surface that is mapped is
+    the one staged ``slots - 1`` renders earlier, whose copy the GPU has long
+    finished, so mapping never waits on the GPU and stalls the graphics
+    thread; the price is ``slots - 1`` frames of latency. Mapped BGRA rows are
+    converted straight into a FrameRing buffer. Must be used, and destroyed,
+    inside the graphics context.
+    """
+    
+    def __init__(self, slots=3):
+        self.slots = slots
+        self.width = 0
+        self.height = 0
+        self.texrender = None
+        self.surfaces = []
+        self.staged = []
+        self.index = 0
+    
+    def _resize(self, width, height):
+        for surface in self.surfaces:
+            obs.gs_stagesurface_destroy(surface)
+        self.surfaces = [obs.gs_stagesurface_create(width, height, obs.GS_BGRA)
+                         for _ in range(self.slots)]
+        self.staged = [False] * self.slots
+        self.index = 0
+        self.width = width
+        self.height = height
+    
+    def render(self, target, width, height):
+        """Draw ``target`` into the texrender; returns its texture or None"""
+        if self.texrender is None:
+            self.texrender = obs.gs_texrender_create(obs.GS_BGRA, obs.GS_ZS_NONE)
+        if (width, height) != (self.width, self.height) or len(self.surfaces) != self.slots:
+            self._resize(width, height)
         
-        # Blend based on mask
-        mask_3ch = np.stack([mask] * 3, axis=2)
-        result = (frame * (1 - mask_3ch * 0.5) + brightened * mask_3ch * 0.5).astype(np.uint8)
+        obs.gs_texrender_reset(self.texrender)
+        if not obs.gs_texrender_begin(self.texrender, width, height):
+            return None
+        clear_color = obs.vec4()
+        obs.vec4_zero(clear_color)
+        obs.gs_clear(obs.GS_CLEAR_COLOR, clear_color, 0.0, 0)
+        obs.gs_ortho(0.0, float(width), 0.0, float(height), -100.0, 100.0)
+        obs.obs_source_video_render(target)
+        obs.gs_texrender_end(self.texrender)
+        return obs.gs_texrender_get_texture(self.texrender)
+    
+    def stage(self, texture, ring):
+        """Stage ``texture`` and read back the oldest staged surface
+
+        Returns a FrameBuffer from ``ring`` holding one reference for the
+        caller, or None while the pipeline is still filling.
+        """
+        obs.gs_stage_texture(self.surfaces[self.index], texture)
+        self.staged[self.index] = True
+        self.index = (self.index + 1) % self.slots
         
-        return result
+        # The next slot to be overwritten holds the oldest copy
+        if not self.staged[self.index]:
+            return None
+        surface = self.surfaces[self.index]
+        pixels = graphics_pixels()
+        rows = pixels.map(surface, self.height)
+        if rows is None:
+            return None
+        try:
+            bgra = rows[:, :self.width * 4].reshape(self.height, self.width, 4)
+            frame = ring.acquire((self.height, self.width, 3))
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=frame.array)
+            return frame
+        finally:
+            pixels.unmap(surface)
+    
+    def destroy(self):
+        for surface in self.surfaces:
+            obs.gs_stagesurface_destroy(surface)
+        self.surfaces = []
+        self.staged = []
+        self.width = self.height = 0
+        if self.texrender is not None:
+            obs.gs_texrender_destroy(self.texrender)
+            self.texrender = None
 
-# OBS Filter callbacks
-filter_instance = None
+class FrameUpload:
+    """Dynamic texture holding a filter's latest processed frame"""
+    
+    def __init__(self):
+        self.texture = None
+        self.width = 0
+        self.height = 0
+    
+    def upload(self, frame, scratch):
+        height, width = frame.shape[:2]
+        if self.texture is None or (width, height) != (self.width, self.height):
+            self.destroy()
+            self.texture = obs.gs_texture_create(width, height, obs.GS_BGRA, 1, None, obs.GS_DYNAMIC)
+            self.width = width
+            self.height = height
+        bgra = scratch.get('upload', (height, width, 4))
+        cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=bgra)
+        graphics_pixels().set_image(self.texture, bgra)
+        return self.texture
+    
+    def destroy(self):
+        if self.texture is not None:
+            obs.gs_texture_destroy(self.texture)
+            self.texture = None
 
+def draw_texture(texture, width, height):
+    """Draw a texture with the default effect into the current target"""
+    effect = obs.obs_get_base_effect(obs.OBS_EFFECT_DEFAULT)
+    image = obs.gs_effect_get_param_by_name(effect, "image")
+    obs.gs_effect_set_texture(image, texture)
+    while obs.gs_effect_loop(effect, "Draw"):
+        obs.gs_draw_sprite(texture, 0, width, height)
+
+# OBS Filter callbacks
 def filter_create(settings, source):
-    global filter_instance
-    filter_instance = SnapFilter(source, settings)
+    filter_obj = SnapFilter(source, settings)
+    filter_sources[id(filter_obj)] = filter_obj
     print(f"[{SCRIPT_NAME}] Filter created")
-    return filter_instance
+    return filter_obj
 
 def filter_destroy(filter_obj):
-    global filter_instance
     if filter_obj:
+        filter_sources.pop(id(filter_obj), None)
+        filter_obj.tracker.close()
+        obs.obs_enter_graphics()
+        filter_obj.readback.destroy()
+        filter_obj.upload.destroy()
+        obs.obs_leave_graphics()
+        if filter_obj.lens_bundle is not None:
+            filter_obj.lens_bundle.close()
         print(f"[{SCRIPT_NAME}] Filter destroyed")
-        filter_instance = None
 
 def filter_update(filter_obj, settings):
     if filter_obj:
@@ -509,7 +2635,12 @@ def filter_get_defaults(settings):
     script_defaults(settings)
 
 def filter_video_render(filter_obj, effect):
-    """Render callback - processes the frame"""
+    """Render callback - reads the target back, processes it and draws the result
+
+    Runs on the graphics thread. The frame drawn is the one read back
+    through ``filter_obj.readback``, so it lags the target by the readback
+    depth; until the pipeline has filled, the target is drawn unfiltered.
+    """
     if not filter_obj:
         return
     
@@ -521,13 +2652,30 @@ def filter_video_render(filter_obj, effect):
     # Get the source output
     width = obs.obs_source_get_base_width(target)
     height = obs.obs_source_get_base_height(target)
+    if not width or not height:
+        obs.obs_source_skip_video_filter(filter_obj.source)
+        return
     
-    # Capture the frame (simplified - in reality this needs proper texture handling)
-    # For now, this is a placeholder showing the structure
-    # Full implementation would require proper OBS graphics API usage
+    texture = filter_obj.readback.render(target, width, height)
+    if texture is None:
+        obs.obs_source_skip_video_filter(filter_obj.source)
+        return
+    
+    start = time.perf_counter()
+    frame = filter_obj.readback.stage(texture, filter_obj.frames)
+    if frame is not None:
+        filter_obj.stats.record('readback', (time.perf_counter() - start) * 1000)
+        try:
+            output = filter_obj.process_frame(frame)
+            start = time.perf_counter()
+            texture = filter_obj.upload.upload(output, filter_obj.scratch)
+            filter_obj.stats.record('upload', (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            filter_obj.stats.error("Render", e)
+        finally:
+            frame.release()
     
-    # Render the source
-    obs.obs_source_video_render(target)
+    draw_texture(texture, width, height)
 
 def filter_video_tick(filter_obj, seconds):
     pass
@@ -535,13 +2683,17 @@ def filter_video_tick(filter_obj, seconds):
 # Script update callback
 def script_update(settings):
     """Called when script settings are updated"""
-    # Update global face tracking settings
-    global face_data
-    face_data['smoothing'] = obs.obs_data_get_double(settings, "smoothing")
+    global stats_file
     
-    # Update all active filters
+    # Update all active filters (each reconfigures its own tracker)
     for source_id, filter_obj in filter_sources.items():
         if filter_obj:
             filter_obj.update(settings)
+    
+    # (Re)start the periodic stats dump
+    stats_file = obs.obs_data_get_string(settings, "stats_file")
+    obs.timer_remove(dump_stats)
+    if stats_file:
+        obs.timer_add(dump_stats, obs.obs_data_get_int(settings, "stats_interval") * 1000)
 
 # Note: script_load and script_unload are already defined at the top of the file
@@ -131,7 +131,7 @@ def test_lens_converter():
             print(f"\nChecking output files in {lens_output}:")
             
             checks = [
-                ("lens.json", lens_output / "lens.json"),
+                ("Lens info", lens_output / "obs_assets" / "lens_info.json"),
                 ("OBS assets directory", lens_output / "obs_assets"),
                 ("Converted textures", lens_output / "obs_assets" / "textures"),
                 ("Converted shaders", lens_output / "obs_assets" / "shaders"),
@@ -164,9 +164,313 @@ def test_lens_converter():
         traceback.print_exc()
         return False
 
+def test_batch_convert_parallel():
+    """Parallel batch conversion produces the same ordered report as a serial run"""
+    print("\nTesting parallel batch conversion...")
+    
+    from snap_lens_converter import batch_convert
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir) / "lenses"
+        input_dir.mkdir()
+        
+        for i in range(4):
+            create_test_lens(input_dir / f"lens_{i}.lns")
+        (input_dir / "broken.zip").write_text("not a zip file")
+        
+        serial = batch_convert(str(input_dir), str(Path(temp_dir) / "serial"), jobs=1)
+        parallel = batch_convert(str(input_dir), str(Path(temp_dir) / "parallel"), jobs=3)
+        
+        assert parallel['lenses'] == serial['lenses']
+        assert parallel['successful'] == 4 and parallel['failed'] == 1
+        assert [l['file'] for l in parallel['lenses']][-1] == "broken.zip"
+        print("  ✓ Report matches serial run")
+
+def test_conversion_worker_extractor():
+    """Each conversion worker reuses one extractor and closes its index on exit"""
+    print("\nTesting conversion worker setup...")
+    
+    import sqlite3
+    import snap_lens_converter
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(2):
+            create_test_lens(Path(temp_dir) / f"lens_{i}.lns")
+        
+        snap_lens_converter._init_conversion_worker(str(Path(temp_dir) / "out"), {})
+        extractor = snap_lens_converter._worker_extractor
+        try:
+            indexes = []
+            for i in range(2):
+                metadata, _ = snap_lens_converter._convert_lens_worker(
+                    str(Path(temp_dir) / f"lens_{i}.lns"), False)
+                assert metadata is not None
+                indexes.append(extractor.index)
+            assert indexes[0] is indexes[1] and snap_lens_converter._worker_extractor is extractor
+            print("  ✓ One extractor and index connection per worker")
+            
+            connection = extractor.index._conn
+            extractor.close()
+            try:
+                connection.execute("SELECT 1")
+                assert False, "index connection still open"
+            except sqlite3.ProgrammingError:
+                pass
+            print("  ✓ Closing the extractor closes its index")
+        finally:
+            extractor.close()
+            snap_lens_converter._worker_extractor = None
+
+def write_lens(path, members):
+    """Write a lens archive from a {member name: text content} mapping"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for name, content in members.items():
+            zipf.writestr(name, content)
+
+def test_incremental_conversion():
+    """Unchanged lenses are skipped, changed members reconverted, stale outputs removed"""
+    print("\nTesting incremental conversion...")
+    
+    from snap_lens_converter import SnapLensExtractor
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        lens_path = Path(temp_dir) / "incremental.lns"
+        members = {
+            "lens.json": json.dumps({"name": "Incremental"}),
+            "shaders/a.glsl": "void main() { gl_FragColor = vec4(1.0); }",
+            "textures/old.png": "png",
+        }
+        write_lens(lens_path, members)
+        
+        extractor = SnapLensExtractor(str(Path(temp_dir) / "out"))
+        assets = Path(temp_dir) / "out" / "incremental" / "obs_assets"
+        
+        assert extractor.extract_lens(str(lens_path)).name == "Incremental"
+        shader_mtime = (assets / "shaders" / "a.shader").stat().st_mtime_ns
+        info_mtime = (assets / "lens_info.json").stat().st_mtime_ns
+        
+        # Second run of the same content is a no-op
+        assert extractor.extract_lens(str(lens_path)).name == "Incremental"
+        assert (assets / "lens_info.json").stat().st_mtime_ns == info_mtime
+        print("  ✓ Unchanged lens skipped")
+        
+        # Replace the texture; the untouched shader is not reconverted
+        del members["textures/old.png"]
+        members["textures/new.png"] = "png"
+        write_lens(lens_path, members)
+        extractor.extract_lens(str(lens_path))
+        assert (assets / "textures" / "new.png").exists()
+        assert not (assets / "textures" / "old.png").exists()
+        assert (assets / "shaders" / "a.shader").stat().st_mtime_ns == shader_mtime
+        print("  ✓ Only changed members reconverted, stale outputs removed")
+        
+        os.utime(assets / "shaders" / "a.shader", ns=(0, 0))
+        extractor.extract_lens(str(lens_path), force=True)
+        assert (assets / "shaders" / "a.shader").stat().st_mtime_ns != 0
+        print("  ✓ Force reconverts everything")
+
+def test_raw_extraction_opt_in():
+    """Raw archive content is only written when requested"""
+    print("\nTesting raw extraction opt-in...")
+    
+    from snap_lens_converter import SnapLensExtractor
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        lens_path = Path(temp_dir) / "raw.lns"
+        write_lens(lens_path, {
+            "lens.json": json.dumps({"name": "Raw"}),
+            "shaders/a.glsl": "void main() { gl_FragColor = vec4(1.0); }",
+            "scripts/main.js": "// lens logic",
+        })
+        output_dir = Path(temp_dir) / "out"
+        lens_output = output_dir / "raw"
+        
+        SnapLensExtractor(str(output_dir)).extract_lens(str(lens_path))
+        assert (lens_output / "obs_assets" / "shaders" / "a.shader").exists()
+        assert not (lens_output / "shaders").exists()
+        print("  ✓ Assets converted without extracting the archive")
+        
+        SnapLensExtractor(str(output_dir), extract_raw=True).extract_lens(str(lens_path))
+        assert (lens_output / "scripts" / "main.js").exists()
+        assert (lens_output / "lens.json").exists()
+        print("  ✓ Raw content extracted with extract_raw")
+        
+        SnapLensExtractor(str(output_dir)).extract_lens(str(lens_path))
+        assert not (lens_output / "scripts" / "main.js").exists()
+        print("  ✓ Raw content removed when extract_raw is turned off")
+
+def test_glsl_translation():
+    """GLSL translation rewrites whole identifiers and keeps global declarations"""
+    print("\nTesting GLSL to HLSL translation...")
+    
+    from snap_lens_converter import GlslTranslator
+    
+    hlsl = GlslTranslator().translate("""
+precision mediump float;
+varying vec2 vUv;
+uniform sampler2D mySampler2D;
+uniform float myvec2;
+
+vec3 tint(vec3 c) { return mix(c, vec3(1.0), myvec2); }
+
+void main() {
+    vec4 color = texture2D(mySampler2D, vUv);
+    gl_FragColor = vec4(tint(color.rgb), color.a);
+}
+""")
+    
+    assert "uniform texture2d mySampler2D;" in hlsl
+    assert "uniform float myvec2;" in hlsl
+    assert "precision" not in hlsl
+    print("  ✓ Identifiers containing GLSL keywords left intact")
+    
+    helper = hlsl.index("float3 tint(float3 c) { return lerp(c, float3(1.0), myvec2); }")
+    assert helper < hlsl.index("float4 mainImage(")
+    print("  ✓ Helper functions kept at global scope")
+    
+    assert "float4 color = mySampler2D.Sample(textureSampler, vUv);" in hlsl
+    assert "output_color = float4(tint(color.rgb), color.a);" in hlsl
+    assert "float2 vUv = uv;" in hlsl
+    print("  ✓ Texture lookups and outputs rewritten")
+
+def test_shader_translation_cache():
+    """Equivalent shaders are translated once and the cache stays size-bounded"""
+    print("\nTesting shader translation cache...")
+    
+    from snap_lens_converter import batch_convert, ShaderTranslationCache
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir) / "lenses"
+        input_dir.mkdir()
+        shader = "void main() {\n    gl_FragColor = vec4(1.0);\n}\n"
+        write_lens(input_dir / "a.lns", {"shaders/blur.glsl": shader})
+        write_lens(input_dir / "b.lns", {"shaders/blur.glsl": "// copy\n" + shader.replace("    ", "\t")})
+        output_dir = Path(temp_dir) / "out"
+        
+        report = batch_convert(str(input_dir), str(output_dir))
+        assert report['shader_cache']['misses'] == 1
+        assert report['shader_cache']['hits'] == 1
+        print("  ✓ Shaders differing only in comments and whitespace share a translation")
+        
+        report = batch_convert(str(input_dir), str(output_dir), force=True)
+        assert report['shader_cache'] == {'hits': 2, 'misses': 0, 'evicted': 0}
+        print("  ✓ Cache persists across runs")
+        
+        cache = ShaderTranslationCache(Path(temp_dir) / "cache", max_bytes=0)
+        cache.translate(shader)
+        assert cache.evict() == 1 and not list(cache.cache_dir.glob("*.shader"))
+        print("  ✓ Entries evicted beyond the size limit")
+
+def test_texture_transcoding():
+    """Textures are downscaled, mipmapped and reported in lens_info.json"""
+    print("\nTesting texture transcoding...")
+    
+    from PIL import Image
+    from snap_lens_converter import SnapLensExtractor, TextureOptions
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        texture_path = Path(temp_dir) / "big.webp"
+        Image.new('RGB', (256, 128), color='red').save(texture_path, 'WEBP')
+        lens_path = Path(temp_dir) / "textured.lns"
+        with zipfile.ZipFile(lens_path, 'w') as zipf:
+            zipf.write(texture_path, "textures/big.webp")
+        
+        options = TextureOptions(max_size=64, mipmaps=True, compress_level=9)
+        extractor = SnapLensExtractor(str(Path(temp_dir) / "out"), texture_options=options)
+        assert extractor.extract_lens(str(lens_path)) is not None
+        
+        textures = Path(temp_dir) / "out" / "textured" / "obs_assets" / "textures"
+        assert Image.open(textures / "big.png").size == (64, 32)
+        assert Image.open(textures / "big.mip6.png").size == (1, 1)
+        print("  ✓ Texture downscaled with mip levels")
+        
+        with open(textures.parent / "lens_info.json") as f:
+            info = json.load(f)
+        assert info['files']['textures'] == ["big.png"]
+        stats = info['texture_stats'][0]
+        assert stats['source_size'] == [256, 128] and stats['mip_levels'] == 6
+        assert stats['saved_bytes'] == stats['source_bytes'] - stats['output_bytes']
+        print("  ✓ Per-texture stats recorded")
+
+def test_lens_bundle():
+    """Converted lenses can be packed into a single indexed bundle file"""
+    print("\nTesting lens bundle output...")
+    
+    from PIL import Image
+    from snap_lens_converter import SnapLensExtractor, BUNDLE_HEADER, BUNDLE_MAGIC, BUNDLE_ALIGNMENT
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        texture_path = Path(temp_dir) / "t.png"
+        Image.new('RGBA', (5, 3), color=(1, 2, 3, 4)).save(texture_path)
+        lens_path = Path(temp_dir) / "bundled.lns"
+        with zipfile.ZipFile(lens_path, 'w') as zipf:
+            zipf.write(texture_path, "textures/t.png")
+            zipf.writestr("lens.json", json.dumps({"name": "Bundled"}))
+            zipf.writestr("shaders/a.glsl", "void main() { gl_FragColor = vec4(1.0); }")
+        
+        extractor = SnapLensExtractor(str(Path(temp_dir) / "out"), bundle=True)
+        assert extractor.extract_lens(str(lens_path)) is not None
+        
+        data = (Path(temp_dir) / "out" / "bundled" / "obs_assets" / "lens.snapbundle").read_bytes()
+        magic, _, _, toc_offset, toc_length = BUNDLE_HEADER.unpack_from(data)
+        assert magic == BUNDLE_MAGIC
+        toc = json.loads(data[toc_offset:toc_offset + toc_length])
+        assert toc['info']['name'] == "Bundled"
+        
+        entries = {e['name']: e for e in toc['entries']}
+        assert set(entries) == {"t.png", "snap_filter.shader", "shaders/a.shader"}
+        texture = entries["t.png"]
+        assert texture['offset'] % BUNDLE_ALIGNMENT == 0
+        assert (texture['width'], texture['height'], texture['length']) == (5, 3, 5 * 3 * 4)
+        assert data[texture['offset']:texture['offset'] + 4] == bytes([1, 2, 3, 4])
+        print("  ✓ Bundle header, table of contents and RGBA blobs written")
+
+def test_lens_index():
+    """Converted lenses are queryable through the SQLite lens index"""
+    print("\nTesting lens library index...")
+    
+    from snap_lens_converter import batch_convert, LensIndex, LENS_INDEX_NAME
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir) / "lenses"
+        input_dir.mkdir()
+        write_lens(input_dir / "beauty.lns", {
+            "lens.json": json.dumps({"name": "Beauty", "category": "beauty", "face_tracking": True}),
+            "shaders/a.glsl": "void main() { gl_FragColor = vec4(1.0); }",
+        })
+        write_lens(input_dir / "world.lns", {
+            "lens.json": json.dumps({"name": "World", "category": "world", "uses_3d": True}),
+        })
+        output_dir = Path(temp_dir) / "out"
+        batch_convert(str(input_dir), str(output_dir))
+        
+        index = LensIndex(output_dir / LENS_INDEX_NAME)
+        assert [l['name'] for l in index.query()] == ["Beauty", "World"]
+        beauty = index.query(face_tracking=True)
+        assert [l['lens_id'] for l in beauty] == ["beauty"] and beauty[0]['shader_count'] == 1
+        assert [l['name'] for l in index.query(category="world", uses_3d=True)] == ["World"]
+        assert index.query(search="eau")[0]['name'] == "Beauty"
+        print("  ✓ Lenses queryable by metadata")
+        
+        (input_dir / "world.lns").unlink()
+        batch_convert(str(input_dir), str(output_dir))
+        assert [l['name'] for l in index.query()] == ["Beauty"]
+        index.close()
+        print("  ✓ Deleted lenses removed from the index")
+
 def main():
     success = test_lens_converter()
     
+    for test in (test_batch_convert_parallel, test_conversion_worker_extractor,
+                 test_incremental_conversion, test_raw_extraction_opt_in,
+                 test_glsl_translation, test_shader_translation_cache,
+                 test_texture_transcoding, test_lens_bundle, test_lens_index):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__doc__} failed: {e}")
+            success = False
+    
     print("\n" + "=" * 60)
     if success:
         print("✓ Lens converter test passed")
@@ -0,0 +1,775 @@
+#!/usr/bin/env python3
+"""
+Test script for the OBS filter script
+Drives snap_filter.py outside OBS through the obspython stand-in
+"""
+
+import sys
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add obs-python-script to path
+sys.path.insert(0, str(Path(__file__).parent / "obs-python-script"))
+
+import obs_standin
+obs_standin.install()
+
+import snap_filter
+import benchmark_beauty
+import benchmark_filter
+import replay_filter
+
+def test_effects_headless():
+    """Every effect and chain runs on a stand-in configured filter"""
+    print("Testing effects outside OBS...")
+
+    filt = benchmark_filter.make_filter(240, 320, 0.5)
+    frame = benchmark_filter.background(240, 320)
+    benchmark_filter.draw_face(frame, 0.5, 0.45, 0.25)
+
+    for effect in benchmark_filter.EFFECTS:
+        out = benchmark_filter.effect_step(filt, effect)(frame)
+        assert out.shape == frame.shape and out.dtype == np.uint8, effect
+    print("  ✓ All effects run")
+
+    filt.run_chain(frame, filt.compile_chain(['beauty', 'tint', 'glow']))
+    stages = filt.stats.summary()['stages']
+    assert {'effect:beauty', 'effect:color', 'effect:glow'} <= set(stages)
+    print("  ✓ Chain steps timed per stage")
+
+def test_stats_surface():
+    """Stats panel text and periodic JSON dump"""
+    print("Testing stats surface...")
+
+    filt = snap_filter.filter_create(obs_standin.settings({'enable_tracking': False}),
+                                     obs_standin.Source('camera', 320, 240))
+    try:
+        filt.process_frame(np.zeros((240, 320, 3), dtype=np.uint8))
+
+        props = snap_filter.script_properties()
+        info = obs_standin.obs_properties_get(props, "stats_info")
+        assert info.description.startswith("camera: ")
+        print("  ✓ Stats shown in properties")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stats_path = str(Path(temp_dir) / "stats.json")
+            snap_filter.script_update(obs_standin.settings({'stats_file': stats_path}))
+            obs_standin.run_timers()
+            with open(stats_path) as f:
+                report = json.load(f)
+            assert report['filters']['camera']['counters']['frames'] == 1
+            print("  ✓ Stats file written by timer")
+    finally:
+        snap_filter.script_unload()
+        snap_filter.filter_destroy(filt)
+
+def test_benchmark_regressions():
+    """Baseline comparison flags slowed-down cases only"""
+    print("Testing benchmark baseline comparison...")
+
+    baseline = [{'case': 'effect:glow@720p', 'p50_ms': 4.0},
+                {'case': 'effect:blur@720p', 'p50_ms': 4.0}]
+    results = [{'case': 'effect:glow@720p', 'p50_ms': 9.0},
+               {'case': 'effect:blur@720p', 'p50_ms': 5.0},
+               {'case': 'effect:edge@720p', 'p50_ms': 50.0}]
+
+    regressions = benchmark_filter.compare(results, baseline, 1.5)
+    assert [r['case'] for r in regressions] == ['effect:glow@720p']
+    print("  ✓ Regression reported against baseline")
+
+def test_replay_image_sequence():
+    """Offline replay over an image sequence writes video and timings"""
+    print("Testing offline replay...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        (temp_path / "shots").mkdir()
+        for i, frame in enumerate(benchmark_filter.face_clip('pan', 6, 120, 160)):
+            cv2.imwrite(str(temp_path / "shots" / f"{i:03d}.png"), frame)
+
+        options = {'settings': {'effect_chain': 'beauty, tint'}, 'tracking': 'off',
+                   'output': str(temp_path / "out.mp4"), 'timings': str(temp_path / "timings.json")}
+        summary = replay_filter.replay(str(temp_path / "shots"), options)
+        assert summary['frames'] == 6 and summary['stats']['name'] == "shots"
+
+        with open(temp_path / "timings.json") as f:
+            timings = json.load(f)
+        assert [r['frame'] for r in timings['frames']] == list(range(6))
+        assert cv2.VideoCapture(options['output']).get(cv2.CAP_PROP_FRAME_COUNT) == 6
+        print("  ✓ Filtered video and per-frame timings written")
+
+def test_gpu_readback():
+    """Render path reads frames back through the stage surface ring without stalls"""
+    print("Testing GPU readback...")
+
+    camera = obs_standin.Source('camera', 64, 48)
+    settings = obs_standin.settings({'effect_type': 'tint', 'tint_color': 0xFF0000FF,
+                                     'intensity': 1.0, 'enable_tracking': False,
+                                     'readback_buffers': 2})
+    filt = snap_filter.filter_create(settings, obs_standin.Source('filter', target=camera))
+    snap_filter.filter_update(filt, settings)
+    frames = [np.full((48, 64, 3), i * 20, dtype=np.uint8) for i in range(6)]
+    try:
+        outputs = []
+        for frame in frames:
+            camera.frame = frame
+            outputs.append(obs_standin.render_frame(filt))
+
+        # The first frame is drawn unfiltered while the pipeline fills
+        assert np.array_equal(outputs[0][:, :, :3], frames[0])
+        for frame, output in zip(frames, outputs[1:]):
+            assert np.array_equal(output[:, :, :3], filt.process_frame(frame))
+        assert obs_standin.graphics.stalls == 0
+        print("  ✓ Filtered frames drawn one frame behind")
+
+        assert {'readback', 'upload'} <= set(filt.stats.summary()['stages'])
+        print("  ✓ Readback and upload timed")
+    finally:
+        snap_filter.filter_destroy(filt)
+
+def test_tracking_tap():
+    """Tracker gets a small grayscale tap instead of the full frame"""
+    print("Testing tracking tap...")
+
+    frame = benchmark_filter.background(720, 1280)
+    filt = benchmark_filter.make_filter(720, 1280, 0.5)
+    filt.enable_tracking = True
+
+    filt.process_frame(frame)
+    seq, timestamp, tap = filt.tracker.mailbox.get(timeout=0)
+    assert tap.array.shape == (360, 640) and filt.tracker.source_width == 1280
+    assert frame.nbytes / tap.array.nbytes > 10
+    small = cv2.resize(frame, (640, 360), interpolation=cv2.INTER_AREA)
+    assert np.array_equal(tap.array, cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+    tap.release()
+    print("  ✓ Tap is downscaled, then converted to grayscale")
+
+    i420 = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+    filt.process_frame(frame, i420, 'i420')
+    seq, timestamp, tap = filt.tracker.mailbox.get(timeout=0)
+    expected = cv2.resize(i420[:720], (640, 360), interpolation=cv2.INTER_AREA)
+    assert np.array_equal(tap.array, expected)
+    tap.release()
+    print("  ✓ Luma taken straight from I420 planes")
+
+def test_color_map_tables():
+    """Compiled color maps match the ops evaluated one 8-bit pass at a time"""
+    print("Testing color map tables...")
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    frame[0, 0], frame[0, 1] = 0, 255
+
+    for ops in ((snap_filter.beauty_lift(0.5),),
+                (snap_filter.beauty_lift(0.5), ('tint', (1.0, 0.6, 0.3), 0.4)),
+                (('tint', (0.2, 0.4, 1.0), 0.7), ('saturation', 1.6)),
+                (snap_filter.beauty_lift(0.5), ('saturation', 0.4), ('scale', 0.9, 0))):
+        out = snap_filter.compile_color_map(ops).apply(frame, snap_filter.ScratchBuffers())
+        expected = frame.reshape(-1, 3).astype(np.float64)
+        for op in ops:
+            expected = snap_filter.apply_color_ops(expected, (op,))
+        diff = np.abs(out.reshape(-1, 3).astype(np.int16) - expected.astype(np.int16))
+        tolerance = 0 if all(op[0] in snap_filter.CHANNEL_OPS for op in ops) else 1
+        assert diff.max() <= tolerance, (ops, diff.max())
+    print("  ✓ Tables match per-op evaluation")
+
+    gray = np.array([[[0, 0, 0], [128, 128, 128], [255, 255, 255]]], dtype=np.uint8)
+    out = snap_filter.compile_color_map((('saturation', 1.5),)).apply(gray, snap_filter.ScratchBuffers())
+    assert np.array_equal(out, gray)
+    print("  ✓ Saturation keeps grays and endpoints")
+
+def test_fused_chain_with_saturation():
+    """Fused beauty + tint + saturation matches the effects run one by one"""
+    print("Testing fused chain with saturation...")
+
+    frame = benchmark_filter.background(120, 160)
+    benchmark_filter.draw_face(frame, 0.5, 0.45, 0.25)
+    filt = benchmark_filter.make_filter(120, 160, 0.6)
+    filt.tint_color = [1.0, 0.7, 0.4, 1.0]
+    filt.saturation = 1.4
+
+    fused = filt.run_chain(frame, filt.compile_chain(['beauty', 'tint'])).copy()
+
+    unfused = filt.apply_beauty(frame).copy()
+    unfused = filt.apply_tint(unfused).copy()
+    unfused = snap_filter.apply_color_ops(unfused.reshape(-1, 3), (('saturation', 1.4),))
+    # The unfused effects round to 8 bits between passes and saturation
+    # scales that rounding, so a few pixels land two levels away
+    diff = np.abs(fused.reshape(-1, 3).astype(np.int16) - unfused.astype(np.int16))
+    assert diff.max() <= 2 and np.mean(diff <= 1) > 0.99, (diff.max(), np.mean(diff <= 1))
+    assert len(np.unique(fused[..., 1])) > 64
+    print("  ✓ Fused chain matches the unfused effects")
+
+def test_detection_scheduler():
+    """Scheduler detects every ``interval`` frames and tracks in between"""
+    print("Testing detection scheduler...")
+
+    def actions(scheduler, frames, confidence=1.0):
+        result = []
+        for _ in range(frames):
+            action = scheduler.next_action(True)
+            if action == 'detect':
+                scheduler.record_detection(1.0)
+            else:
+                scheduler.record_tracking(0.0, confidence)
+            result.append(action)
+        return result
+
+    # Detection within budget: every frame
+    assert actions(snap_filter.DetectionScheduler(budget_ms=5.0), 6) == ['detect'] * 6
+    print("  ✓ Interval 1 detects on every frame")
+
+    # Detection at 1 ms and free tracking within 0.25 ms: every 4th frame
+    scheduler = snap_filter.DetectionScheduler(budget_ms=0.25)
+    assert scheduler.next_action(True) == 'detect'
+    scheduler.record_detection(1.0)
+    assert scheduler.interval == 4
+    assert actions(scheduler, 8) == ['track', 'track', 'track', 'detect'] * 2
+    print("  ✓ Interval N detects every N frames")
+
+    assert actions(scheduler, 2, confidence=0.1) == ['track', 'detect']
+    assert scheduler.next_action(False) == 'skip'
+    print("  ✓ Lost tracking forces detection, no faces skips")
+
+def test_shared_frame_ring():
+    """Shared frame ring hands back the newest whole frame only"""
+    print("Testing shared frame ring...")
+
+    frames = [np.full((4, 6, 3), i, dtype=np.uint8) for i in range(5)]
+    ring = snap_filter.SharedFrameRing(3, frames[0].nbytes)
+    reader = snap_filter.SharedFrameRing(3, frames[0].nbytes, name=ring.name)
+    try:
+        assert reader.read_latest() is None
+        for seq, frame in enumerate(frames):
+            ring.write(frame, seq, 10.0 + seq, source_width=12)
+        seq, timestamp, frame, source_width = reader.read_latest()
+        assert (seq, timestamp, source_width) == (4, 14.0, 12)
+        assert np.array_equal(frame, frames[4])
+        assert reader.read_latest(after_seq=4) is None
+        print("  ✓ Newest frame round-trips through shared memory")
+
+        # A slot the writer is still filling is skipped
+        ring.header[4 % 3, 0] = -1
+        assert reader.read_latest()[0] == 3
+        ring.header[4 % 3, 0] = 4
+
+        # The writer lapping the reader mid-copy invalidates the copy
+        class Lapping:
+            def __getitem__(self, key):
+                reader.data = data
+                ring.write(frames[0], 7, 17.0)
+                return data[key]
+
+        data = reader.data
+        reader.data = Lapping()
+        assert reader.read_latest() is None
+        assert reader.read_latest()[0] == 7
+        print("  ✓ Torn and overwritten slots are not returned")
+    finally:
+        reader.close()
+        ring.close()
+
+def test_shared_face_results():
+    """Face results seqlock publishes whole results with the worker's timings"""
+    print("Testing shared face results...")
+
+    results = snap_filter.SharedFaceResults()
+    reader = snap_filter.SharedFaceResults(name=results.name)
+    try:
+        face = {'id': 3, 'center_x': 0.4, 'center_y': 0.5, 'width': 0.2, 'height': 0.3,
+                'confidence': 0.9}
+        face_data = dict(snap_filter.DEFAULT_FACE_DATA, detected=True, faces=[face],
+                         frame_seq=12, timestamp=5.0, **{k: v for k, v in face.items() if k != 'id'})
+        stats = snap_filter.PipelineStats()
+        stats.record('detect', 7.5)
+        stats.count('detections', 2)
+        stats.count('skipped_frames')
+
+        assert reader.read() is None
+        results.write(face_data, stats)
+        version, data, worker = reader.read()
+        assert data['frame_seq'] == 12 and data['faces'][0]['id'] == 3
+        assert data['center_x'] == 0.4 and data['detected']
+        assert worker == {'detect_ms': 7.5, 'detections': 2, 'track_ms': 0.0,
+                          'tracked_frames': 0, 'skipped_frames': 1}
+        assert reader.read(after_version=version) is None
+        print("  ✓ Result and worker stats round-trip")
+
+        # Odd version: the writer is mid-update
+        results.values[0] += 1
+        assert reader.read() is None
+        results.values[0] += 1
+        assert reader.read()[0] == version + 2
+        print("  ✓ Readers never see a half-written result")
+    finally:
+        reader.close()
+        results.close()
+
+def test_detection_process_failure():
+    """A detection process that cannot start is reported and replaced by threads"""
+    print("Testing detection process failure...")
+
+    cascade_path = snap_filter.face_cascade_path
+    snap_filter.face_cascade_path = None
+    tracker = snap_filter.FaceTracker()
+    try:
+        tracker.configure(obs_standin.settings({'detection_backend': 'process'}))
+        frame = np.zeros((48, 64), dtype=np.uint8)
+        tracker.submit_frame(frame)
+        tracker.backend.process.join(timeout=60)
+        tracker.submit_frame(frame)
+
+        assert tracker.backend is None
+        summary = tracker.stats.summary()
+        assert summary['errors'] == 1 and "face cascade" in summary['last_error']
+        assert summary['counters']['backend_fallbacks'] == 1
+        print("  ✓ Worker exit recorded and tracking moved to threads")
+
+        tracker.submit_frame(frame)
+        assert tracker.mailbox.pending == 1
+        print("  ✓ Later frames go to the tracking mailbox")
+    finally:
+        tracker.close()
+        snap_filter.face_cascade_path = cascade_path
+
+def test_process_backend_worker_stats():
+    """Worker timings read back from the results block land in the parent's stats"""
+    print("Testing process backend stats...")
+
+    backend = snap_filter.ProcessDetectionBackend()
+    backend.results = snap_filter.SharedFaceResults()
+    try:
+        worker = snap_filter.PipelineStats()
+        for ms in (4.0, 6.0):
+            worker.record('detect', ms)
+            worker.count('detections')
+            backend.results.write(snap_filter.DEFAULT_FACE_DATA, worker)
+            assert backend.poll() is not None
+
+        summary = backend.stats.summary()
+        assert summary['counters'] == {'detections': 2}
+        assert summary['stages']['detect']['count'] == 2
+        assert summary['stages']['detect']['max_ms'] == 6.0
+        print("  ✓ Detect timings and counts recorded")
+    finally:
+        backend.close()
+
+class FakeCascade:
+    """Finds the drawn face by its skin tone, standing in for the Haar cascade"""
+
+    def empty(self):
+        return False
+
+    def detectMultiScale(self, gray, **kwargs):
+        ys, xs = np.nonzero(np.abs(gray.astype(np.int16) - 161) <= 2)
+        if len(xs) < 50:
+            return []
+        size = gray.shape[1] // 5
+        return [(int(np.median(xs)) - size // 2, int(np.median(ys)) - size // 2, size, size)]
+
+def test_replay_repeatable():
+    """Two sync replays of the same clip give identical frames and face data"""
+    print("Testing replay repeatability...")
+
+    load_face_cascade = snap_filter.load_face_cascade
+    snap_filter.load_face_cascade = lambda: (FakeCascade(), None)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / "shots").mkdir()
+            for i, frame in enumerate(benchmark_filter.face_clip('shake', 8, 120, 160)):
+                cv2.imwrite(str(temp_path / "shots" / f"{i:03d}.png"), frame)
+
+            runs = []
+            for run in range(2):
+                options = {'settings': {'effect_chain': 'cartoon, glow'}, 'tracking': 'sync',
+                           'detection_interval': 3,
+                           'output': str(temp_path / f"out{run}.avi"),
+                           'timings': str(temp_path / f"timings{run}.json")}
+                summary = replay_filter.replay(str(temp_path / "shots"), options)
+                assert summary['stats']['counters']['detections'] == 3
+                with open(options['timings']) as f:
+                    faces = [(r['detected'], r['faces']) for r in json.load(f)['frames']]
+                frames, _ = replay_filter.open_frames(options['output'])
+                runs.append((faces, list(frames)))
+
+            (faces_a, frames_a), (faces_b, frames_b) = runs
+            assert faces_a == faces_b and any(detected for detected, _ in faces_a)
+            assert len(frames_a) == 8 and all(np.array_equal(a, b) for a, b in zip(frames_a, frames_b))
+            print("  ✓ Outputs identical across runs")
+    finally:
+        snap_filter.load_face_cascade = load_face_cascade
+
+def test_frame_mailbox():
+    """Mailbox keeps the newest frames, numbers every frame and releases drops"""
+    print("Testing frame mailbox...")
+
+    mailbox = snap_filter.FrameMailbox()
+    assert mailbox.get(timeout=0) is None
+    assert [mailbox.put(f"frame{i}") for i in range(3)] == [0, 1, 2]
+    assert mailbox.dropped == 2 and mailbox.pending == 1
+    seq, timestamp, frame = mailbox.get(timeout=0)
+    assert (seq, frame) == (2, "frame2") and timestamp <= time.monotonic()
+    print("  ✓ Latest frame wins, sequence numbers keep counting")
+
+    ring = snap_filter.FrameRing(slots=2)
+    mailbox = snap_filter.FrameMailbox(capacity=1)
+    for _ in range(3):
+        mailbox.put(ring.acquire((2, 2)))
+    assert ring.available == 1
+    mailbox.clear()
+    assert ring.available == 2
+    print("  ✓ Dropped and cleared frames go back to the ring")
+
+class MarkerCascade:
+    """Reports the bright square in whatever image it is given, recording each scan"""
+
+    def __init__(self):
+        self.scans = []
+
+    def detectMultiScale(self, gray, scaleFactor, minNeighbors, minSize):
+        self.scans.append((gray.shape, minSize))
+        ys, xs = np.nonzero(gray == 255)
+        if len(xs) == 0:
+            return []
+        return [(int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))]
+
+def test_region_detector():
+    """ROI scans report boxes in frame coordinates and fall back to full scans"""
+    print("Testing region detector...")
+
+    def frame_with_face(x, y):
+        gray = np.zeros((360, 640), dtype=np.uint8)
+        gray[y:y + 60, x:x + 60] = 255
+        return gray
+
+    cascade = MarkerCascade()
+    detector = snap_filter.RegionDetector(roi_margin=0.5, full_scan_interval=2)
+    assert detector.detect(cascade, frame_with_face(300, 100), scale=0.5) == [(300, 100, 60, 60)]
+    assert cascade.scans[-1] == ((360, 640), (40, 40))
+    print("  ✓ First detection scans the whole frame")
+
+    assert detector.detect(cascade, frame_with_face(310, 110)) == [(310, 110, 60, 60)]
+    assert cascade.scans[-1][0] == (120, 120) and detector.roi_scans == 1
+    print("  ✓ ROI scan mapped back to frame coordinates")
+
+    assert detector.detect(cascade, frame_with_face(500, 250)) == [(500, 250, 60, 60)]
+    assert detector.roi_scans == 2 and detector.full_scans == 2
+    assert cascade.scans[-1][0] == (360, 640)
+    print("  ✓ Empty ROI falls back to a full scan")
+
+    detector.detect(cascade, frame_with_face(500, 250))
+    detector.detect(cascade, frame_with_face(500, 250))
+    detector.detect(cascade, frame_with_face(500, 250))
+    assert (detector.roi_scans, detector.full_scans) == (4, 3)
+    print("  ✓ Periodic full scan after full_scan_interval ROI scans")
+
+def test_face_track_ids():
+    """Tracks keep their ids across detections and are matched by IoU"""
+    print("Testing face track association...")
+
+    gray = np.zeros((240, 320), dtype=np.uint8)
+    tracks = snap_filter.FaceTrackManager(max_tracks=2, max_misses=1)
+    tracks.associate(gray, [(20, 20, 40, 40), (200, 30, 60, 60), (120, 150, 20, 20)])
+    assert [(t.id, t.box) for t in tracks.tracks] == [(1, (200, 30, 60, 60)), (2, (20, 20, 40, 40))]
+    print("  ✓ New tracks start largest first, up to max_tracks")
+
+    # Faces listed in the other order and moved a little keep their ids
+    tracks.associate(gray, [(25, 22, 40, 40), (205, 35, 60, 60)])
+    assert {t.id: t.box for t in tracks.tracks} == {1: (205, 35, 60, 60), 2: (25, 22, 40, 40)}
+    print("  ✓ Detections matched to tracks by IoU")
+
+    # A detection overlapping nothing is a new face; unmatched tracks age out
+    tracks.associate(gray, [(205, 35, 60, 60)])
+    assert [t.misses for t in tracks.tracks] == [0, 1]
+    assert [f['id'] for f in tracks.publish(320, 240, 1.0)] == [1]
+    tracks.associate(gray, [(205, 35, 60, 60), (100, 150, 30, 30)])
+    assert [t.id for t in tracks.tracks] == [1, 3]
+    print("  ✓ Missed tracks dropped, ids never reused")
+
+def test_tracking_pool_isolation():
+    """Each source's tracker sees only its own frames, on one worker at a time"""
+    print("Testing per-source trackers on the tracking pool...")
+
+    pool = snap_filter.TrackingPool(workers=2)
+    cascade = MarkerCascade()
+    pool._cascade = lambda: cascade
+    lock = threading.Lock()
+    running = {}
+    overlaps = []
+
+    def exclusive(tracker):
+        detect_faces = tracker.detect_faces
+
+        def detect(*args, **kwargs):
+            with lock:
+                running[tracker] = running.get(tracker, 0) + 1
+                overlaps.append(running[tracker])
+            time.sleep(0.002)
+            try:
+                return detect_faces(*args, **kwargs)
+            finally:
+                with lock:
+                    running[tracker] -= 1
+        tracker.detect_faces = detect
+        return tracker
+
+    left, right = (exclusive(snap_filter.FaceTracker(pool=pool)) for _ in range(2))
+    try:
+        for i in range(20):
+            for tracker, x in ((left, 10), (right, 110)):
+                gray = np.zeros((120, 160), dtype=np.uint8)
+                gray[40:70, x:x + 30] = 255
+                tracker.submit_frame(gray)
+            time.sleep(0.001)
+
+        deadline = time.monotonic() + 10
+        while (pool._scheduled or left.mailbox.pending or right.mailbox.pending) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pool.shutdown()
+
+    assert overlaps and max(overlaps) == 1
+    print("  ✓ No tracker ran on two workers at once")
+    assert left.face_data['center_x'] < 0.5 < right.face_data['center_x']
+    assert left.face_data['frame_seq'] == right.face_data['frame_seq'] == 19
+    print("  ✓ Face data kept per source")
+
+def test_frame_ring():
+    """Ring buffers are reference counted, reused and reallocated on shape changes"""
+    print("Testing frame ring...")
+
+    ring = snap_filter.FrameRing(slots=2)
+    first = ring.acquire((4, 4, 3))
+    second = ring.acquire_copy(np.full((4, 4, 3), 7, dtype=np.uint8))
+    assert ring.available == 0 and np.all(second.array == 7)
+    assert first.array.base is second.array.base
+
+    overflow = ring.acquire((4, 4, 3))
+    assert ring.overflows == 1 and overflow.ring is None
+    overflow.release()
+    assert ring.available == 0
+    print("  ✓ Slots share one allocation, overflow never blocks")
+
+    first.retain()
+    first.release()
+    assert ring.available == 0
+    first.release()
+    assert ring.available == 1
+    assert ring.acquire((4, 4, 3)) is first
+    print("  ✓ Slot reused after its last release")
+
+    resized = ring.acquire((8, 8, 3))
+    assert resized.array.shape == (8, 8, 3) and ring.available == 1
+    second.release()
+    assert ring.available == 1
+    print("  ✓ Buffers of an old shape are not returned to the ring")
+
+    scratch = snap_filter.ScratchBuffers()
+    array = scratch.get('blur', (4, 4, 3))
+    assert scratch.get('blur', (4, 4, 3)) is array
+    assert scratch.get('blur', (4, 4, 3), np.float32) is not array
+    print("  ✓ Scratch buffers reused until shape or dtype changes")
+
+def test_face_mask_cache():
+    """Mask cache hits on small moves, evicts least recently used masks"""
+    print("Testing face mask cache...")
+
+    face = dict(benchmark_filter.BENCH_FACE, rotation=0.0)
+    moved = dict(face, center_x=face['center_x'] + 0.5 / 320)
+    other = dict(face, center_x=0.3)
+    third = dict(face, center_x=0.7)
+
+    cache = snap_filter.FaceMaskCache(capacity=2)
+    mask = cache.get((240, 320, 3), [face])
+    assert cache.get((240, 320, 3), [moved]) is mask
+    assert (cache.hits, cache.misses) == (1, 1)
+    print("  ✓ Sub-quantum moves hit the cached mask")
+
+    cache.get((240, 320, 3), [other])
+    cache.get((240, 320, 3), [face])
+    cache.get((240, 320, 3), [third])
+    assert (cache.hits, cache.misses) == (2, 3)
+    cache.get((240, 320, 3), [face])
+    assert cache.hits == 3
+    cache.get((240, 320, 3), [other])
+    assert cache.misses == 4
+    print("  ✓ Least recently used mask evicted at capacity")
+
+    # The patch matches a full-frame mask drawn and blurred the old way
+    full = np.zeros((240, 320), dtype=np.uint8)
+    for f in (face, third):
+        cv2.ellipse(full, (int(round(f['center_x'] * 320 / 2)) * 2, int(round(f['center_y'] * 240 / 2)) * 2),
+                    (int(round(f['width'] * 320 * 0.25)) * 2, int(round(f['height'] * 240 * 0.25)) * 2),
+                    0, 0, 360, 255, -1)
+    cv2.GaussianBlur(full, (51, 51), 0, dst=full)
+    mask = cache.get((240, 320, 3), [face, third])
+    patched = np.zeros_like(full)
+    patched[mask.rows, mask.cols] = mask.mask
+    assert np.array_equal(patched, full)
+    print("  ✓ Bounding-box mask equals the full-frame mask")
+
+def test_glow_region_blend():
+    """Glow blended over the mask's box equals the full-frame blend"""
+    print("Testing region-only glow...")
+
+    frame = benchmark_filter.background(240, 320)
+    benchmark_filter.draw_face(frame, 0.5, 0.45, 0.25)
+    filt = benchmark_filter.make_filter(240, 320, 0.7)
+    out = filt.apply_glow(frame).copy()
+
+    mask = filt.mask_cache.get(frame.shape, [benchmark_filter.BENCH_FACE], axis_scale=0.6)
+    weights = np.zeros((240, 320), dtype=np.float32)
+    weights[mask.rows, mask.cols] = mask.weights_for(0.7)[0]
+    blurred = cv2.GaussianBlur(frame, (21, 21), 0)
+    expected = cv2.blendLinear(frame, blurred, 1.0 - weights, weights)
+    assert np.array_equal(out, expected)
+    print("  ✓ Same output as blurring and blending the whole frame")
+
+    # Regions clipped at the frame edge too
+    rows, cols = slice(0, 50), slice(280, 320)
+    region = snap_filter.blurred_region(frame, rows, cols, 21, np.empty_like(frame))
+    assert np.array_equal(region, blurred[rows, cols])
+    print("  ✓ Region blur matches at frame edges")
+
+def test_cartoon_palette_refit():
+    """Palette refits on a schedule and straight away on a scene change"""
+    print("Testing cartoon palette refits...")
+
+    scratch = snap_filter.ScratchBuffers()
+    palette = snap_filter.CartoonPalette(colors=4, refit_interval=5)
+    warm = np.zeros((90, 160, 3), dtype=np.uint8)
+    warm[:, :80], warm[:, 80:] = (40, 80, 200), (20, 160, 240)
+
+    for _ in range(5):
+        out = palette.quantize(warm, scratch)
+    assert palette.fits == 1
+    assert np.abs(out.astype(np.int16) - warm).max() <= 8
+    palette.quantize(warm, scratch)
+    assert palette.fits == 2
+    print("  ✓ Same scene refits only every refit_interval frames")
+
+    cool = warm[:, :, ::-1].copy()
+    out = palette.quantize(cool, scratch)
+    assert palette.fits == 3
+    assert np.abs(out.astype(np.int16) - cool).max() <= 8
+    print("  ✓ Scene change refits at once")
+
+def test_fused_chain():
+    """Compiled chains give the same frames as applying each effect in turn"""
+    print("Testing fused effect chains...")
+
+    frame = benchmark_filter.background(120, 160)
+    benchmark_filter.draw_face(frame, 0.5, 0.45, 0.25)
+
+    plan = benchmark_filter.make_filter(120, 160, 0.6).compile_chain(['beauty', 'tint', 'glow'])
+    assert [(kind, stage) for kind, stage, _ in plan] == [
+        ('pixels', 'effect:beauty'), ('color', 'effect:color'), ('pixels', 'effect:glow')]
+    print("  ✓ Beauty's lift and the tint share one color map")
+
+    for chain in benchmark_filter.CHAINS:
+        # Same k-means seeding for the cartoon palette in both runs
+        cv2.setRNGSeed(0)
+        fused_filter = benchmark_filter.make_filter(120, 160, 0.6)
+        fused = fused_filter.run_chain(frame, fused_filter.compile_chain(chain))
+
+        cv2.setRNGSeed(0)
+        filt = benchmark_filter.make_filter(120, 160, 0.6)
+        unfused = frame
+        for effect in chain:
+            unfused = benchmark_filter.effect_step(filt, effect)(unfused).copy()
+        assert np.array_equal(fused, unfused), chain
+    print("  ✓ Every benchmark chain matches the unfused effects")
+
+def test_pipeline_stats():
+    """Rolling percentiles, counters and errors summarized per filter"""
+    print("Testing pipeline stats...")
+
+    rolling = snap_filter.RollingStats(window=100)
+    assert rolling.summary() == {'count': 0}
+    for ms in range(1, 201):
+        rolling.add(float(ms))
+    summary = rolling.summary()
+    assert summary['count'] == 200 and len(rolling.samples) == 100
+    assert summary['max_ms'] == 200.0 and summary['p50_ms'] == 150.5
+    assert summary['p95_ms'] < summary['p99_ms'] < 200.0
+    print("  ✓ Percentiles over the newest window of samples")
+
+    stats = snap_filter.PipelineStats(window=10)
+    stats.record('detect', 4.0)
+    stats.record('detect', 6.0)
+    stats.count('frames', 30)
+    stats.error("Tracking", ValueError("bad frame"))
+    summary = stats.summary()
+    assert summary['stages']['detect']['mean_ms'] == 5.0
+    assert summary['counters'] == {'frames': 30} and summary['rates_per_s']['frames'] > 0
+    assert (summary['errors'], summary['last_error']) == (1, "Tracking: bad frame")
+    print("  ✓ Stages, counters and last error summarized")
+
+    text = snap_filter.format_stats({'cam': dict(summary, dropped_frames=2, tracking_age_s=0.05)})
+    assert text.splitlines()[0].endswith("2 dropped, tracking age 50 ms, 1 errors")
+    assert text.splitlines()[1].startswith("  detect: p50 5.0")
+    assert text.splitlines()[-1] == "  last error: Tracking: bad frame"
+    print("  ✓ Panel text lists every timed stage")
+
+    stats.reset()
+    assert stats.summary()['stages'] == {} and stats.summary()['errors'] == 0
+    print("  ✓ Reset clears everything")
+
+def test_beauty_in_place():
+    """Beauty matches the original float64 version without per-frame allocations"""
+    print("Testing allocation-free beauty...")
+
+    frame = benchmark_beauty.synthetic_frame(180, 320)
+    scratch = snap_filter.ScratchBuffers()
+    for intensity in (0.25, 0.5, 0.75, 1.0):
+        out = snap_filter.beauty_filter(frame, intensity, scratch)
+        expected = benchmark_beauty.legacy_beauty(frame, intensity)
+        diff = np.abs(out.astype(np.int16) - expected)
+        if intensity in (0.5, 1.0):
+            assert diff.max() == 0, intensity
+        else:
+            # The float32 blend lands a level off the float64 one on a few
+            # pixels, and the brightness lift can stretch that to two
+            assert diff.max() <= 2 and np.mean(diff > 1) < 0.01, intensity
+    print("  ✓ Output matches the float64 implementation")
+
+    assert snap_filter.beauty_filter(frame, 0.5, scratch) is out
+    peak = benchmark_beauty.allocated_per_frame(lambda: snap_filter.beauty_filter(frame, 0.5, scratch))
+    assert peak < frame.nbytes // 4, peak
+    print("  ✓ Scratch buffers reused, no frame-sized allocations")
+
+def main():
+    success = True
+
+    for test in (test_effects_headless, test_stats_surface, test_benchmark_regressions,
+                 test_replay_image_sequence, test_gpu_readback, test_tracking_tap,
+                 test_color_map_tables, test_fused_chain_with_saturation, test_detection_scheduler,
+                 test_shared_frame_ring, test_shared_face_results, test_detection_process_failure,
+                 test_process_backend_worker_stats, test_replay_repeatable, test_frame_mailbox,
+                 test_region_detector, test_face_track_ids, test_tracking_pool_isolation,
+                 test_frame_ring, test_face_mask_cache, test_glow_region_blend,
+                 test_cartoon_palette_refit, test_fused_chain, test_pipeline_stats,
+                 test_beauty_in_place):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__doc__} failed: {e}")
+            success = False
+
+    print("\n" + "=" * 60)
+    if success:
+        print("✓ Filter script tests passed")
+        return 0
+    else:
+        print("✗ Filter script tests failed")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())